@@ -0,0 +1,3 @@
+"""
+基准测试 (python3 -m benchmarks.run)
+"""
@@ -0,0 +1,142 @@
+"""
+保存 / 切换 / 列表 / 读取账号的端到端基准测试
+在临时目录中生成模拟的 Windsurf 数据，不需要安装 Windsurf，Linux 上即可运行。
+用法:
+    python3 -m benchmarks.run [--small-files 2000] [--accounts 3] [--repeat 3] [--output result.json]
+结果以 JSON 输出，便于比较不同版本。
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+
+from windsurf_core import codec, profiles
+from windsurf_core.account import AccountReader
+from windsurf_core.engine import Engine
+
+from . import synthetic
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _summary(samples):
+    return {
+        'runs': [round(s, 6) for s in samples],
+        'min': round(min(samples), 6),
+        'median': round(statistics.median(samples), 6),
+        'max': round(max(samples), 6),
+    }
+
+
+def run(spec, accounts=3, repeat=3, workdir=None):
+    """
+    执行全部基准
+    返回:
+        dict: 可直接序列化为 JSON 的结果
+    """
+    base = tempfile.mkdtemp(prefix='windsurf-bench-', dir=workdir)
+    try:
+        data_paths = synthetic.generate(os.path.join(base, 'data'), spec)
+        files, size = synthetic.tree_size(data_paths.data)
+        engine = Engine(data_paths, os.path.join(base, 'profiles'))
+        results = {}
+
+        # 首次保存 (全部内容写入存储)，之后每个账号只改动一部分文件
+        cold = []
+        for account in range(accounts):
+            if account:
+                synthetic.switch_account(data_paths, spec, account)
+            elapsed, (_, stats) = _timed(engine.save, f"bench-{account}")
+            cold.append(elapsed)
+        results['save_new_profile'] = _summary(cold)
+        results['save_new_profile']['stored_size'] = stats['stored_size']
+        results['save_new_profile']['logical_size'] = stats['logical_size']
+
+        # 内容未变化时重新保存 (增量保存)
+        samples = [_timed(engine.save, f"bench-{accounts - 1}")[0] for _ in range(repeat)]
+        results['save_unchanged'] = _summary(samples)
+
+        # 列表刷新: 首次重建索引，之后只读索引文件
+        os.remove(engine.index.path)
+        results['refresh_profiles_rebuild'] = _summary([_timed(engine.list_profiles)[0]])
+        results['refresh_profiles'] = _summary(
+            [_timed(engine.list_profiles)[0] for _ in range(repeat)])
+
+        # 读取当前账号: 无缓存 / 有缓存
+        results['get_current_account_info_cold'] = _summary(
+            [_timed(AccountReader().account, data_paths.state_db)[0] for _ in range(repeat)])
+        results['get_current_account_info'] = _summary(
+            [_timed(engine.current_account)[0] for _ in range(repeat)])
+
+        # 在账号之间来回切换，以及切换到已经一致的账号
+        switch = []
+        switch_stats = []
+        for i in range(repeat):
+            elapsed, (errors, _, stats) = _timed(engine.switch, f"bench-{i % accounts}")
+            if errors:
+                raise RuntimeError('\n'.join(errors))
+            switch.append(elapsed)
+            switch_stats.append({k: stats[k] for k in ('written', 'deleted', 'unchanged')})
+        results['switch_profile'] = _summary(switch)
+        results['switch_profile']['files'] = switch_stats
+        target = f"bench-{(repeat - 1) % accounts}"
+        results['switch_profile_noop'] = _summary(
+            [_timed(engine.switch, target)[0] for _ in range(repeat)])
+        results['switch_profile_keys_only'] = _summary(
+            [_timed(engine.switch, f"bench-{i % accounts}", mode=profiles.RESTORE_KEYS)[0]
+             for i in range(repeat)])
+
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'codec': codec.DEFAULT_CODEC,
+            'spec': spec.to_dict(),
+            'accounts': accounts,
+            'data': {'files': files, 'bytes': size},
+            'results': results,
+        }
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Windsurf 账号切换器基准测试')
+    parser.add_argument('--state-db-mb', type=int, default=8)
+    parser.add_argument('--small-files', type=int, default=2000)
+    parser.add_argument('--small-file-kb', type=int, default=16)
+    parser.add_argument('--large-files', type=int, default=8)
+    parser.add_argument('--large-file-mb', type=int, default=4)
+    parser.add_argument('--cookies', type=int, default=2000)
+    parser.add_argument('--churn', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--accounts', type=int, default=3, help='保存的账号数量')
+    parser.add_argument('--repeat', type=int, default=3, help='每项测试的重复次数')
+    parser.add_argument('--workdir', help='生成临时数据的目录 (默认系统临时目录)')
+    parser.add_argument('--output', help='结果写入的 JSON 文件，默认输出到 stdout')
+    args = parser.parse_args(argv)
+
+    spec = synthetic.Spec(args.state_db_mb, args.small_files, args.small_file_kb,
+                          args.large_files, args.large_file_mb, args.cookies, args.churn, args.seed)
+    result = run(spec, args.accounts, args.repeat, args.workdir)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+生成模拟的 Windsurf 数据目录
+结构与真实安装一致 (以 Windows 布局为准):
+    <base>/Windsurf/User/globalStorage/state.vscdb   ItemTable 中含 windsurfAuthStatus
+    <base>/Windsurf/Session Storage/                  LevelDB 目录 (MANIFEST 只引用其中一部分文件，
+    <base>/Windsurf/Local Storage/leveldb/            其余为已废弃的表文件、旧日志和 LOG.old)
+    <base>/Windsurf/Network/Cookies                   SQLite 数据库
+    <base>/codeium/installation_id, user_settings.pb
+"""
+
+import os
+import json
+import struct
+import random
+import sqlite3
+
+from windsurf_core import leveldb, paths
+
+
+class Spec:
+    """数据规模"""
+
+    def __init__(self, state_db_mb=8, small_files=2000, small_file_kb=16,
+                 large_files=8, large_file_mb=4, cookies=2000, churn=0.1, seed=1):
+        """
+        参数:
+            state_db_mb: state.vscdb 的大致大小
+            small_files: Session Storage / Local Storage 中的小文件总数
+            small_file_kb: 小文件平均大小
+            large_files: 较大的 .ldb 表文件数量
+            large_file_mb: 较大表文件的大小
+            cookies: Cookies 数据库的行数
+            churn: 切换到另一个账号时被改写的小文件比例
+            seed: 随机种子
+        """
+        self.state_db_mb = state_db_mb
+        self.small_files = small_files
+        self.small_file_kb = small_file_kb
+        self.large_files = large_files
+        self.large_file_mb = large_file_mb
+        self.cookies = cookies
+        self.churn = churn
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def make_paths(base):
+    """指向 base 下模拟数据的 PlatformPaths"""
+    return paths.PlatformPaths(paths.WINDOWS, os.path.join(base, 'Windsurf'),
+                               os.path.join(base, 'codeium'))
+
+
+def _payload(rng, size):
+    """一半随机、一半重复文本的内容 (压缩率接近真实的 LevelDB 日志)"""
+    half = size // 2
+    text = b'{"key":"workbench.view","value":true}\n'
+    return rng.getrandbits(half * 8).to_bytes(half, 'little') + (text * (size // len(text) + 1))[:size - half]
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def write_state_db(path, spec, account):
+    """生成 state.vscdb，并写入指定账号的 windsurfAuthStatus"""
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = random.Random(spec.seed)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    value_size = 4096
+    rows = spec.state_db_mb * 1024 * 1024 // value_size
+    conn.executemany("INSERT INTO ItemTable VALUES (?, ?)",
+                     ((f"workbench.state.{i}", _payload(rng, value_size).hex()[:value_size])
+                      for i in range(rows)))
+    set_account(conn, account)
+    conn.commit()
+    conn.close()
+
+
+def set_account(conn, account):
+    conn.execute("INSERT INTO ItemTable VALUES ('windsurfAuthStatus', ?)", (json.dumps({
+        'name': f"Bench User {account}",
+        'email': f"bench{account}@example.com",
+        'apiKey': f"sk-bench-{account:08d}",
+    }),))
+
+
+def switch_account(data_paths, spec, account):
+    """模拟登录另一个账号: 改写 windsurfAuthStatus 和一部分小文件"""
+    conn = sqlite3.connect(data_paths.state_db)
+    set_account(conn, account)
+    conn.commit()
+    conn.close()
+    rng = random.Random(spec.seed * 1000 + account)
+    for directory in (data_paths.session_storage, data_paths.local_storage):
+        for dirpath, _, filenames in os.walk(directory):
+            for name in filenames:
+                if name.endswith('.log') and rng.random() < spec.churn:
+                    full = os.path.join(dirpath, name)
+                    _write(full, _payload(rng, os.path.getsize(full) or 1024))
+
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _version_edit(log_number, next_file, tables):
+    """编码一条 VersionEdit (tables 为 [(number, size)]，全部放在 level 0)"""
+    name = b'leveldb.BytewiseComparator'
+    out = [_varint(leveldb.TAG_COMPARATOR), _varint(len(name)), name,
+           _varint(leveldb.TAG_LOG_NUMBER), _varint(log_number),
+           _varint(leveldb.TAG_NEXT_FILE_NUMBER), _varint(next_file),
+           _varint(leveldb.TAG_LAST_SEQUENCE), _varint(next_file * 100)]
+    for number, size in tables:
+        out += [_varint(leveldb.TAG_NEW_FILE), _varint(0), _varint(number), _varint(size),
+                _varint(1), b'a', _varint(1), b'z']
+    return b''.join(out)
+
+
+def _log_records(records):
+    """按 LevelDB 日志格式 (32 KB 块，7 字节记录头) 写出记录"""
+    out = bytearray()
+    for record in records:
+        first = True
+        while True:
+            left = leveldb.BLOCK_SIZE - len(out) % leveldb.BLOCK_SIZE
+            if left < leveldb.HEADER_SIZE:
+                out += b'\0' * left
+                continue
+            chunk = record[:left - leveldb.HEADER_SIZE]
+            record = record[len(chunk):]
+            if first:
+                kind = leveldb.FULL_TYPE if not record else leveldb.FIRST_TYPE
+            else:
+                kind = leveldb.LAST_TYPE if not record else leveldb.MIDDLE_TYPE
+            crc = leveldb.mask_crc(leveldb.crc32c(chunk, leveldb.crc32c(bytes((kind,)))))
+            out += struct.pack('<IHB', crc, len(chunk), kind) + chunk
+            first = False
+            if not record:
+                break
+    return bytes(out)
+
+
+def _leveldb(directory, rng, small, small_kb, large, large_mb):
+    _write(os.path.join(directory, 'CURRENT'), b'MANIFEST-000002\n')
+    _write(os.path.join(directory, 'LOCK'), b'')
+    _write(os.path.join(directory, 'LOG'), b'leveldb log\n' * 50)
+    _write(os.path.join(directory, 'LOG.old'), b'leveldb log\n' * 200)
+    tables = []
+    log_number = 0
+    for i in range(small):
+        number = i + 3
+        is_log = i % 4 == 0
+        name = f"{number:06d}.log" if is_log else f"{number:06d}.ldb"
+        size = max(256, int(rng.expovariate(1 / (small_kb * 1024))))
+        _write(os.path.join(directory, name), _payload(rng, size))
+        if is_log:
+            log_number = number
+        elif i % 8 != 1:
+            # 其余表文件已被合并掉，MANIFEST 不再引用
+            tables.append((number, size))
+    for i in range(large):
+        size = large_mb * 1024 * 1024
+        _write(os.path.join(directory, f"{900000 + i:06d}.ldb"),
+               rng.getrandbits(size * 8).to_bytes(size, 'little'))
+        tables.append((900000 + i, size))
+    edit = _version_edit(log_number, 900000 + large, tables)
+    _write(os.path.join(directory, 'MANIFEST-000002'), _log_records([edit]))
+
+
+def write_cookies(path, rows, rng):
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cookies (host_key TEXT, name TEXT, value TEXT, encrypted_value BLOB)")
+    conn.executemany("INSERT INTO cookies VALUES (?, ?, ?, ?)",
+                     ((f".host{i % 50}.example.com", f"c{i}", '', _payload(rng, 128))
+                      for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def generate(base, spec, account=0):
+    """
+    在 base 下生成一整套模拟数据
+    返回:
+        PlatformPaths
+    """
+    p = make_paths(base)
+    rng = random.Random(spec.seed)
+    write_state_db(p.state_db, spec, account)
+    _write(os.path.join(p.global_storage, 'storage.json'), b'{"theme": "dark"}')
+    half = spec.small_files // 2
+    _leveldb(p.session_storage, rng, half, spec.small_file_kb, 0, 0)
+    _leveldb(os.path.join(p.local_storage, 'leveldb'), rng, spec.small_files - half,
+             spec.small_file_kb, spec.large_files, spec.large_file_mb)
+    write_cookies(os.path.join(p.network_dir, 'Cookies'), spec.cookies, rng)
+    _write(os.path.join(p.network_dir, 'Network Persistent State'), b'{"net": {}}')
+    _write(os.path.join(p.codeium_dir, 'installation_id'), b'bench-installation')
+    _write(os.path.join(p.codeium_dir, 'user_settings.pb'), _payload(rng, 2048))
+    return p
+
+
+def tree_size(root):
+    """目录中的文件数和总字节数"""
+    files = size = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            files += 1
+            size += os.path.getsize(os.path.join(dirpath, name))
+    return files, size
@@ -0,0 +1,84 @@
+import io
+import os
+import contextlib
+
+import pytest
+
+from windsurf_core import blockdelta
+from windsurf_core import codec as codecs
+
+BLOCK = 512
+
+
+def _blocks(count, seed):
+    return [bytes([(seed + i) % 251]) * 7 + os.urandom(BLOCK - 7) for i in range(count)]
+
+
+def _encode(tmp_path, base, target, codec=codecs.RAW):
+    target_path = str(tmp_path / 'target')
+    with open(target_path, 'wb') as f:
+        f.write(target)
+    dst = str(tmp_path / 'target.delta')
+    stats = blockdelta.encode([base], target_path, dst, 'base-digest', codec=codec, block_size=BLOCK)
+    return dst, stats
+
+
+def _decode(path, base, stream=False):
+    @contextlib.contextmanager
+    def open_reader(digest, sequential):
+        assert digest == 'base-digest'
+        assert sequential == blockdelta.copies_in_order(path)
+        if stream:
+            yield blockdelta.StreamReader(base[i:i + 1000] for i in range(0, len(base), 1000))
+        else:
+            yield blockdelta.FileReader(io.BytesIO(base))
+    return b''.join(blockdelta.iter_content(path, open_reader))
+
+
+@pytest.mark.parametrize('codec', [codecs.RAW, codecs.ZLIB])
+def test_round_trip_in_order(tmp_path, codec):
+    pages = _blocks(20, 1)
+    base = b''.join(pages) + b'short tail'
+    changed = list(pages)
+    changed[3] = os.urandom(BLOCK)
+    changed[11] = os.urandom(BLOCK)
+    target = b''.join(changed) + b'short tail'
+    dst, stats = _encode(tmp_path, base, target, codec)
+    assert blockdelta.copies_in_order(dst)
+    assert stats == {'blocks': 21, 'copied': 19, 'literal': 2, 'size': len(target)}
+    assert _decode(dst, base, stream=True) == target
+    assert blockdelta.read_base(dst) == 'base-digest'
+
+
+def test_round_trip_out_of_order(tmp_path):
+    pages = _blocks(20, 2)
+    base = b''.join(pages)
+    target = b''.join(reversed(pages)) + b'new short last block'
+    dst, stats = _encode(tmp_path, base, target)
+    assert not blockdelta.copies_in_order(dst)
+    assert stats['copied'] == 20 and stats['literal'] == 1
+    assert _decode(dst, base) == target
+    with pytest.raises(ValueError):
+        _decode(dst, base, stream=True)
+
+
+def test_short_last_block_only_matches_same_length(tmp_path):
+    pages = _blocks(4, 3)
+    base = b''.join(pages) + pages[0][:100]
+    # 目标的最后一块是基准某个完整块的前缀，不能被当成那个完整块复制
+    target = b''.join(pages) + pages[1][:100]
+    dst, stats = _encode(tmp_path, base, target)
+    assert stats['literal'] == 1
+    assert _decode(dst, base) == target
+    target = b''.join(pages) + pages[0][:100]
+    dst, stats = _encode(tmp_path, base, target)
+    assert stats['literal'] == 0
+    assert _decode(dst, base) == target
+
+
+def test_truncated_base_is_detected(tmp_path):
+    pages = _blocks(6, 4)
+    base = b''.join(pages)
+    dst, _ = _encode(tmp_path, base, base)
+    with pytest.raises(ValueError):
+        _decode(dst, base[:-BLOCK])
@@ -0,0 +1,145 @@
+import os
+import struct
+
+import pytest
+
+from windsurf_core import leveldb
+from windsurf_core.leveldb import BLOCK_SIZE, HEADER_SIZE
+
+
+def _crc_bytewise(data, crc=0):
+    crc ^= 0xFFFFFFFF
+    for b in data:
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if (crc ^ b) & 1 else crc >> 1
+            b >>= 1
+    return crc ^ 0xFFFFFFFF
+
+
+def _record(kind, payload):
+    crc = leveldb.mask_crc(leveldb.crc32c(payload, leveldb.crc32c(bytes((kind,)))))
+    return struct.pack('<IHB', crc, len(payload), kind) + payload
+
+
+def _log(records):
+    """按 LevelDB 日志格式写出记录 (长记录拆成 FIRST / MIDDLE / LAST)"""
+    out = bytearray()
+    for data in records:
+        first = True
+        while True:
+            left = BLOCK_SIZE - len(out) % BLOCK_SIZE
+            if left < HEADER_SIZE:
+                out += b'\0' * left
+                left = BLOCK_SIZE
+            chunk, data = data[:left - HEADER_SIZE], data[left - HEADER_SIZE:]
+            if first and not data:
+                kind = leveldb.FULL_TYPE
+            elif first:
+                kind = leveldb.FIRST_TYPE
+            elif data:
+                kind = leveldb.MIDDLE_TYPE
+            else:
+                kind = leveldb.LAST_TYPE
+            out += _record(kind, chunk)
+            first = False
+            if not data:
+                break
+    return bytes(out)
+
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _slice(data):
+    return _varint(len(data)) + data
+
+
+def _edit(log_number=None, new_files=(), deleted_files=()):
+    out = bytearray()
+    if log_number is not None:
+        out += _varint(leveldb.TAG_LOG_NUMBER) + _varint(log_number)
+    for level, number in deleted_files:
+        out += _varint(leveldb.TAG_DELETED_FILE) + _varint(level) + _varint(number)
+    for level, number, size in new_files:
+        out += (_varint(leveldb.TAG_NEW_FILE) + _varint(level) + _varint(number) + _varint(size)
+                + _slice(b'a') + _slice(b'z'))
+    return bytes(out)
+
+
+def test_crc32c():
+    assert leveldb.crc32c(b'123456789') == 0xE3069283
+    data = bytes(range(256)) * 3
+    for n in (0, 1, 7, 8, 9, 63, 64, 65, len(data)):
+        assert leveldb.crc32c(data[:n], 12345) == _crc_bytewise(data[:n], 12345)
+
+
+def test_records_split_across_blocks():
+    records = [b'a' * 100, os.urandom(BLOCK_SIZE * 2 + 123), b'b' * (BLOCK_SIZE - 100 - 2 * HEADER_SIZE - 3)]
+    data = _log(records)
+    assert leveldb.read_records(data) == records
+
+
+def test_truncated_tail_is_ignored():
+    data = _log([b'first', b'second' * 10])
+    assert leveldb.read_records(data[:-5]) == [b'first']
+
+
+def test_bad_crc():
+    data = bytearray(_log([b'payload']))
+    data[-1] ^= 0xFF
+    with pytest.raises(ValueError):
+        leveldb.read_records(bytes(data))
+
+
+def _leveldb_dir(path, files):
+    os.makedirs(path, exist_ok=True)
+    edits = [
+        _edit(log_number=1, new_files=[(0, 3, 10), (0, 4, 10)]),
+        _edit(log_number=5, new_files=[(1, 6, 10)], deleted_files=[(0, 3)]),
+    ]
+    with open(os.path.join(path, 'MANIFEST-000002'), 'wb') as f:
+        f.write(_log(edits))
+    with open(os.path.join(path, 'CURRENT'), 'w') as f:
+        f.write('MANIFEST-000002\n')
+    for name in files:
+        with open(os.path.join(path, name), 'wb') as f:
+            f.write(b'x')
+    return {name: os.stat(os.path.join(path, name))
+            for name in os.listdir(path)}
+
+
+def test_obsolete_files(tmp_path):
+    files = _leveldb_dir(str(tmp_path / 'db'), ['000003.ldb', '000004.ldb', '000006.ldb',
+                                                '000001.log', '000005.log', 'LOG', 'LOG.old', 'LOCK'])
+    files = {'db/' + name: st for name, st in files.items()}
+    assert leveldb.obsolete_files(str(tmp_path), files) == {'db/000003.ldb', 'db/000001.log', 'db/LOG.old'}
+
+
+def test_missing_table_keeps_everything(tmp_path):
+    files = _leveldb_dir(str(tmp_path), ['000003.ldb', '000004.ldb', '000001.log', '000005.log'])
+    assert leveldb.obsolete_files(str(tmp_path), files) == set()
+
+
+def test_corrupt_manifest_keeps_everything(tmp_path):
+    files = _leveldb_dir(str(tmp_path), ['000003.ldb', '000004.ldb', '000006.ldb', '000001.log'])
+    path = os.path.join(str(tmp_path), 'MANIFEST-000002')
+    with open(path, 'r+b') as f:
+        f.seek(HEADER_SIZE + 1)
+        f.write(b'\xff')
+    files = {name: os.stat(os.path.join(str(tmp_path), name)) for name in files}
+    assert leveldb.obsolete_files(str(tmp_path), files) == set()
+
+
+def test_version_cache_follows_appends(tmp_path):
+    directory = str(tmp_path)
+    _leveldb_dir(directory, [])
+    assert leveldb.read_version(directory).table_numbers == {4, 6}
+    with open(os.path.join(directory, 'MANIFEST-000002'), 'ab') as f:
+        f.write(_log([_edit(deleted_files=[(0, 4)])]))
+    assert leveldb.read_version(directory).table_numbers == {6}
@@ -0,0 +1,8 @@
+from windsurf_core import metrics
+
+
+def test_sample_keeps_full_precision():
+    assert metrics._sample('profile_size_bytes', (('profile', 'a'),), 123456789).endswith(' 123456789')
+    assert metrics._sample('x', (), 1234567.25).endswith(' 1234567.25')
+    assert metrics._sample('x', (), 0.5).endswith(' 0.5')
+    assert metrics._sample('x', (), float('nan')).endswith(' NaN')
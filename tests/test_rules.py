@@ -0,0 +1,29 @@
+import json
+
+from windsurf_core import rules
+
+
+def _load(tmp_path, data):
+    with open(rules.rules_path(str(tmp_path)), 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return rules.load(str(tmp_path))
+
+
+def test_missing_only_keeps_default(tmp_path):
+    ruleset = _load(tmp_path, {'version': rules.RULES_VERSION,
+                               'rules': [{'root': 'globalStorage', 'glob': '*.tmp'}]})
+    assert ruleset.error is None
+    assert ruleset.only == {name: tuple(files) for name, files in rules.DEFAULT_ONLY.items()}
+    assert [rule.spec for rule in ruleset.rules] == [{'root': 'globalStorage', 'glob': '*.tmp'}]
+
+
+def test_missing_rules_keeps_default(tmp_path):
+    ruleset = _load(tmp_path, {'version': rules.RULES_VERSION, 'only': {'codeium': ['installation_id']}})
+    assert [rule.spec for rule in ruleset.rules] == rules.DEFAULT_RULES
+    assert ruleset.only == {'codeium': ('installation_id',)}
+
+
+def test_explicit_empty_values(tmp_path):
+    ruleset = _load(tmp_path, {'version': rules.RULES_VERSION, 'rules': [], 'only': {}})
+    assert ruleset.rules == []
+    assert ruleset.only == {}
@@ -0,0 +1,62 @@
+import os
+import time
+
+from windsurf_core import blockdelta, procs
+from windsurf_core import codec as codecs
+from windsurf_core.store import DELTA, STALE_TMP_SECONDS, BlobStore, hash_file
+
+PAGE = blockdelta.DEFAULT_BLOCK_SIZE
+
+
+def _pages(count):
+    """每页内容不同、可压缩的数据"""
+    return [(b'page %04d ' % i) * (PAGE // 10) + b'x' * (PAGE % 10) for i in range(count)]
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def test_readable_out_of_order_delta_over_compressed_base(tmp_path):
+    store = BlobStore(str(tmp_path / 'profiles'), codec=codecs.ZLIB)
+    pages = _pages(32)
+    base, _ = store.put_file(_write(tmp_path / 'base', b''.join(pages)))
+    assert store.locate(base)[1] == codecs.ZLIB
+
+    target = b''.join(reversed(pages)) + b'tail'
+    target_path = _write(tmp_path / 'target', target)
+    digest = hash_file(target_path)
+    assert store.adopt(target_path, base=base) == digest
+    path, codec = store.locate(digest)
+    assert codec == DELTA
+    assert not blockdelta.copies_in_order(path)
+
+    with store.readable(digest) as plain:
+        assert os.path.exists(plain)
+        assert hash_file(plain) == digest
+    assert store.hash_blob(digest) == digest
+    assert os.listdir(store.tmp_dir) == []
+
+    restored = str(tmp_path / 'restored')
+    assert store.copy_to(digest, restored) == DELTA
+    assert hash_file(restored) == digest
+
+
+def test_sweep_keeps_temp_files_of_live_processes(tmp_path):
+    store = BlobStore(str(tmp_path / 'profiles'))
+    live = {p.pid for p in procs.list_processes()}
+    dead = next(pid for pid in range(4000000, 1, -1) if pid not in live)
+    own = _write(store.new_tmp_path('.read'), b'in flight')
+    other = _write(os.path.join(store.tmp_dir, f"{os.getppid()}-1-0"), b'other process')
+    orphan = _write(os.path.join(store.tmp_dir, f"{dead}-1-0"), b'dead process')
+    old = _write(os.path.join(store.tmp_dir, f"{os.getppid()}-1-1"), b'abandoned')
+    stale = time.time() - STALE_TMP_SECONDS - 60
+    os.utime(old, (stale, stale))
+
+    store.sweep()
+    assert os.path.exists(own)
+    assert os.path.exists(other)
+    assert not os.path.exists(orphan)
+    assert not os.path.exists(old)
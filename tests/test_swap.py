@@ -0,0 +1,138 @@
+import os
+
+import pytest
+
+from windsurf_core import swap
+from windsurf_core.swap import SwapTransaction
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    return path
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_touch_applied_on_commit(tmp_path):
+    live = _write(str(tmp_path / 'data' / 'a'), 'a')
+    before = os.stat(live).st_mtime_ns
+    txn = SwapTransaction()
+    txn.stage_touch(live, 1000000000)
+    assert os.stat(live).st_mtime_ns == before
+    txn.commit()
+    assert os.stat(live).st_mtime_ns == 1000000000
+
+
+def test_touch_reverted_when_commit_fails(tmp_path, monkeypatch):
+    touched = _write(str(tmp_path / 'data' / 'a'), 'a')
+    before = os.stat(touched).st_mtime_ns
+    replaced = _write(str(tmp_path / 'data' / 'b'), 'old')
+    txn = SwapTransaction()
+    txn.stage_touch(touched, 1000000000)
+    _write(txn.stage_file(replaced), 'new')
+
+    real_utime = os.utime
+
+    def failing_utime(path, *args, **kwargs):
+        real_utime(path, *args, **kwargs)
+        if kwargs.get('ns') == (1000000000, 1000000000):
+            raise OSError('utime failed')
+    monkeypatch.setattr(swap.os, 'utime', failing_utime)
+    with pytest.raises(OSError):
+        txn.commit()
+    monkeypatch.undo()
+    assert os.stat(touched).st_mtime_ns == before
+    assert _read(replaced) == 'old'
+    assert sorted(os.listdir(tmp_path / 'data')) == ['a', 'b']
+
+
+def _tree(path):
+    return {os.path.relpath(os.path.join(d, f), path): _read(os.path.join(d, f))
+            for d, _, files in os.walk(path) for f in files}
+
+
+def _stage_two_dirs(tmp_path):
+    a = str(tmp_path / 'a')
+    b = str(tmp_path / 'b')
+    _write(os.path.join(a, 'f'), 'old a')
+    _write(os.path.join(b, 'f'), 'old b')
+    txn = SwapTransaction()
+    _write(os.path.join(txn.stage_dir(a), 'f'), 'new a')
+    _write(os.path.join(txn.stage_dir(b), 'f'), 'new b')
+    return txn, a, b
+
+
+def _fail_on_rename(monkeypatch, n, exc=OSError('rename failed')):
+    real_rename = os.rename
+    calls = []
+
+    def rename(src, dst):
+        calls.append((src, dst))
+        if len(calls) == n:
+            raise exc
+        real_rename(src, dst)
+    monkeypatch.setattr(swap.os, 'rename', rename)
+
+
+def test_commit_replaces_all(tmp_path):
+    txn, a, b = _stage_two_dirs(tmp_path)
+    txn.commit()
+    assert _read(os.path.join(a, 'f')) == 'new a'
+    assert _read(os.path.join(b, 'f')) == 'new b'
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b']
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 4])
+def test_failed_commit_rolls_back(tmp_path, monkeypatch, n):
+    txn, a, b = _stage_two_dirs(tmp_path)
+    _fail_on_rename(monkeypatch, n)
+    with pytest.raises(OSError):
+        txn.commit()
+    monkeypatch.undo()
+    assert _read(os.path.join(a, 'f')) == 'old a'
+    assert _read(os.path.join(b, 'f')) == 'old b'
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b']
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 4])
+def test_recover_after_interrupted_commit(tmp_path, monkeypatch, n):
+    txn, a, b = _stage_two_dirs(tmp_path)
+    # 模拟进程在替换中途被结束: 没有机会撤销
+    monkeypatch.setattr(txn, '_rollback', lambda: None)
+    monkeypatch.setattr(txn, 'abort', lambda: None)
+    _fail_on_rename(monkeypatch, n, KeyboardInterrupt())
+    with pytest.raises(KeyboardInterrupt):
+        txn.commit()
+    monkeypatch.undo()
+    swap.recover(a)
+    swap.recover(b)
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b']
+    # 每个目录要么还是旧数据，要么已经是完整的新数据
+    assert _tree(a) in ({'f': 'old a'}, {'f': 'new a'})
+    assert _tree(b) in ({'f': 'old b'}, {'f': 'new b'})
+    if n <= 2:
+        assert _tree(a) == {'f': 'old a'}
+
+
+def test_carry_keeps_unmanaged_entries(tmp_path):
+    live = str(tmp_path / 'a')
+    _write(os.path.join(live, 'managed'), 'old')
+    _write(os.path.join(live, 'cache', 'x'), 'keep')
+    txn = SwapTransaction()
+    staged = txn.stage_dir(live)
+    _write(os.path.join(staged, 'managed'), 'new')
+    txn.carry(staged, ['cache'])
+    txn.commit()
+    assert _tree(live) == {'managed': 'new', os.path.join('cache', 'x'): 'keep'}
+
+
+def test_abort_leaves_live_untouched(tmp_path):
+    txn, a, b = _stage_two_dirs(tmp_path)
+    txn.abort()
+    assert _read(os.path.join(a, 'f')) == 'old a'
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b']
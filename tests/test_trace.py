@@ -0,0 +1,17 @@
+import logging
+
+from windsurf_core import trace
+
+
+def test_warning_goes_to_logging_and_trace(caplog):
+    spans = []
+    trace.add_listener(spans.append)
+    try:
+        with caplog.at_level(logging.WARNING, logger='windsurf_core'):
+            trace.warning('写入失败', path='x')
+    finally:
+        trace._tracer._listeners.remove(spans.append)
+    assert '写入失败' in caplog.text
+    assert [(sp.name, sp.attrs) for sp in spans] == [('warning', {'message': '写入失败', 'path': 'x'})]
+    with trace.profiled_thread():
+        pass
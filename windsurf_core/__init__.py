@@ -0,0 +1,4 @@
+"""
+Windsurf 账号切换器 - 平台无关的核心模块
+Windows 与 Mac 两个版本共用这里的 Profile 存储与还原逻辑。
+"""
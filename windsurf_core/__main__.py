@@ -0,0 +1,7 @@
+"""python -m windsurf_core: 命令行入口"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+账号信息读取
+从 state.vscdb 的 ItemTable 中读取 windsurfAuthStatus。
+数据库以只读 URI 打开，不会创建 -wal / -shm；解码结果按文件的
+(inode, size, mtime_ns) 缓存，文件没有变化时不再打开数据库。
+既可以读取本机正在使用的数据库，也可以直接读取已保存 Profile 中的 state.vscdb。
+保存 Profile 时登录状态记入 profile_meta.json 和索引，列表直接使用记录的状态；
+只有没有记录的旧 Profile 才需要从存储中取出 state.vscdb 读取。
+"""
+
+import os
+import json
+import sqlite3
+import threading
+
+from . import sqlite_snapshot, trace
+
+AUTH_KEY = 'windsurfAuthStatus'
+STATE_DB_NAME = 'state.vscdb'
+
+# Profile 中账号的登录状态
+STATUS_CURRENT = '当前账号'
+STATUS_SIGNED_IN = '已登录'
+STATUS_SIGNED_OUT = '未登录'
+STATUS_UNKNOWN = '未知'
+
+
+def _db_signature(path):
+    """数据库及 -wal 的 (inode, size, mtime_ns)；数据库不存在返回 None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+    try:
+        wal = os.stat(path + '-wal')
+        sig += (wal.st_ino, wal.st_size, wal.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return sig
+
+
+def read_auth_status(path, immutable=False):
+    """
+    读取并解码 windsurfAuthStatus
+    返回:
+        dict: 账号信息；没有该键时返回 None
+    """
+    with trace.span('sqlite.read_auth', path=path, immutable=immutable):
+        conn = sqlite_snapshot.open_readonly(path, immutable=immutable)
+        try:
+            row = conn.execute("SELECT value FROM ItemTable WHERE key = ?", (AUTH_KEY,)).fetchone()
+        finally:
+            conn.close()
+    if not row or row[0] is None:
+        return None
+    value = row[0]
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    return json.loads(value)
+
+
+def login_status(email, current_email=None):
+    """
+    按 Profile 中账号的邮箱给出登录状态
+    参数:
+        email: Profile 中登录的邮箱，未登录为 None
+        current_email: 本机当前账号邮箱，相同时显示为当前账号
+    """
+    if not email:
+        return STATUS_SIGNED_OUT
+    if current_email and email == current_email:
+        return STATUS_CURRENT
+    return STATUS_SIGNED_IN
+
+
+def manifest_state_db(manifest):
+    """manifest 中 state.vscdb 的 Blob 哈希，没有时返回 None"""
+    if not manifest:
+        return None
+    for root in manifest['roots'].values():
+        entry = root['files'].get(STATE_DB_NAME)
+        if entry is not None:
+            return entry['hash']
+    return None
+
+
+class AccountReader:
+    """带缓存的账号信息读取"""
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def auth_status(self, path):
+        """
+        读取数据库中的账号信息 (带缓存)
+        返回:
+            dict 或 None: 数据库不存在、没有登录信息或读取失败时返回 None
+        """
+        sig = _db_signature(path)
+        if sig is None:
+            return None
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        # 有 -wal 时最新的写入可能还没合并到主文件，不能用 immutable 跳过 -wal
+        immutable = len(sig) == 3
+        try:
+            status = read_auth_status(path, immutable=immutable)
+        except (sqlite3.Error, ValueError) as e:
+            trace.warning(f"读取账号信息失败: {e}")
+            return None
+        # 读取期间文件被改动时不缓存，下次重新读取
+        if _db_signature(path) == sig:
+            with self._lock:
+                self._cache[key] = (sig, status)
+        return status
+
+    def account(self, path):
+        """
+        返回:
+            (name, email): 账号名称和邮箱，读取失败返回 (None, None)
+        """
+        status = self.auth_status(path)
+        if not status:
+            return None, None
+        return status.get('name', '未知'), status.get('email', '未知')
+
+    def signed_in(self, path):
+        """数据库中是否有登录的账号 (保存 Profile 时记入 meta)"""
+        status = self.auth_status(path)
+        return bool(status and status.get('email'))
+
+    def blob_status(self, store, digest):
+        """读取存储中某个 state.vscdb Blob 的账号信息 (Blob 内容不会变化，可以 immutable 打开)"""
+        if digest is None:
+            return None
+        key = ('blob', digest)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        try:
+            with store.readable(digest) as path:
+                status = read_auth_status(path, immutable=True)
+        except (OSError, sqlite3.Error, ValueError):
+            status = None
+        with self._lock:
+            self._cache[key] = status
+        return status
+
+    def profile_status(self, store, profile_path, digest=None, current_email=None):
+        """
+        Profile 中保存的登录状态
+        参数:
+            profile_path: Profile 目录 (旧版整目录复制的 Profile 直接读取其中的 state.vscdb)
+            digest: Profile 中 state.vscdb 的 Blob 哈希 (manifest_state_db)
+            current_email: 本机当前账号邮箱，相同时显示为当前账号
+        """
+        if digest is not None:
+            status = self.blob_status(store, digest)
+        else:
+            for path in (os.path.join(profile_path, 'globalStorage', STATE_DB_NAME),
+                         os.path.join(profile_path, STATE_DB_NAME)):
+                if os.path.exists(path):
+                    status = self.auth_status(path)
+                    break
+            else:
+                return STATUS_UNKNOWN
+        return login_status(status.get('email') if status else None, current_email)
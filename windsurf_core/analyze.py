@@ -0,0 +1,295 @@
+"""
+占用空间分析
+回答 "为什么这个 Profile 有 900 MB" 这类问题:
+- analyze_live: 用 os.scandir 遍历本机的 Windsurf 数据位置，直接使用 DirEntry 自带的类型和 stat 结果
+  (Windows 上枚举目录时已经取得，不再逐个调用 stat)，各目录分给多个线程并行扫描
+- analyze_manifest: 按已保存 Profile 的 manifest 统计，不读取存储中的文件
+两者都给出每个数据位置的大小、最大的 N 个文件和目录，以及按当前保存范围规则被排除的大小。
+"""
+
+import os
+import heapq
+import queue
+import threading
+
+from . import trace
+from .transfer import DEFAULT_WORKERS
+from .worker import Progress
+
+DEFAULT_TOP = 20
+
+
+class _Totals:
+    """一个数据位置的统计"""
+
+    def __init__(self, label):
+        self.label = label
+        self.files = 0
+        self.bytes = 0
+        self.excluded_files = 0
+        self.excluded_bytes = 0
+        self.stored_bytes = None
+
+    def add(self, size, excluded, files=1):
+        if excluded:
+            self.excluded_files += files
+            self.excluded_bytes += size
+        else:
+            self.files += files
+            self.bytes += size
+
+    def to_dict(self):
+        row = {'root': self.label, 'files': self.files, 'bytes': self.bytes,
+               'excluded_files': self.excluded_files, 'excluded_bytes': self.excluded_bytes}
+        if self.stored_bytes is not None:
+            row['stored_bytes'] = self.stored_bytes
+        return row
+
+
+def _report(totals, files, dirs, top, errors=0):
+    """
+    汇总为报告
+    参数:
+        files: [(size, label, rel, excluded), ...] (可以只包含各线程的前 top 个)
+        dirs: {(label, rel): [files, bytes, excluded]}，只含目录本身直接包含的文件
+    """
+    # 每个目录的大小累加到所有上级目录
+    cumulative = {}
+    for (label, rel), (count, size, excluded) in dirs.items():
+        if not rel:
+            # 数据位置本身的大小另外列出
+            continue
+        parts = rel.split('/')
+        for i in range(1, len(parts) + 1):
+            key = (label, '/'.join(parts[:i]))
+            entry = cumulative.setdefault(key, [0, 0, False])
+            entry[0] += count
+            entry[1] += size
+        if excluded:
+            cumulative[(label, rel)][2] = True
+    # 被排除的目录之下的子目录同样属于被排除的部分
+    for (label, rel), entry in cumulative.items():
+        if entry[2]:
+            continue
+        parts = rel.split('/')
+        entry[2] = any(cumulative.get((label, '/'.join(parts[:i])), (0, 0, False))[2]
+                       for i in range(1, len(parts)))
+    top_dirs = heapq.nlargest(top, cumulative.items(), key=lambda item: item[1][1])
+    top_files = heapq.nlargest(top, files)
+    rows = [t.to_dict() for t in totals]
+    return {
+        'roots': rows,
+        'bytes': sum(r['bytes'] for r in rows),
+        'files': sum(r['files'] for r in rows),
+        'excluded_bytes': sum(r['excluded_bytes'] for r in rows),
+        'excluded_files': sum(r['excluded_files'] for r in rows),
+        'top_files': [{'root': label, 'path': rel, 'bytes': size, 'excluded': excluded}
+                      for size, label, rel, excluded in top_files],
+        'top_dirs': [{'root': label, 'path': rel, 'files': count, 'bytes': size, 'excluded': excluded}
+                     for (label, rel), (count, size, excluded) in top_dirs],
+        'errors': errors,
+    }
+
+
+# ------------------------------------------------------------
+# 本机数据
+# ------------------------------------------------------------
+class _Walker:
+    """多线程遍历目录树: 每个目录是一个任务，扫描时发现的子目录放回队列"""
+
+    def __init__(self, workers, progress, top):
+        self.workers = workers
+        self.progress = progress
+        self.top = top
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.dirs = {}
+        self.files = []
+        self.errors = 0
+
+    def submit(self, totals, matcher, path, rel, excluded):
+        self.progress.add(0)
+        self.queue.put((totals, matcher, path, rel, excluded))
+
+    def _scan(self, totals, matcher, path, rel_dir, excluded):
+        count = size_sum = 0
+        kept = [0, 0]
+        dropped = [0, 0]
+        largest = []
+        try:
+            it = os.scandir(path)
+        except OSError:
+            with self.lock:
+                self.errors += 1
+            return
+        with it:
+            for entry in it:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        hidden = excluded or matcher.excluded(rel, entry.name, True) is not None
+                        self.submit(totals, matcher, entry.path, rel, hidden)
+                        continue
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    with self.lock:
+                        self.errors += 1
+                    continue
+                hidden = excluded or matcher.excluded(rel, entry.name, False, size) is not None
+                count += 1
+                size_sum += size
+                counter = dropped if hidden else kept
+                counter[0] += 1
+                counter[1] += size
+                item = (size, totals.label, rel, hidden)
+                if len(largest) < self.top:
+                    heapq.heappush(largest, item)
+                elif item > largest[0]:
+                    heapq.heapreplace(largest, item)
+        with self.lock:
+            totals.add(kept[1], False, kept[0])
+            totals.add(dropped[1], True, dropped[0])
+            self.dirs[(totals.label, rel_dir)] = [count, size_sum, excluded]
+            self.files.extend(largest)
+
+    def _run(self):
+        with trace.profiled_thread():
+            while True:
+                task = self.queue.get()
+                if task is None:
+                    self.queue.task_done()
+                    return
+                try:
+                    if not self.progress.cancelled:
+                        self._scan(*task)
+                        self.progress.advance(0)
+                finally:
+                    self.queue.task_done()
+
+    def run(self):
+        threads = [threading.Thread(target=self._run, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        self.queue.join()
+        for _ in threads:
+            self.queue.put(None)
+        for t in threads:
+            t.join()
+        self.progress.check()
+
+
+def analyze_live(roots, top=DEFAULT_TOP, workers=None, progress=None):
+    """
+    统计本机 Windsurf 数据位置的占用
+    被规则排除的目录同样会遍历，以便给出排除的大小。
+    参数:
+        roots: Root 列表 (带有当前规则)
+        top: 列出最大的文件 / 目录数
+        workers: 扫描线程数，默认 transfer.DEFAULT_WORKERS
+        progress: worker.Progress
+    返回:
+        dict: roots ([{'root', 'files', 'bytes', 'excluded_files', 'excluded_bytes'}, ...])、
+              files / bytes / excluded_files / excluded_bytes (合计)、
+              top_files ([{'root', 'path', 'bytes', 'excluded'}, ...])、
+              top_dirs ([{'root', 'path', 'files', 'bytes', 'excluded'}, ...]，大小包括子目录)、
+              errors (无法读取的条目数)
+    """
+    progress = progress or Progress()
+    progress.begin('分析大小')
+    walker = _Walker(workers or DEFAULT_WORKERS, progress, top)
+    totals = []
+    with trace.span('analyze.live') as sp:
+        for root in roots:
+            t = _Totals(root.label)
+            totals.append(t)
+            if root.partial:
+                # 与其他位置共用目录，只统计管理的文件
+                for name in root.only:
+                    try:
+                        size = os.stat(os.path.join(root.path, name)).st_size
+                    except OSError:
+                        continue
+                    t.add(size, False)
+                    walker.files.append((size, root.label, name, False))
+            elif os.path.isdir(root.path):
+                walker.submit(t, root.matcher, root.path, '', False)
+        walker.run()
+        report = _report(totals, walker.files, walker.dirs, top, walker.errors)
+        sp.add(files=report['files'] + report['excluded_files'],
+               bytes=report['bytes'] + report['excluded_bytes'])
+    return report
+
+
+# ------------------------------------------------------------
+# 已保存的 Profile
+# ------------------------------------------------------------
+def analyze_manifest(manifest, roots, store=None, top=DEFAULT_TOP):
+    """
+    按 manifest 统计已保存 Profile 的占用
+    参数:
+        roots: Root 列表，用于显示名称和判断哪些文件按当前规则会被排除
+        store: 传入 BlobStore 时给出每个位置在存储中实际占用的大小 (压缩后，位置内去重)
+    返回:
+        同 analyze_live，roots 的每一项另有 stored_bytes
+    """
+    by_name = {root.name: root for root in roots}
+    totals = []
+    files = []
+    dirs = {}
+    for name, saved in manifest['roots'].items():
+        root = by_name.get(name)
+        t = _Totals(root.label if root else name)
+        totals.append(t)
+        cache = {}
+        digests = set()
+        for rel, entry in saved['files'].items():
+            excluded = (root is not None and not root.partial
+                        and root.matcher.excludes_path(rel, size=entry['size'], cache=cache))
+            t.add(entry['size'], excluded)
+            files.append((entry['size'], t.label, rel, excluded))
+            rel_dir = rel.rsplit('/', 1)[0] if '/' in rel else ''
+            d = dirs.setdefault((t.label, rel_dir), [0, 0, False])
+            d[0] += 1
+            d[1] += entry['size']
+            digests.add(entry['hash'])
+        for (label, rel_dir), d in dirs.items():
+            if label == t.label and rel_dir:
+                d[2] = cache.get(rel_dir, False)
+        if store is not None:
+            t.stored_bytes = sum(store.stored_size(digest) for digest in digests)
+    return _report(totals, files, dirs, top)
+
+
+def format_breakdown(sizes, excluded_bytes=0):
+    """
+    各数据位置的大小压缩成一行 (MB，从大到小，省略为 0 的位置)，用于列表中的占用明细列
+    参数:
+        sizes: {数据位置: 字节数}
+        excluded_bytes: 按当前规则排除的字节数 (只有分析过的配置才有)
+    """
+    mb = 1048576
+    parts = [f"{name} {size / mb:.1f}" for name, size in sorted(sizes.items(), key=lambda item: -item[1]) if size]
+    if excluded_bytes:
+        parts.append(f"排除 {excluded_bytes / mb:.1f}")
+    return ' / '.join(parts)
+
+
+def format_report(report, limit=10):
+    """整理成提示用的文本行"""
+    mb = 1048576
+    lines = []
+    for row in report['roots']:
+        line = f"{row['root']}: {row['bytes'] / mb:.1f} MB，{row['files']} 个文件"
+        if 'stored_bytes' in row:
+            line += f" (存储占用 {row['stored_bytes'] / mb:.1f} MB)"
+        if row['excluded_files']:
+            line += f"，规则排除 {row['excluded_bytes'] / mb:.1f} MB"
+        lines.append(line)
+    lines.append(f"合计 {report['bytes'] / mb:.1f} MB，规则排除 {report['excluded_bytes'] / mb:.1f} MB")
+    for title, key in (('最大的目录', 'top_dirs'), ('最大的文件', 'top_files')):
+        if report[key]:
+            lines.append(f"{title}:")
+        for item in report[key][:limit]:
+            mark = ' (已排除)' if item['excluded'] else ''
+            lines.append(f"  {item['bytes'] / mb:8.1f} MB  {item['root']}/{item['path']}{mark}")
+    return lines
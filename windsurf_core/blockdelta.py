@@ -0,0 +1,311 @@
+"""
+按块差异存储
+state.vscdb 和 Cookies 是每个 Profile 中最大的单个文件，两次保存之间通常只有少数页面变化。
+新快照按 SQLite 页大小切成对齐的块，与基准版本逐块比对 (rsync 式: 先比弱校验和 adler32，
+命中后再用 BLAKE2b 确认)，只保存变化的块，其余块记录为 "复制基准的第 N 块"。
+SQLite 的页面不会在文件中错位移动，所以只需在页边界上比对，弱校验和不必逐字节滚动；
+被移动到其他页号的页面 (如 VACUUM 之后) 仍然能通过签名表找到。
+还原时按顺序读取差异文件，把基准块和新块直接流式写入目标文件。
+差异文件格式:
+    MAGIC | u32 头部长度 | 头部 JSON (base、block_size、size、codec)
+    之后是一串操作: u8 类型 | u32 起始块 | u32 块数 [| u64 长度 | 压缩后的新块数据]
+"""
+
+import json
+import zlib
+import struct
+import hashlib
+
+from . import codec as codecs
+from .sqlite_snapshot import SQLITE_HEADER
+
+MAGIC = b'WSDELTA\x01'
+
+OP_COPY = 0
+OP_LITERAL = 1
+
+_OP = struct.Struct('<BII')
+_LEN = struct.Struct('<Q')
+_HEADER_LEN = struct.Struct('<I')
+
+DEFAULT_BLOCK_SIZE = 4096
+
+# 一段新块数据最多包含的块数 (还原时一次解压到内存中的大小有上限)
+MAX_LITERAL_BLOCKS = 256
+
+# 新块超过该比例时差异存储没有意义，改为保存完整文件
+MAX_LITERAL_RATIO = 0.5
+
+STRONG_DIGEST_SIZE = 16
+
+
+def page_size(path):
+    """SQLite 数据库的页大小；不是 SQLite 数据库时返回 DEFAULT_BLOCK_SIZE"""
+    with open(path, 'rb') as f:
+        header = f.read(100)
+    if len(header) < 100 or not header.startswith(SQLITE_HEADER):
+        return DEFAULT_BLOCK_SIZE
+    size = int.from_bytes(header[16:18], 'big')
+    if size == 1:
+        size = 65536
+    if size < 512 or size > 65536 or size & (size - 1):
+        return DEFAULT_BLOCK_SIZE
+    return size
+
+
+def _strong(block):
+    return hashlib.blake2b(block, digest_size=STRONG_DIGEST_SIZE).digest()
+
+
+def iter_blocks(chunks, block_size):
+    """把任意大小的数据块重新切成 block_size 大小 (最后一块可能较短)"""
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        if len(buf) < block_size:
+            continue
+        whole = len(buf) - len(buf) % block_size
+        for offset in range(0, whole, block_size):
+            yield bytes(buf[offset:offset + block_size])
+        del buf[:whole]
+    if buf:
+        yield bytes(buf)
+
+
+class Signatures:
+    """基准版本每一块的弱校验和与强校验和"""
+
+    def __init__(self, chunks, block_size):
+        self.block_size = block_size
+        self.weak = {}
+        self.strong = []
+        for index, block in enumerate(iter_blocks(chunks, block_size)):
+            strong = _strong(block)
+            self.strong.append(strong)
+            self.weak.setdefault(zlib.adler32(block), {}).setdefault(strong, index)
+
+    def find(self, block, prefer):
+        """
+        查找与 block 内容相同的基准块
+        参数:
+            prefer: 优先使用的块号 (上一块的下一块，能接上连续的复制)
+        返回:
+            int 或 None
+        """
+        candidates = self.weak.get(zlib.adler32(block))
+        if candidates is None:
+            return None
+        strong = _strong(block)
+        if prefer < len(self.strong) and self.strong[prefer] == strong:
+            return prefer
+        return candidates.get(strong)
+
+
+class _Encoder:
+    def __init__(self, out, codec):
+        self.out = out
+        self.codec = codec
+        self.copy = None       # [start, count]
+        self.literal = []      # 待写入的新块
+        self.literal_start = 0
+
+    def add_copy(self, start):
+        self.flush_literal()
+        if self.copy is not None and self.copy[0] + self.copy[1] == start:
+            self.copy[1] += 1
+            return
+        self.flush_copy()
+        self.copy = [start, 1]
+
+    def add_literal(self, index, block):
+        self.flush_copy()
+        if not self.literal:
+            self.literal_start = index
+        self.literal.append(block)
+        if len(self.literal) >= MAX_LITERAL_BLOCKS:
+            self.flush_literal()
+
+    def flush_copy(self):
+        if self.copy is not None:
+            self.out.write(_OP.pack(OP_COPY, self.copy[0], self.copy[1]))
+            self.copy = None
+
+    def flush_literal(self):
+        if not self.literal:
+            return
+        payload = codecs.compress_bytes(b''.join(self.literal), self.codec)
+        self.out.write(_OP.pack(OP_LITERAL, self.literal_start, len(self.literal)))
+        self.out.write(_LEN.pack(len(payload)))
+        self.out.write(payload)
+        self.literal = []
+
+    def close(self):
+        self.flush_copy()
+        self.flush_literal()
+
+
+def encode(base_chunks, target, dst, base, codec=codecs.RAW, block_size=None, hasher=None):
+    """
+    生成 target 相对于基准内容的差异文件
+    参数:
+        base_chunks: 基准内容 (逐块产出的 bytes)
+        target: 新文件路径
+        dst: 差异文件路径
+        base: 基准的 Blob 哈希 (写入头部)
+        codec: 新块数据的压缩方式
+        block_size: 块大小，默认按 target 的 SQLite 页大小
+        hasher: 可选的哈希对象，target 的内容会同时送入
+    返回:
+        dict: blocks (总块数)、copied / literal (复用 / 新写入的块数)、size (target 大小)
+    """
+    block_size = block_size or page_size(target)
+    sigs = Signatures(base_chunks, block_size)
+    stats = {'blocks': 0, 'copied': 0, 'literal': 0, 'size': 0}
+    with open(target, 'rb') as fin, open(dst, 'wb') as out:
+        out.write(MAGIC)
+        # 头部的 size 在写完后回填，先按固定宽度占位
+        placeholder = b'"size": "%020d"'
+        header = json.dumps({'base': base, 'block_size': block_size, 'codec': codec,
+                             'size': '%020d' % 0}).encode('utf-8')
+        out.write(_HEADER_LEN.pack(len(header)))
+        header_offset = out.tell()
+        out.write(header)
+        encoder = _Encoder(out, codec)
+        prefer = 0
+        chunks = iter(lambda: fin.read(codecs.CHUNK_SIZE), b'')
+        for index, block in enumerate(iter_blocks(chunks, block_size)):
+            if hasher is not None:
+                hasher.update(block)
+            stats['blocks'] += 1
+            stats['size'] += len(block)
+            # 强校验和相同即内容和长度都相同，最后一个不完整的块只会匹配基准中同样不完整的最后一块
+            found = sigs.find(block, prefer)
+            if found is None:
+                encoder.add_literal(index, block)
+                stats['literal'] += 1
+            else:
+                encoder.add_copy(found)
+                stats['copied'] += 1
+                prefer = found + 1
+        encoder.close()
+        out.seek(header_offset)
+        out.write(header.replace(placeholder % 0, placeholder % stats['size']))
+    return stats
+
+
+def read_header(f):
+    """读取差异文件头部 (f 为以二进制打开的文件，读完后位于第一个操作处)"""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("不是差异文件")
+    length, = _HEADER_LEN.unpack(f.read(_HEADER_LEN.size))
+    header = json.loads(f.read(length).decode('utf-8'))
+    header['size'] = int(header['size'])
+    return header
+
+
+def read_base(path):
+    """差异文件的基准 Blob 哈希"""
+    with open(path, 'rb') as f:
+        return read_header(f)['base']
+
+
+def _iter_ops(f):
+    while True:
+        raw = f.read(_OP.size)
+        if not raw:
+            return
+        if len(raw) < _OP.size:
+            raise ValueError("差异文件被截断")
+        kind, start, count = _OP.unpack(raw)
+        if kind == OP_COPY:
+            yield kind, start, count, None
+        elif kind == OP_LITERAL:
+            length, = _LEN.unpack(f.read(_LEN.size))
+            yield kind, start, count, f.read(length)
+        else:
+            raise ValueError(f"未知的差异操作 {kind}")
+
+
+def copies_in_order(path):
+    """复制操作的基准块号是否单调不减 (可以顺序读取基准，不需要随机访问)"""
+    last = 0
+    with open(path, 'rb') as f:
+        read_header(f)
+        while True:
+            raw = f.read(_OP.size)
+            if not raw:
+                return True
+            kind, start, count = _OP.unpack(raw)
+            if kind == OP_LITERAL:
+                length, = _LEN.unpack(f.read(_LEN.size))
+                f.seek(length, 1)
+                continue
+            if start < last:
+                return False
+            last = start + count
+
+
+class FileReader:
+    """按偏移读取基准文件"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def read_at(self, offset, size):
+        self.f.seek(offset)
+        return self.f.read(size)
+
+
+class StreamReader:
+    """按偏移读取顺序产出的基准内容 (偏移只能递增，用于直接从压缩 Blob 流式解压)"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = bytearray()
+        self.pos = 0  # buf[0] 对应的偏移
+
+    def read_at(self, offset, size):
+        if offset < self.pos:
+            raise ValueError("基准只能顺序读取")
+        end = offset + size
+        while self.pos + len(self.buf) < end:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buf += chunk
+        skip = offset - self.pos
+        data = bytes(self.buf[skip:skip + size])
+        del self.buf[:skip + len(data)]
+        self.pos = offset + len(data)
+        return data
+
+
+def iter_content(path, open_reader):
+    """
+    逐段产出差异文件还原后的内容
+    参数:
+        open_reader: open_reader(base, sequential) 返回上下文管理器，得到带 read_at 的基准读取器；
+                     sequential 为 True 时读取偏移单调递增
+    """
+    sequential = copies_in_order(path)
+    with open(path, 'rb') as f:
+        header = read_header(f)
+        block_size = header['block_size']
+        remaining = header['size']
+        with open_reader(header['base'], sequential) as reader:
+            for kind, start, count, payload in _iter_ops(f):
+                if kind == OP_COPY:
+                    # 大段复制分批读取，内存占用有上限
+                    for first in range(start, start + count, MAX_LITERAL_BLOCKS):
+                        n = min(MAX_LITERAL_BLOCKS, start + count - first)
+                        data = reader.read_at(first * block_size, min(n * block_size, remaining))
+                        if len(data) < min(n * block_size, remaining):
+                            raise ValueError("基准内容不完整")
+                        remaining -= len(data)
+                        yield data
+                else:
+                    data = codecs.decompress_bytes(payload, header['codec'])
+                    remaining -= len(data)
+                    yield data
+    if remaining != 0:
+        raise ValueError("差异文件还原后的大小不符")
@@ -0,0 +1,375 @@
+"""
+命令行入口 (不加载 tkinter)
+用法:
+    python -m windsurf_core list
+    python -m windsurf_core save <配置名称> [-y]
+    python -m windsurf_core switch <配置名称> [--version 版本号] [--keys-only] [--force-quit]
+    python -m windsurf_core undo [-y] [--force-quit]
+    python -m windsurf_core delete <配置名称> [-y]
+    python -m windsurf_core history <配置名称> [--delete 版本号]
+    python -m windsurf_core verify <配置名称> | --all
+    python -m windsurf_core metrics [--by-profile] [--days N] [--prometheus FILE]
+    python -m windsurf_core rules [--init]
+    python -m windsurf_core analyze [配置名称] [--top N] [--json]
+任意命令前可加 --profile FILE (cProfile 分析) / --chrome-trace FILE (Chrome trace 时间线)，
+各阶段耗时始终记录在 <Profile 存储目录>/.logs/trace.jsonl。
+"""
+
+import sys
+import json
+import time
+import argparse
+
+from . import analyze, paths, procs, profiles, rules, trace, verify
+from .engine import Engine
+from .worker import Cancelled, Worker, format_progress
+
+COMMANDS = ('list', 'save', 'switch', 'undo', 'delete', 'history', 'verify', 'metrics', 'rules', 'analyze')
+
+# 进度刷新间隔 (秒)
+POLL_INTERVAL = 0.1
+
+
+def wants_cli(argv):
+    """
+    命令行参数是否表示要以命令行模式运行 (带子命令或 -h)
+    macOS 从 Finder 启动时可能带 -psn_xxx 参数，不应被当成命令行模式
+    """
+    return any(arg in COMMANDS for arg in argv) or argv[:1] in (['-h'], ['--help'])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='windsurf_core', description='Windsurf 账号切换器 (命令行)')
+    parser.add_argument('--profiles-dir', default=paths.DEFAULT_PROFILES_DIR, help='Profile 存储目录')
+    parser.add_argument('--platform', choices=(paths.WINDOWS, paths.MAC, paths.LINUX),
+                        help='Windsurf 数据位置所属平台，默认当前平台')
+    trace.add_arguments(parser)
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+
+    sub.add_parser('list', help='列出已保存的配置')
+    p = sub.add_parser('save', help='保存当前账号')
+    p.add_argument('name')
+    p.add_argument('-y', '--force', action='store_true', help='覆盖已有配置时不再确认')
+    p = sub.add_parser('switch', help='切换到已保存的配置 (请先关闭 Windsurf)')
+    p.add_argument('name')
+    p.add_argument('--version', help='切换到历史版本 (版本号见 history 命令)')
+    p.add_argument('--keys-only', action='store_true', help='只同步 state.vscdb 中的登录信息')
+    p.add_argument('--force-quit', action='store_true', help='Windsurf 正在运行时强制关闭后再切换')
+    p = sub.add_parser('undo', help='撤销上次切换，还原切换前自动保存的本机数据')
+    p.add_argument('-y', '--yes', action='store_true', help='不再确认')
+    p.add_argument('--force-quit', action='store_true', help='Windsurf 正在运行时强制关闭后再还原')
+    p = sub.add_parser('delete', help='删除配置')
+    p.add_argument('name')
+    p.add_argument('-y', '--yes', action='store_true', help='不再确认')
+    p = sub.add_parser('history', help='列出配置的历史版本')
+    p.add_argument('name')
+    p.add_argument('--delete', metavar='VERSION', help='删除一个历史版本')
+    p = sub.add_parser('verify', help='核对本机数据是否与配置一致')
+    p.add_argument('name', nargs='?')
+    p.add_argument('--all', action='store_true', help='检查所有已保存的配置在存储中是否完好')
+    p = sub.add_parser('metrics', help='汇总历次操作的耗时和吞吐量')
+    p.add_argument('--by-profile', action='store_true', help='按配置分别汇总')
+    p.add_argument('--days', type=float, help='只统计最近 N 天')
+    p.add_argument('--json', action='store_true', help='以 JSON 输出')
+    p.add_argument('--prometheus', metavar='FILE', help='导出为 Prometheus textfile 格式')
+    p = sub.add_parser('rules', help='预演保存范围规则: 每条规则保留和排除的文件数与大小')
+    p.add_argument('--init', action='store_true', help=f'写出默认规则文件 {rules.RULES_NAME} 以便修改')
+    p = sub.add_parser('analyze', help='分析配置 (不指定时为本机数据) 的占用空间')
+    p.add_argument('name', nargs='?')
+    p.add_argument('--top', type=int, default=analyze.DEFAULT_TOP, help='列出最大的 N 个文件和目录')
+    p.add_argument('--json', action='store_true', help='以 JSON 输出')
+    return parser
+
+
+def run_with_progress(func, *args, **kwargs):
+    """
+    在后台线程中执行 func 并在 stderr 显示进度，Ctrl+C 取消
+    返回:
+        func 的返回值
+    """
+    worker = Worker(func, *args, **kwargs).start()
+    show = sys.stderr.isatty()
+    while True:
+        try:
+            events = worker.poll()
+            for kind, data in events:
+                if kind == 'progress':
+                    if show:
+                        sys.stderr.write('\r' + format_progress(data) + '\x1b[K')
+                        sys.stderr.flush()
+                    continue
+                if show:
+                    sys.stderr.write('\r\x1b[K')
+                if kind == 'error':
+                    raise data
+                return data
+            time.sleep(POLL_INTERVAL)
+        except KeyboardInterrupt:
+            worker.cancel()
+
+
+def cmd_list(engine, args):
+    entries = engine.list_profiles()
+    if not entries:
+        print("没有已保存的配置")
+        return 0
+    for entry in entries:
+        if 'error' in entry:
+            print(f"{entry['name']}\t读取失败")
+            continue
+        print(f"{entry['name']}\t{entry['email'] or '未知'}\t{entry['saved_at'] or '未知'}\t{entry['status']}")
+    return 0
+
+
+def _check_name(engine, name, must_exist=True):
+    """检查配置名称；返回非 None 的退出码表示不能继续"""
+    try:
+        profiles.check_name(engine.profiles_dir, name)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if must_exist and not engine.exists(name):
+        print(f"配置不存在: {name}", file=sys.stderr)
+        return 2
+    return None
+
+
+def cmd_save(engine, args):
+    name = profiles.clean_name(args.name)
+    code = _check_name(engine, name, must_exist=False)
+    if code is not None:
+        return code
+    if engine.exists(name) and not args.force:
+        answer = input(f"配置 '{name}' 已存在，是否覆盖？覆盖前的内容会保留为历史版本。[y/N] ")
+        if answer.strip().lower() != 'y':
+            return 1
+    meta, stats = run_with_progress(engine.save, name)
+    print(f"已保存配置: {name} ({meta['email']})")
+    print(f"更新 {stats['changed']} 个文件，未变化 {stats['unchanged']} 个，移除 {stats['removed']} 个。")
+    print(f"原始大小 {stats['logical_size'] / 1048576:.1f} MB，存储占用 {stats['stored_size'] / 1048576:.1f} MB")
+    if stats['version']:
+        print(f"覆盖前的内容已保留为历史版本 {stats['version']['id']}")
+    return 0
+
+
+def _ensure_closed(args):
+    """Windsurf 正在运行时按 --force-quit 关闭；返回非 None 的退出码表示不能继续"""
+    if not procs.is_running():
+        return None
+    if not args.force_quit:
+        print("Windsurf 正在运行，请先关闭 (或加 --force-quit 强制关闭)", file=sys.stderr)
+        return 2
+    if not procs.force_quit():
+        print("无法关闭 Windsurf，请手动关闭后重试", file=sys.stderr)
+        return 1
+    return None
+
+
+def _print_restore_result(engine, errors, success_items, stats):
+    if success_items:
+        print(f"成功复制: {', '.join(success_items)}")
+    if stats:
+        print(f"改写 {stats['written']} 个文件，删除 {stats['deleted']} 个，{stats['unchanged']} 个已一致")
+    for error in errors:
+        print(error, file=sys.stderr)
+    _, email = engine.current_account()
+    print(f"当前账号: {email}")
+    return 1 if errors else 0
+
+
+def cmd_switch(engine, args):
+    code = _check_name(engine, args.name)
+    if code is not None:
+        return code
+    code = _ensure_closed(args)
+    if code is not None:
+        return code
+    mode = profiles.RESTORE_KEYS if args.keys_only else profiles.RESTORE_FULL
+    errors, success_items, stats = run_with_progress(engine.switch, args.name, mode=mode, version=args.version)
+    if stats and stats['undo']['changed']:
+        print(f"切换前的本机数据已保存 ({stats['undo']['changed']} 个文件有变化)，可用 undo 撤销")
+    return _print_restore_result(engine, errors, success_items, stats)
+
+
+def cmd_undo(engine, args):
+    info = engine.undo_info()
+    if info is None:
+        print("没有可以撤销的切换", file=sys.stderr)
+        return 2
+    print(f"将还原 {info['saved_at']} 切换前的本机数据 (账号: {info.get('email') or '未知'})")
+    if not args.yes:
+        answer = input("确定要还原吗？当前数据会先自动保存，可以再次撤销。[y/N] ")
+        if answer.strip().lower() != 'y':
+            return 1
+    code = _ensure_closed(args)
+    if code is not None:
+        return code
+    errors, success_items, stats = run_with_progress(engine.undo_switch)
+    return _print_restore_result(engine, errors, success_items, stats)
+
+
+def cmd_delete(engine, args):
+    code = _check_name(engine, args.name)
+    if code is not None:
+        return code
+    if not args.yes:
+        answer = input(f"确定要删除配置 '{args.name}'？此操作不可恢复。[y/N] ")
+        if answer.strip().lower() != 'y':
+            return 1
+    freed = engine.delete(args.name)
+    print(f"已删除配置: {args.name} (释放 {freed} 个文件)")
+    return 0
+
+
+def cmd_history(engine, args):
+    code = _check_name(engine, args.name)
+    if code is not None:
+        return code
+    if args.delete:
+        freed = engine.delete_version(args.name, args.delete)
+        print(f"已删除历史版本: {args.delete} (释放 {freed} 个文件)")
+        return 0
+    entry = next((e for e in engine.index.load() if e['name'] == args.name), None)
+    versions = entry.get('versions', []) if entry else []
+    if not versions:
+        print("没有历史版本")
+        return 0
+    for v in versions:
+        size = f"{v['size'] / 1048576:.1f} MB" if v.get('size') is not None else '-'
+        print(f"{v['id']}\t{v['email'] or '未知'}\t{v['saved_at'] or '未知'}\t{size}")
+    return 0
+
+
+def cmd_verify(engine, args):
+    if args.all:
+        report = run_with_progress(engine.verify_all)
+        print(f"已校验 {report['profiles']} 个配置，{report['checked']} 个文件内容，"
+              f"共 {report['bytes'] / 1048576:.1f} MB")
+        for m in report['mismatches']:
+            print(f"  {m['profile']}: {m['root']}/{m['path']}: {verify.REASONS.get(m['reason'], m['reason'])}")
+        print("全部完好" if not report['mismatches'] else f"{len(report['mismatches'])} 个文件损坏或缺失")
+        return 1 if report['mismatches'] else 0
+    if not args.name:
+        print("请指定配置名称，或使用 --all", file=sys.stderr)
+        return 2
+    code = _check_name(engine, args.name)
+    if code is not None:
+        return code
+    result = run_with_progress(engine.verify, args.name)
+    print(f"配置账号: {result['expected_email']}")
+    print(f"当前账号: {result['current_email']}")
+    for label, count in result['differences'].items():
+        print(f"  {label}: {count} 个文件不一致")
+    for line in verify.format_mismatches(result['mismatches']):
+        print(f"    {line}")
+    ok = result['expected_email'] == result['current_email'] and not result['differences']
+    print("一致" if ok else "不一致")
+    return 0 if ok else 1
+
+
+def _seconds(value):
+    return '-' if value is None else f"{value:.3f}"
+
+
+def cmd_metrics(engine, args):
+    since = time.time() - args.days * 86400 if args.days else None
+    if args.prometheus:
+        engine.metrics.export_prometheus(args.prometheus, since)
+        print(f"已导出: {args.prometheus}")
+        return 0
+    summary = engine.metrics.summary(by_profile=args.by_profile, since=since)
+    if args.json:
+        rows = [dict(agg, op=key[0], profile=key[1]) if args.by_profile else dict(agg, op=key)
+                for key, agg in summary.items()]
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return 0
+    if not summary:
+        print("还没有操作记录")
+        return 0
+    print("操作\t" + ("配置\t" if args.by_profile else "") + "次数\t成功\tp50(秒)\tp95(秒)\tp99(秒)\tMB/s\t错误")
+    for key, agg in summary.items():
+        label = '\t'.join(key) if args.by_profile else key
+        errors = ', '.join(f"{k}×{v}" for k, v in agg['errors'].items()) or '-'
+        print(f"{label}\t{agg['count']}\t{agg['outcomes'].get('ok', 0)}\t{_seconds(agg['p50'])}\t"
+              f"{_seconds(agg['p95'])}\t{_seconds(agg['p99'])}\t{agg['throughput'] / 1048576:.1f}\t{errors}")
+    return 0
+
+
+def cmd_rules(engine, args):
+    if args.init:
+        try:
+            path = rules.write_default(engine.profiles_dir)
+        except FileExistsError:
+            print(f"规则文件已存在: {rules.rules_path(engine.profiles_dir)}", file=sys.stderr)
+            return 2
+        print(f"已写出默认规则: {path}")
+        return 0
+    if engine.rules.error:
+        print(f"规则文件无效，以下为默认规则的结果: {engine.rules.error}", file=sys.stderr)
+    print(f"规则来源: {engine.rules.path or '默认规则'}")
+    rows = rules.dry_run(engine.roots)
+    if not rows:
+        print("没有找到 Windsurf 数据")
+        return 0
+    print("数据位置\t规则\t结果\t文件数\tMB")
+    for row in rows:
+        action = '排除' if row['action'] == rules.EXCLUDE else '保留'
+        print(f"{row['root']}\t{row['rule']}\t{action}\t{row['files']}\t{row['bytes'] / 1048576:.1f}")
+    for action, label in ((rules.INCLUDE, '保留'), (rules.EXCLUDE, '排除')):
+        selected = [row for row in rows if row['action'] == action]
+        print(f"合计{label} {sum(r['files'] for r in selected)} 个文件，"
+              f"{sum(r['bytes'] for r in selected) / 1048576:.1f} MB")
+    return 0
+
+
+def cmd_analyze(engine, args):
+    if args.name:
+        code = _check_name(engine, args.name)
+        if code is not None:
+            return code
+    report = run_with_progress(engine.analyze, args.name, args.top)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+    print(f"配置: {args.name}" if args.name else "本机 Windsurf 数据")
+    for line in analyze.format_report(report, args.top):
+        print(line)
+    if report['errors']:
+        print(f"{report['errors']} 个条目无法读取", file=sys.stderr)
+    return 0
+
+
+HANDLERS = {
+    'list': cmd_list,
+    'save': cmd_save,
+    'switch': cmd_switch,
+    'undo': cmd_undo,
+    'delete': cmd_delete,
+    'history': cmd_history,
+    'verify': cmd_verify,
+    'metrics': cmd_metrics,
+    'rules': cmd_rules,
+    'analyze': cmd_analyze,
+}
+
+
+def main(argv=None, platform=None):
+    """
+    参数:
+        argv: 命令行参数 (不含程序名)，默认 sys.argv[1:]
+        platform: 默认平台 (由 windsurf_win.py / windsurf_mac.py 传入)
+    返回:
+        int: 退出码
+    """
+    args = build_parser().parse_args(argv)
+    engine = Engine(paths.for_platform(args.platform or platform), args.profiles_dir)
+    with trace.session(args.profiles_dir, args.profile, args.chrome_trace):
+        try:
+            return HANDLERS[args.command](engine, args)
+        except Cancelled:
+            print("已取消", file=sys.stderr)
+            return 130
+        except Exception as e:
+            print(f"失败: {e}", file=sys.stderr)
+            return 1
@@ -0,0 +1,141 @@
+"""
+Blob 压缩
+SQLite 数据库、JSON、LevelDB 日志压缩率很高，而 LevelDB 表文件、图片等已经压缩过的内容
+再压缩几乎没有收益。保存时对每个文件抽样试压缩，只有明显变小的才压缩存储。
+压缩和解压都按块流式进行，还原时直接解压到目标文件，不经过临时文件。
+优先使用 zstd (需要安装 zstandard)，没有时退回标准库的 zlib；lzma 压缩率更高但更慢，
+可以通过 BlobStore(codec=LZMA) 选用。
+"""
+
+import lzma
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+RAW = 'raw'
+ZSTD = 'zstd'
+ZLIB = 'zlib'
+LZMA = 'lzma'
+
+# Blob 文件名后缀，按后缀即可知道解压方式
+SUFFIXES = {RAW: '', ZSTD: '.zst', ZLIB: '.zz', LZMA: '.xz'}
+
+AVAILABLE = (ZSTD, ZLIB, LZMA) if zstandard is not None else (ZLIB, LZMA)
+DEFAULT_CODEC = AVAILABLE[0]
+
+# 小于该大小的文件不压缩 (省下的空间不到一个磁盘块)
+MIN_SIZE = 4096
+
+# 抽样大小；文件较大时从开头和中间各取一段
+SAMPLE_SIZE = 64 * 1024
+
+# 抽样压缩后不到原大小的该比例才压缩存储
+MIN_RATIO = 0.85
+
+# 流式处理的块大小
+CHUNK_SIZE = 1024 * 1024
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+LZMA_PRESET = 6
+
+
+def _compressor(codec):
+    if codec == ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    if codec == ZLIB:
+        return zlib.compressobj(ZLIB_LEVEL)
+    if codec == LZMA:
+        return lzma.LZMACompressor(preset=LZMA_PRESET)
+    raise ValueError(f"未知压缩方式: {codec}")
+
+
+def _decompressor(codec):
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("该 Blob 使用 zstd 压缩，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompressobj()
+    if codec == ZLIB:
+        return zlib.decompressobj()
+    if codec == LZMA:
+        return lzma.LZMADecompressor()
+    raise ValueError(f"未知压缩方式: {codec}")
+
+
+def choose_codec(path, size, preferred=DEFAULT_CODEC):
+    """
+    抽样判断文件是否值得压缩
+    返回:
+        str: preferred 或 RAW
+    """
+    if preferred == RAW or size < MIN_SIZE:
+        return RAW
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+        if size > 3 * SAMPLE_SIZE:
+            f.seek(size // 2)
+            sample += f.read(SAMPLE_SIZE)
+    if not sample:
+        return RAW
+    c = _compressor(preferred)
+    compressed = len(c.compress(sample)) + len(c.flush())
+    return preferred if compressed < len(sample) * MIN_RATIO else RAW
+
+
+def compress_file(src, dst, codec, hasher=None):
+    """
+    流式压缩 src 到 dst
+    参数:
+        hasher: 可选的哈希对象，读取的原始内容会同时送入
+    返回:
+        int: 原始内容大小
+    """
+    c = _compressor(codec)
+    size = 0
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        for chunk in iter(lambda: fin.read(CHUNK_SIZE), b''):
+            size += len(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            fout.write(c.compress(chunk))
+        fout.write(c.flush())
+    return size
+
+
+def iter_decompress(src, codec, chunk_size=CHUNK_SIZE):
+    """逐块产出 src 解压后的内容"""
+    d = _decompressor(codec)
+    with open(src, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(chunk_size), b''):
+            data = d.decompress(chunk)
+            if data:
+                yield data
+
+
+def decompress_file(src, dst, codec):
+    """流式解压 src 到 dst (dst 已存在时会被覆盖)"""
+    with open(dst, 'wb') as fout:
+        for data in iter_decompress(src, codec):
+            fout.write(data)
+
+
+def compress_bytes(data, codec):
+    """压缩一段内存中的数据 (RAW 原样返回)"""
+    if codec == RAW:
+        return data
+    c = _compressor(codec)
+    return c.compress(data) + c.flush()
+
+
+def decompress_bytes(data, codec):
+    """解压 compress_bytes 的结果"""
+    if codec == RAW:
+        return data
+    d = _decompressor(codec)
+    out = d.decompress(data)
+    if codec == ZLIB:
+        out += d.flush()
+    return out
@@ -0,0 +1,179 @@
+"""
+文件复制引擎
+按以下顺序尝试，第一个成功的方式生效:
+    hardlink         调用方确认安全时直接硬链接 (不复制任何数据)
+    reflink          写时复制克隆 (Linux btrfs/xfs 的 FICLONE，macOS APFS 的 clonefile)
+    copy_file_range  Linux 内核态复制
+    sendfile         Linux 内核态复制 (旧内核)
+    buffered         大缓冲区用户态复制
+不支持的方式会按 (源文件系统, 目标文件系统) 记住，之后不再重复尝试。
+"""
+
+import os
+import sys
+import errno
+import threading
+from collections import Counter
+
+HARDLINK = 'hardlink'
+REFLINK = 'reflink'
+COPY_FILE_RANGE = 'copy_file_range'
+SENDFILE = 'sendfile'
+BUFFERED = 'buffered'
+
+# 用户态复制的缓冲区大小
+BUFFER_SIZE = 8 * 1024 * 1024
+
+# Linux: ioctl FICLONE
+FICLONE = 0x40049409
+
+# 这些错误表示当前文件系统/内核不支持该方式，应退回下一种方式
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY,
+    errno.EOPNOTSUPP, errno.EPERM, errno.EBADF,
+    getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP),
+}
+
+_clonefile = None
+_get_errno = None
+if sys.platform == 'darwin':
+    try:
+        import ctypes
+        import ctypes.util
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        _clonefile = _libc.clonefile
+        _clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+        _clonefile.restype = ctypes.c_int
+        _get_errno = ctypes.get_errno
+    except (OSError, AttributeError):
+        _clonefile = None
+
+
+class CopyEngine:
+    """带快速路径的文件复制，记录每个文件实际使用的方式"""
+
+    def __init__(self, reflink=True):
+        """
+        参数:
+            reflink: 是否尝试写时复制克隆
+        """
+        self.reflink = reflink
+        self.stats = Counter()
+        self.records = []
+        self._unsupported = set()
+        self._lock = threading.Lock()
+
+    def reset_stats(self):
+        """清空统计 (每次保存/切换开始时调用)"""
+        with self._lock:
+            self.stats = Counter()
+            self.records = []
+
+    def copy(self, src, dst, link=False):
+        """
+        复制文件内容到 dst (dst 已存在时会被覆盖)
+        参数:
+            src: 源文件
+            dst: 目标文件
+            link: 允许硬链接；只有两边都不会被原地修改时才能为 True
+        返回:
+            str: 实际使用的方式
+        """
+        dev = (os.stat(src).st_dev, os.stat(os.path.dirname(dst) or '.').st_dev)
+        strategy = None
+        if link and self._enabled(HARDLINK, dev):
+            strategy = self._try(HARDLINK, dev, self._hardlink, src, dst)
+        if strategy is None and self.reflink and self._enabled(REFLINK, dev):
+            strategy = self._try(REFLINK, dev, self._reflink, src, dst)
+        if strategy is None and hasattr(os, 'copy_file_range') and self._enabled(COPY_FILE_RANGE, dev):
+            strategy = self._try(COPY_FILE_RANGE, dev, self._copy_file_range, src, dst)
+        if strategy is None and sys.platform.startswith('linux') and self._enabled(SENDFILE, dev):
+            strategy = self._try(SENDFILE, dev, self._sendfile, src, dst)
+        if strategy is None:
+            self._buffered(src, dst)
+            strategy = BUFFERED
+        self.record(dst, strategy)
+        return strategy
+
+    def record(self, dst, strategy):
+        """记录一个文件的写入方式 (也用于引擎之外的写入，如解压)"""
+        with self._lock:
+            self.stats[strategy] += 1
+            self.records.append((dst, strategy))
+
+    # --------------------------------------------------------
+    # 各种复制方式
+    # --------------------------------------------------------
+    def _enabled(self, strategy, dev):
+        return (strategy, dev) not in self._unsupported
+
+    def _try(self, strategy, dev, func, src, dst):
+        try:
+            func(src, dst)
+            return strategy
+        except _PerFile:
+            return None
+        except OSError as e:
+            if not isinstance(e, _Unsupported) and e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            with self._lock:
+                self._unsupported.add((strategy, dev))
+            return None
+
+    def _hardlink(self, src, dst):
+        if os.path.lexists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            # 链接数达到上限等情况只影响这一个文件
+            if e.errno in (errno.EMLINK, errno.EEXIST):
+                raise _PerFile(e.errno, str(e))
+            raise
+
+    def _reflink(self, src, dst):
+        if _clonefile is not None:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            if _clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+                err = _get_errno()
+                raise OSError(err, os.strerror(err))
+            return
+        if not sys.platform.startswith('linux'):
+            raise _Unsupported(errno.EOPNOTSUPP, 'reflink')
+        import fcntl
+        with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+
+    def _copy_file_range(self, src, dst):
+        # 每种方式都以截断方式重新打开 dst，失败后退回下一种方式是安全的
+        with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+            while os.copy_file_range(fin.fileno(), fout.fileno(), BUFFER_SIZE):
+                pass
+
+    def _sendfile(self, src, dst):
+        with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+            offset = 0
+            while True:
+                n = os.sendfile(fout.fileno(), fin.fileno(), offset, BUFFER_SIZE)
+                if n == 0:
+                    break
+                offset += n
+
+    def _buffered(self, src, dst):
+        buf = bytearray(BUFFER_SIZE)
+        view = memoryview(buf)
+        with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+            while True:
+                n = fin.readinto(buf)
+                if not n:
+                    break
+                fout.write(view[:n])
+
+
+class _Unsupported(OSError):
+    """当前平台没有该方式"""
+
+
+class _PerFile(OSError):
+    """只对单个文件失败，不应禁用该方式"""
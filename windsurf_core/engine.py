@@ -0,0 +1,515 @@
+"""
+Profile 操作入口
+保存、切换、删除、列出和核对 Profile 的完整流程，不依赖任何界面库。
+windsurf_win.py / windsurf_mac.py 的图形界面与命令行 (python -m windsurf_core) 共用这里的实现。
+"""
+
+import os
+import json
+import time
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+
+from . import analyze, history, profiles, rules, trace, verify
+from .account import AccountReader, login_status
+from .hashcache import HashCache
+from .index import ProfileIndex
+from .metrics import MetricsStore
+from .store import STORE_DIRNAME, BlobStore, write_json_atomic
+from .worker import Progress
+
+# 记录本机数据最近一次与哪个 Profile (版本) 一致，切换前保存时据此增量比对
+LIVE_NAME = 'live.json'
+
+
+class Engine:
+    """一个 Profile 存储目录上的全部操作"""
+
+    def __init__(self, paths, profiles_dir):
+        """
+        参数:
+            paths: paths.PlatformPaths
+            profiles_dir: Profile 存储目录
+        """
+        self.paths = paths
+        self.profiles_dir = profiles_dir
+        os.makedirs(profiles_dir, exist_ok=True)
+        self.rules = rules.load(profiles_dir)
+        self.roots = paths.backup_roots(self.rules)
+        self.hash_cache = HashCache(os.path.join(profiles_dir, STORE_DIRNAME))
+        self.store = BlobStore(profiles_dir, hash_cache=self.hash_cache)
+        self.index = ProfileIndex(profiles_dir)
+        self.accounts = AccountReader()
+        self.metrics = MetricsStore(os.path.join(profiles_dir, trace.LOG_DIRNAME))
+        self.retention = dict(history.DEFAULT_RETENTION)
+
+    def profile_path(self, name):
+        return os.path.join(self.profiles_dir, name)
+
+    def _checked_path(self, name):
+        """
+        按名称取 Profile 目录，名称无效 (内部目录、指向存储目录之外等) 时拒绝
+        异常:
+            ValueError: 名称无效
+        """
+        return self.profile_path(profiles.check_name(self.profiles_dir, name))
+
+    def exists(self, name):
+        return os.path.exists(self.profile_path(name))
+
+    def current_account(self):
+        """
+        返回:
+            (name, email): 本机当前登录的账号，读取失败返回 (None, None)
+        """
+        return self.accounts.account(self.paths.state_db)
+
+    @contextmanager
+    def _operation(self, op, name, **attrs):
+        """一次保存 / 切换 / 删除 / 核对: 记录耗时 span，结束后写入指标"""
+        sp = None
+        counters = (self.hash_cache.hits, self.hash_cache.misses)
+        try:
+            with trace.span(op, profile=name, **attrs) as sp:
+                yield sp
+        except BaseException as e:
+            self._record(op, name, sp, counters, e)
+            raise
+        self._record(op, name, sp, counters)
+
+    def _record(self, op, name, sp, counters, error=None):
+        try:
+            self.hash_cache.save()
+        except OSError as e:
+            trace.warning(f"写入哈希缓存失败: {e}")
+        if sp is None:
+            return
+        sp.set(hash_cache={'hits': self.hash_cache.hits - counters[0],
+                           'misses': self.hash_cache.misses - counters[1]})
+        try:
+            self.metrics.record_span(op, name, sp, error)
+        except OSError as e:
+            trace.warning(f"写入指标失败: {e}")
+
+    # --------------------------------------------------------
+    # 列表
+    # --------------------------------------------------------
+    def list_profiles(self):
+        """
+        返回:
+            list: 索引记录，附加 status (该 Profile 保存的登录状态)；
+                  versions 为历史版本摘要 (从新到旧)
+        """
+        with trace.span('list_profiles') as sp:
+            _, current_email = self.current_account()
+            entries = []
+            for entry in self.index.load():
+                entry = dict(entry)
+                if 'error' not in entry:
+                    entry['status'] = self._profile_status(entry, current_email)
+                entries.append(entry)
+            sp.set(profiles=len(entries))
+        return entries
+
+    def _profile_status(self, entry, current_email):
+        """索引记录对应 Profile 的登录状态"""
+        if entry.get('signed_in') is not None:
+            return login_status(entry['email'] if entry['signed_in'] else None, current_email)
+        # 保存时没有记录登录状态的旧 Profile，读取保存的 state.vscdb
+        return self.accounts.profile_status(
+            self.store, self.profile_path(entry['name']), entry['state_db'], current_email)
+
+    # --------------------------------------------------------
+    # 保存 / 切换 / 删除
+    # --------------------------------------------------------
+    def save(self, name, progress=None):
+        """
+        把当前账号保存为 Profile (已存在时增量覆盖，覆盖前的内容记为历史版本)
+        返回:
+            (meta, stats): 写入的元数据和 profiles.save_profile 的统计，
+            stats['version'] 为新产生的历史版本摘要 (内容没有变化时为 None)
+        """
+        with self._operation('save', name) as sp:
+            profile_path = self._checked_path(name)
+            account_name, email = self.current_account()
+            if not account_name:
+                raise RuntimeError("无法读取当前账号信息，请确保已登录Windsurf")
+            meta = {
+                'name': account_name,
+                'email': email,
+                # 列表据此显示登录状态，不必再从存储中取出 state.vscdb 读取
+                'signed_in': self.accounts.signed_in(self.paths.state_db),
+                'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            previous = history.load_current(profile_path)
+            manifest, stats = profiles.save_profile(
+                self.store, profile_path, self.roots, meta, progress=progress,
+                keep_old=previous is not None)
+            meta.update(logical_size=stats['logical_size'], stored_size=stats['stored_size'])
+            stats['version'] = None
+            if previous is not None:
+                with trace.span('history.archive') as hsp:
+                    try:
+                        stats['version'] = history.archive(self.store, profile_path, *previous, manifest)
+                        _, freed = history.prune(self.store, profile_path, self.retention)
+                        hsp.set(archived=stats['version'] is not None, freed=freed)
+                    except OSError as e:
+                        # 新内容已经保存成功，只是没能留下历史版本
+                        trace.warning(f"写入历史版本失败: {e}")
+            with trace.span('index.update'):
+                self.index.update(name, meta, manifest)
+            self._set_live(name)
+            sp.set(email=email, changed=stats['changed'], unchanged=stats['unchanged'],
+                   removed=stats['removed'], strategies=stats['strategies'],
+                   logical_size=stats['logical_size'], stored_size=stats['stored_size'])
+            sp.add(files=stats['changed'], bytes=stats['bytes'])
+        return meta, stats
+
+    def switch(self, name, mode=profiles.RESTORE_FULL, progress=None, version=None):
+        """
+        还原 Profile 到本机，完成后按 manifest 校验每个还原的文件
+        替换本机数据之前先把当前状态保存为撤销快照 (见 undo_switch)。
+        参数:
+            version: 历史版本号，默认还原最近一次保存的内容
+        返回:
+            (errors, success_items, stats): 旧版 Profile 的 stats 为 None；
+            stats['verify'] 为 {'checked', 'mismatches'}，不一致的文件会列在 errors 中；
+            stats['undo'] 为撤销快照的 save_profile 统计
+        """
+        with self._operation('switch', name, mode=mode, version=version) as sp:
+            profile_path = self._checked_path(name)
+            if version is not None:
+                _, manifest = history.load_version(profile_path, version)
+            else:
+                manifest = profiles.load_manifest(profile_path)
+            previous = self._hold_undo()
+            success_items = []
+            try:
+                undo = self._save_undo({'switched_to': name, 'version': version}, progress)
+                sp.set(undo_changed=undo['changed'], undo_bytes=undo['bytes'])
+                if manifest is None:
+                    # 兼容旧版配置：整目录复制保存的 Profile
+                    sp.set(legacy=True)
+                    errors, success_items = self.restore_legacy(profile_path)
+                    sp.set(errors=errors)
+                    self._set_live(None)
+                    return errors, success_items, None
+                errors, success_items, stats = self._restore(manifest, mode, progress)
+                verified_at_ns = int(time.time() * 1e9)
+            finally:
+                self._release_undo(previous, changed=bool(success_items))
+            stats['undo'] = undo
+            if success_items:
+                # 完整还原并校验通过时每个文件都已按 manifest 核对过内容
+                full = mode == profiles.RESTORE_FULL and not errors
+                self._set_live(name, version, verified_at_ns if full else None)
+            sp.set(errors=errors, **stats)
+            sp.add(files=stats['written'], bytes=stats['bytes'])
+        return errors, success_items, stats
+
+    def _restore(self, manifest, mode, progress):
+        errors, success_items, stats = profiles.restore_profile(
+            self.store, manifest, self.roots, mode=mode, progress=progress)
+        if not errors:
+            # 替换已经完成，校验阶段不再响应取消
+            skip = ()
+            if mode == profiles.RESTORE_KEYS:
+                skip = [name for name, root in manifest['roots'].items()
+                        if profiles.STATE_DB_NAME in root['files']]
+            report = verify.verify_live(manifest, self.roots, skip=skip, store=self.store,
+                                        progress=Progress(progress.events) if progress else None)
+            stats['verify'] = {'checked': report['checked'], 'mismatches': len(report['mismatches'])}
+            if report['mismatches']:
+                errors = ["校验发现与配置不一致的文件:"] + verify.format_mismatches(report['mismatches'])
+        return errors, success_items, stats
+
+    # --------------------------------------------------------
+    # 撤销切换
+    # --------------------------------------------------------
+    def _live_path(self):
+        return os.path.join(self.profiles_dir, STORE_DIRNAME, LIVE_NAME)
+
+    def _get_live(self):
+        try:
+            with open(self._live_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _set_live(self, name, version=None, verified_at_ns=None):
+        """
+        记录本机数据刚与哪个 Profile 一致 (保存或切换之后)；name 为 None 表示未知
+        参数:
+            verified_at_ns: 还原后校验完成的时间，见 _live_manifest
+        """
+        try:
+            if name is None:
+                if os.path.exists(self._live_path()):
+                    os.remove(self._live_path())
+                return
+            write_json_atomic(self._live_path(), {'profile': name, 'version': version,
+                                                  'verified_at_ns': verified_at_ns})
+        except OSError as e:
+            trace.warning(f"写入本机状态记录失败: {e}")
+
+    def _live_manifest(self, live):
+        """
+        live.json 指向的 manifest，读取失败返回 None
+        保存 Profile 时 mtime 距扫描时间不足 RACY_WINDOW_NS 的文件不能按元数据判定未变化；
+        还原时每个文件的 mtime 都被设回 manifest 中的值并已逐个校验过内容，之后的任何修改都会
+        产生新的 mtime，因此把扫描时间提到校验完成的时间，这些文件不必在每次切换时重新读取。
+        """
+        if not live:
+            return None
+        profile_path = self.profile_path(live['profile'])
+        try:
+            if live.get('version'):
+                manifest = history.load_version(profile_path, live['version'])[1]
+            else:
+                manifest = profiles.load_manifest(profile_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        verified_at_ns = live.get('verified_at_ns')
+        if manifest is not None and verified_at_ns:
+            manifest = dict(manifest, scanned_at_ns=max(manifest.get('scanned_at_ns', 0), verified_at_ns))
+        return manifest
+
+    def _save_undo(self, info, progress):
+        """
+        把本机当前状态保存为撤销快照 (只保留最近一个)
+        按最近一次保存 / 切换的 Profile 增量比对: 之后没有改动过的文件只比较大小和修改时间，
+        内容已在存储中，不再读取或复制；本机没有变化时几乎没有开销。
+        返回:
+            dict: save_profile 的统计
+        """
+        with trace.span('switch.undo_snapshot') as sp:
+            live = self._get_live()
+            account_name, email = self.current_account()
+            meta = dict(info, name=account_name, email=email, live=live,
+                        saved_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            _, stats = profiles.save_profile(self.store, self.profile_path(profiles.UNDO_NAME), self.roots, meta,
+                                             progress=progress, base=self._live_manifest(live))
+            sp.set(changed=stats['changed'], unchanged=stats['unchanged'])
+            sp.add(files=stats['changed'], bytes=stats['bytes'])
+        return stats
+
+    def _hold_undo(self):
+        """
+        读取当前的撤销快照并持有它引用的 Blob (保存新快照时不会被回收)
+        返回:
+            (meta, manifest)；没有快照时返回 None
+        """
+        previous = history.load_current(self.profile_path(profiles.UNDO_NAME))
+        if previous is not None:
+            self.store.retain(profiles.manifest_digests(previous[1]))
+        return previous
+
+    def _release_undo(self, previous, changed):
+        """
+        切换结束后处理原来的撤销快照
+        本机数据已被替换 (changed) 时释放持有的引用；切换被取消或失败回滚、本机数据没有变化时，
+        把原来的快照放回原处 (持有的引用转给它)，上一次切换仍然可以撤销。
+        """
+        if previous is None:
+            return
+        if changed:
+            self.store.release(profiles.manifest_digests(previous[1]))
+            return
+        undo_path = self.profile_path(profiles.UNDO_NAME)
+        replaced = profiles.load_manifest(undo_path)
+        meta, manifest = previous
+        write_json_atomic(os.path.join(undo_path, profiles.MANIFEST_NAME), manifest)
+        write_json_atomic(os.path.join(undo_path, profiles.META_NAME), meta)
+        self.store.release(profiles.manifest_digests(replaced))
+
+    def undo_info(self):
+        """
+        撤销快照的元数据
+        返回:
+            dict: name / email (快照时的账号)、saved_at、switched_to (随后切换到的 Profile)；没有快照时返回 None
+        """
+        current = history.load_current(self.profile_path(profiles.UNDO_NAME))
+        return current[0] if current else None
+
+    def undo_switch(self, progress=None):
+        """
+        撤销最近一次切换: 还原切换前自动保存的本机状态
+        撤销之前同样先保存当前状态，再次撤销即回到撤销前。
+        只有与快照不同的文件会被改写，切换后没有改动过的文件直接沿用。
+        返回:
+            (errors, success_items, stats): 同 switch
+        异常:
+            ValueError: 没有可以撤销的切换
+        """
+        with self._operation('undo', profiles.UNDO_NAME) as sp:
+            previous = self._hold_undo()
+            if previous is None:
+                raise ValueError("没有可以撤销的切换")
+            meta, manifest = previous
+            success_items = []
+            try:
+                undo = self._save_undo({'switched_to': profiles.UNDO_NAME, 'version': None}, progress)
+                errors, success_items, stats = self._restore(manifest, profiles.RESTORE_FULL, progress)
+            finally:
+                self._release_undo(previous, changed=bool(success_items))
+            stats['undo'] = undo
+            if success_items:
+                live = meta.get('live')
+                self._set_live(live['profile'] if live else None, live.get('version') if live else None)
+            sp.set(errors=errors, restored_email=meta.get('email'), undo_changed=undo['changed'], **stats)
+            sp.add(files=stats['written'], bytes=stats['bytes'])
+        return errors, success_items, stats
+
+    def restore_legacy(self, profile_path):
+        """
+        还原旧版 (整目录复制) 的 Profile
+        旧版把每个数据位置复制到 Profile 下的同名目录；只管理部分文件的位置
+        (Cookies 等) 直接放在 Profile 目录或同名子目录中。
+        返回:
+            (errors, success_items): 错误列表和成功还原的项目
+        """
+        errors = []
+        success_items = []
+        for root in self.roots:
+            backup = os.path.join(profile_path, root.name)
+            try:
+                if root.partial:
+                    src_dir = backup if os.path.isdir(backup) else profile_path
+                    copied = False
+                    for name in root.only:
+                        src = os.path.join(src_dir, name)
+                        if os.path.isfile(src):
+                            os.makedirs(root.path, exist_ok=True)
+                            shutil.copy2(src, os.path.join(root.path, name))
+                            copied = True
+                    if copied:
+                        success_items.append(root.label)
+                elif os.path.isdir(backup):
+                    if os.path.exists(root.path):
+                        shutil.rmtree(root.path)
+                    shutil.copytree(backup, root.path)
+                    success_items.append(root.label)
+                elif root.path == self.paths.global_storage:
+                    # 更早的版本只保存了 state.vscdb
+                    state_backup = os.path.join(profile_path, profiles.STATE_DB_NAME)
+                    if os.path.exists(state_backup):
+                        shutil.copy2(state_backup, self.paths.state_db)
+                        success_items.append(profiles.STATE_DB_NAME)
+                    else:
+                        errors.append(f"{profiles.STATE_DB_NAME}: 文件不存在")
+            except Exception as e:
+                errors.append(f"{root.label}: {str(e)[:80]}")
+        return errors, success_items
+
+    def delete(self, name):
+        """
+        删除 Profile (连同全部历史版本)
+        返回:
+            int: 释放的 Blob 数量
+        """
+        with self._operation('delete', name) as sp:
+            profile_path = self._checked_path(name)
+            freed = history.release_all(self.store, profile_path)
+            freed += profiles.delete_profile(self.store, profile_path)
+            self.index.remove(name)
+            sp.set(freed=freed)
+        return freed
+
+    def delete_version(self, name, version):
+        """
+        删除 Profile 的一个历史版本
+        返回:
+            int: 释放的 Blob 数量
+        """
+        with self._operation('delete', name, version=version) as sp:
+            versions, freed = history.remove(self.store, self._checked_path(name), version)
+            self.index.update_versions(name, versions)
+            sp.set(freed=freed)
+        return freed
+
+    # --------------------------------------------------------
+    # 核对
+    # --------------------------------------------------------
+    def verify(self, name, progress=None):
+        """
+        核对本机数据是否与 Profile 一致 (不做任何修改，逐个文件比对大小和哈希)
+        返回:
+            dict: expected_email (Profile 的邮箱)、current_email (本机账号)、
+                  differences ({数据位置: 不一致的文件数}，只列出有差异的位置)、
+                  mismatches (verify.verify_live 列出的不一致文件)
+        异常:
+            ValueError: 名称无效
+        """
+        with self._operation('verify', name) as sp:
+            profile_path = self._checked_path(name)
+            expected_email = None
+            for entry in self.index.load():
+                if entry['name'] == name:
+                    expected_email = entry.get('email')
+            _, current_email = self.current_account()
+            differences = {}
+            mismatches = []
+            manifest = profiles.load_manifest(profile_path)
+            if manifest is not None:
+                report = verify.verify_live(manifest, self.roots, progress=progress, store=self.store)
+                mismatches = report['mismatches']
+                for m in mismatches:
+                    differences[m['root']] = differences.get(m['root'], 0) + 1
+                sp.add(files=report['checked'], bytes=report['bytes'])
+            sp.set(expected_email=expected_email, current_email=current_email, differences=differences)
+        return {
+            'expected_email': expected_email,
+            'current_email': current_email,
+            'differences': differences,
+            'mismatches': mismatches,
+        }
+
+    def analyze(self, name=None, top=analyze.DEFAULT_TOP, progress=None):
+        """
+        分析 Profile (name 为 None 时分析本机数据) 的占用空间
+        返回:
+            dict: analyze.analyze_live / analyze_manifest 的报告
+        异常:
+            ValueError: 名称无效，或 Profile 是旧版 (整目录复制)，没有 manifest
+        """
+        with trace.span('analyze', profile=name) as sp:
+            if name is None:
+                report = analyze.analyze_live(self.roots, top, progress=progress)
+            else:
+                manifest = profiles.load_manifest(self._checked_path(name))
+                if manifest is None:
+                    raise ValueError(f"旧版配置没有文件清单，请重新保存: {name}")
+                report = analyze.analyze_manifest(manifest, self.roots, self.store, top)
+            sp.set(bytes=report['bytes'], excluded_bytes=report['excluded_bytes'])
+        return report
+
+    def verify_all(self, progress=None):
+        """
+        检查所有已保存的 Profile 在存储中的内容是否完好 (重新计算每个 Blob 的哈希)
+        返回:
+            dict: profiles (校验的 Profile 数，历史版本各算一个)、checked、bytes、
+                  mismatches ([{'profile', 'root', 'path', 'reason', 'hash'}, ...]，root 为显示名称，
+                  历史版本的 profile 为 '配置名称@版本号')
+        """
+        with self._operation('verify', '*') as sp:
+            manifests = {}
+            for entry in self.index.load():
+                profile_path = self.profile_path(entry['name'])
+                manifest = profiles.load_manifest(profile_path)
+                if manifest is not None:
+                    manifests[entry['name']] = manifest
+                # 历史版本引用的 Blob 同样需要完好
+                for version, old in history.iter_manifests(profile_path):
+                    manifests[f"{entry['name']}@{version}"] = old
+            undo = profiles.load_manifest(self.profile_path(profiles.UNDO_NAME))
+            if undo is not None:
+                manifests[profiles.UNDO_NAME] = undo
+            report = verify.verify_store(self.store, manifests, progress=progress)
+            labels = {root.name: root.label for root in self.roots}
+            for m in report['mismatches']:
+                m['root'] = labels.get(m['root'], m['root'])
+            report['profiles'] = len(manifests)
+            sp.add(files=report['checked'], bytes=report['bytes'])
+            sp.set(profiles=len(manifests), mismatches=len(report['mismatches']))
+        return report
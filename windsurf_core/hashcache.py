@@ -0,0 +1,197 @@
+"""
+持久化的文件哈希缓存
+以 (设备号, inode, 大小, mtime_ns) 为键记录文件内容的哈希，保存在 windsurf_profiles/.store/hashcache.json。
+保存、切换后的比对和校验都先查缓存: 文件元数据没有变化就直接使用记录的哈希，不读取内容；
+元数据一变键就不同，旧记录自然失效 (同一路径的旧记录会被立即删除)。
+SQLite 数据库的在线快照另外按 数据库 + -wal 的元数据缓存快照的哈希和大小，
+数据库没有变化时不必重新做快照。
+mtime 与当前时间相差不足 RACY_WINDOW_NS 的文件不缓存 (同一时间片内的修改无法从元数据区分)。
+长期未使用的记录定期清理。
+"""
+
+import os
+import json
+import time
+import threading
+
+from .store import CHUNK_SIZE, hash_file
+
+CACHE_NAME = 'hashcache.json'
+CACHE_VERSION = 1
+
+# mtime 与扫描时间 (或当前时间) 相差不足该值的文件不信任 size+mtime 快速比对
+# (文件系统时间戳精度有限，同一时间片内的修改无法从元数据区分)；profiles.py 的增量保存同样使用
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+# 清理: 间隔、记录最长保留天数、最多保留的记录数
+COMPACT_INTERVAL = 24 * 3600
+MAX_AGE_DAYS = 30
+MAX_ENTRIES = 200000
+
+
+def _today():
+    return int(time.time() // 86400)
+
+
+def file_key(st):
+    return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _racy(st):
+    return st.st_mtime_ns + RACY_WINDOW_NS > int(time.time() * 1e9)
+
+
+class HashCache:
+    """(dev, ino, size, mtime_ns) -> 内容哈希"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, CACHE_NAME)
+        self._lock = threading.Lock()
+        self._entries = None
+        self._by_path = {}
+        self._compacted_at = 0
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        entries = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                entries = data['entries']
+                self._compacted_at = data.get('compacted_at', 0)
+        except (OSError, ValueError, KeyError):
+            pass
+        self._entries = entries
+        self._by_path = {entry[3]: key for key, entry in entries.items()}
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        today = _today()
+        if entry[2] != today:
+            entry[2] = today
+            self._dirty = True
+        return entry
+
+    def _put(self, path, key, digest, size):
+        old = self._by_path.get(path)
+        if old is not None and old != key:
+            self._entries.pop(old, None)
+        self._entries[key] = [digest, size, _today(), path]
+        self._by_path[path] = key
+        self._dirty = True
+
+    # --------------------------------------------------------
+    # 普通文件
+    # --------------------------------------------------------
+    def lookup(self, path, st=None):
+        """
+        查询缓存的哈希
+        返回:
+            str 或 None
+        """
+        st = st or os.stat(path)
+        with self._lock:
+            self._load()
+            entry = self._get(file_key(st))
+        return entry[0] if entry else None
+
+    def record(self, path, st, digest):
+        """记录 path (元数据为 st 时) 的内容哈希"""
+        if _racy(st):
+            return
+        with self._lock:
+            self._load()
+            self._put(os.path.abspath(path), file_key(st), digest, st.st_size)
+
+    def hash_file(self, path, chunk_size=CHUNK_SIZE):
+        """
+        带缓存地计算文件哈希；读取期间文件被改动时结果不缓存
+        返回:
+            str: 十六进制哈希值
+        """
+        st = os.stat(path)
+        digest = self.lookup(path, st)
+        if digest is not None:
+            return digest
+        digest = hash_file(path, chunk_size)
+        after = os.stat(path)
+        if file_key(after) == file_key(st):
+            self.record(path, st, digest)
+        return digest
+
+    # --------------------------------------------------------
+    # SQLite 在线快照
+    # --------------------------------------------------------
+    def snapshot_key(self, path):
+        """数据库及 -wal 的元数据组成的键；数据库不存在返回 None"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = 'snapshot:' + file_key(st)
+        try:
+            wal = os.stat(path + '-wal')
+            key += ':' + file_key(wal)
+            racy = _racy(st) or _racy(wal)
+        except FileNotFoundError:
+            racy = _racy(st)
+        return None if racy else key
+
+    def lookup_snapshot(self, key):
+        """
+        返回:
+            (digest, size): 该状态下快照内容的哈希和大小；没有记录返回 None
+        """
+        if key is None:
+            return None
+        with self._lock:
+            self._load()
+            entry = self._get(key)
+        return (entry[0], entry[1]) if entry else None
+
+    def record_snapshot(self, path, key, digest, size):
+        if key is None:
+            return
+        with self._lock:
+            self._load()
+            self._put('snapshot:' + os.path.abspath(path), key, digest, size)
+
+    # --------------------------------------------------------
+    # 持久化
+    # --------------------------------------------------------
+    def save(self):
+        """有改动时写回文件，并定期清理长期未使用的记录"""
+        with self._lock:
+            if self._entries is None:
+                return
+            now = time.time()
+            if now - self._compacted_at > COMPACT_INTERVAL or len(self._entries) > MAX_ENTRIES:
+                self._compact()
+                self._compacted_at = now
+                self._dirty = True
+            if not self._dirty:
+                return
+            data = {'version': CACHE_VERSION, 'compacted_at': self._compacted_at, 'entries': self._entries}
+            tmp = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    def _compact(self):
+        oldest = _today() - MAX_AGE_DAYS
+        entries = {key: entry for key, entry in self._entries.items() if entry[2] >= oldest}
+        if len(entries) > MAX_ENTRIES:
+            keep = sorted(entries, key=lambda key: entries[key][2], reverse=True)[:MAX_ENTRIES]
+            entries = {key: entries[key] for key in keep}
+        self._entries = entries
+        self._by_path = {entry[3]: key for key, entry in entries.items()}
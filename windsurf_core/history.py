@@ -0,0 +1,252 @@
+"""
+Profile 历史版本
+覆盖保存 Profile 时旧的 manifest 不再丢弃，而是连同 profile_meta.json 移入
+<Profile>/history/<版本号>.json，之后可以切换到任意一个历史版本。
+旧 manifest 原有的 Blob 引用直接转给历史版本，各版本之间 (以及与其他 Profile) 相同的文件
+在存储中只有一份，保存一个历史版本只多一个 manifest 文件。
+版本摘要 (时间、邮箱、大小) 汇总在 history/versions.json 中，并随 Profile 索引一起给出，
+列出版本时不读取各个版本文件。
+保留策略: 最近 N 个、最近 N 天每天最后一个、最近 N 周每周最后一个，其余版本删除并释放引用。
+"""
+
+import os
+import json
+from datetime import datetime
+
+from .profiles import HISTORY_DIRNAME, META_NAME, load_manifest, manifest_digests, manifest_totals
+from .store import write_json_atomic
+
+VERSIONS_NAME = 'versions.json'
+
+# 默认保留策略
+DEFAULT_RETENTION = {'last': 10, 'daily': 7, 'weekly': 4}
+
+
+def history_dir(profile_path):
+    return os.path.join(profile_path, HISTORY_DIRNAME)
+
+
+def _version_path(profile_path, version_id):
+    if not version_id or os.sep in version_id or '/' in version_id or version_id.startswith('.'):
+        raise ValueError(f"版本号无效: {version_id}")
+    return os.path.join(history_dir(profile_path), f"{version_id}.json")
+
+
+def load_current(profile_path):
+    """
+    读取 Profile 当前的 meta 和 manifest (覆盖保存之前调用)
+    返回:
+        (meta, manifest)；Profile 不存在或是旧版 (没有 manifest) 时返回 None
+    """
+    manifest = load_manifest(profile_path)
+    if manifest is None:
+        return None
+    try:
+        with open(os.path.join(profile_path, META_NAME), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        meta = {}
+    return meta, manifest
+
+
+def same_content(a, b):
+    """两个 manifest 保存的文件 (路径和内容) 是否完全相同"""
+    def files(manifest):
+        return {name: {rel: entry['hash'] for rel, entry in root['files'].items()}
+                for name, root in manifest['roots'].items()}
+    return files(a) == files(b)
+
+
+# ------------------------------------------------------------
+# 版本摘要
+# ------------------------------------------------------------
+def list_versions(profile_path):
+    """
+    Profile 的历史版本摘要
+    返回:
+        list: [{'id', 'time_ns', 'saved_at', 'email', 'size', 'files', 'stored_size'}, ...]，从新到旧
+    """
+    try:
+        with open(os.path.join(history_dir(profile_path), VERSIONS_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError):
+        return _rebuild(profile_path)
+
+
+def _summary(version_id, meta, manifest):
+    size, files = manifest_totals(manifest)
+    return {
+        'id': version_id,
+        'time_ns': manifest.get('scanned_at_ns', 0),
+        'saved_at': meta.get('saved_at'),
+        'email': meta.get('email'),
+        'size': size,
+        'files': files,
+        'stored_size': meta.get('stored_size'),
+    }
+
+
+def _write_versions(profile_path, versions):
+    versions.sort(key=lambda v: (v['time_ns'], v['id']), reverse=True)
+    write_json_atomic(os.path.join(history_dir(profile_path), VERSIONS_NAME), versions)
+    return versions
+
+
+def _rebuild(profile_path):
+    """versions.json 损坏时扫描版本文件重建"""
+    versions = []
+    directory = history_dir(profile_path)
+    for name in os.listdir(directory):
+        if not name.endswith('.json') or name == VERSIONS_NAME:
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        versions.append(_summary(name[:-len('.json')], data['meta'], data['manifest']))
+    return _write_versions(profile_path, versions)
+
+
+def load_version(profile_path, version_id):
+    """
+    读取一个历史版本
+    返回:
+        (meta, manifest)
+    异常:
+        FileNotFoundError: 版本不存在
+    """
+    with open(_version_path(profile_path, version_id), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['meta'], data['manifest']
+
+
+# ------------------------------------------------------------
+# 写入与清理
+# ------------------------------------------------------------
+def _new_id(time_ns, versions):
+    base = datetime.fromtimestamp(time_ns / 1e9).strftime('%Y%m%d-%H%M%S')
+    existing = {v['id'] for v in versions}
+    version_id = base
+    n = 2
+    while version_id in existing:
+        version_id = f"{base}-{n}"
+        n += 1
+    return version_id
+
+
+def archive(store, profile_path, meta, manifest, new_manifest):
+    """
+    把覆盖之前的 Profile 记为历史版本
+    manifest 的 Blob 引用由调用方转交 (save_profile(keep_old=True))；
+    内容与新保存的 manifest 完全相同时不产生新版本，直接释放这些引用。
+    返回:
+        dict: 新版本的摘要；没有产生新版本时返回 None
+    """
+    if same_content(manifest, new_manifest):
+        store.release(manifest_digests(manifest))
+        return None
+    os.makedirs(history_dir(profile_path), exist_ok=True)
+    versions = list_versions(profile_path)
+    version_id = _new_id(manifest.get('scanned_at_ns', 0), versions)
+    try:
+        write_json_atomic(_version_path(profile_path, version_id), {'meta': meta, 'manifest': manifest})
+    except OSError:
+        store.release(manifest_digests(manifest))
+        raise
+    summary = _summary(version_id, meta, manifest)
+    _write_versions(profile_path, versions + [summary])
+    return summary
+
+
+def select(versions, retention=DEFAULT_RETENTION):
+    """
+    按保留策略选出要保留的版本
+    参数:
+        versions: list_versions 的返回值 (从新到旧)
+        retention: {'last': N, 'daily': N, 'weekly': N}，缺少的项视为 0
+    返回:
+        set: 保留的版本号
+    """
+    keep = {v['id'] for v in versions[:retention.get('last', 0)]}
+    buckets = (
+        ('daily', lambda d: d.date()),
+        ('weekly', lambda d: d.isocalendar()[:2]),
+    )
+    for key, bucket_of in buckets:
+        limit = retention.get(key, 0)
+        seen = set()
+        for v in versions:
+            bucket = bucket_of(datetime.fromtimestamp(v['time_ns'] / 1e9))
+            if bucket in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            # 从新到旧遍历，每个时间段内第一个遇到的就是最后保存的
+            seen.add(bucket)
+            keep.add(v['id'])
+    return keep
+
+
+def _drop(store, profile_path, version_ids):
+    freed = 0
+    for version_id in version_ids:
+        try:
+            _, manifest = load_version(profile_path, version_id)
+        except (OSError, ValueError):
+            manifest = None
+        freed += store.release(manifest_digests(manifest))
+        path = _version_path(profile_path, version_id)
+        if os.path.exists(path):
+            os.remove(path)
+    return freed
+
+
+def prune(store, profile_path, retention=DEFAULT_RETENTION):
+    """
+    删除保留策略之外的版本
+    返回:
+        (versions, freed): 剩余的版本摘要和释放的 Blob 数量
+    """
+    versions = list_versions(profile_path)
+    keep = select(versions, retention)
+    dropped = [v['id'] for v in versions if v['id'] not in keep]
+    if not dropped:
+        return versions, 0
+    freed = _drop(store, profile_path, dropped)
+    return _write_versions(profile_path, [v for v in versions if v['id'] in keep]), freed
+
+
+def remove(store, profile_path, version_id):
+    """
+    删除一个历史版本
+    返回:
+        (versions, freed): 剩余的版本摘要和释放的 Blob 数量
+    异常:
+        FileNotFoundError: 版本不存在
+    """
+    versions = list_versions(profile_path)
+    if not any(v['id'] == version_id for v in versions):
+        raise FileNotFoundError(f"历史版本不存在: {version_id}")
+    freed = _drop(store, profile_path, [version_id])
+    return _write_versions(profile_path, [v for v in versions if v['id'] != version_id]), freed
+
+
+def release_all(store, profile_path):
+    """
+    释放全部历史版本的引用 (删除 Profile 之前调用，目录随 Profile 一起删除)
+    返回:
+        int: 释放的 Blob 数量
+    """
+    return sum(store.release(manifest_digests(manifest)) for _, manifest in iter_manifests(profile_path))
+
+
+def iter_manifests(profile_path):
+    """逐个产出 (版本号, manifest)，用于校验存储"""
+    for v in list_versions(profile_path):
+        try:
+            yield v['id'], load_version(profile_path, v['id'])[1]
+        except (OSError, ValueError):
+            continue
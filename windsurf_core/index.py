@@ -0,0 +1,163 @@
+"""
+Profile 索引
+列表需要的信息 (邮箱、保存时间、大小及各数据位置的大小、文件数、manifest 哈希、state.vscdb 哈希、历史版本摘要)
+汇总在一个 JSON 文件中，刷新列表只读这一个文件，不再逐个打开 profile_meta.json。
+保存和删除 Profile 时同步更新索引；索引记录了 Profile 目录的 mtime，
+目录中有增删 (例如手动复制或删除了 Profile) 时会自动重新扫描。
+"""
+
+import os
+import json
+import threading
+
+from .account import manifest_state_db
+from .history import list_versions
+from .profiles import META_NAME, MANIFEST_NAME, load_manifest, manifest_root_sizes, manifest_totals
+from .store import STORE_DIRNAME, hash_file, write_json_atomic
+
+INDEX_NAME = 'index.json'
+INDEX_VERSION = 6
+
+
+def build_entry(name, meta, manifest=None, manifest_hash=None, versions=()):
+    """生成一条索引记录 (versions 为 history.list_versions 的返回值)"""
+    size, files = manifest_totals(manifest)
+    return {
+        'name': name,
+        'email': meta.get('email'),
+        'saved_at': meta.get('saved_at'),
+        'size': size,
+        # 存储中实际占用的大小 (压缩后)，旧版 Profile 没有该信息
+        'stored_size': meta.get('stored_size'),
+        'files': files,
+        # 各数据位置的大小，列表中显示占用明细
+        'root_sizes': manifest_root_sizes(manifest),
+        'manifest_hash': manifest_hash,
+        # state.vscdb 的 Blob 哈希，列表据此读取各 Profile 的登录状态
+        'state_db': manifest_state_db(manifest),
+        # 保存时记录的登录状态，旧版 Profile 没有该信息 (为 None)
+        'signed_in': meta.get('signed_in'),
+        'versions': list(versions),
+    }
+
+
+class ProfileIndex:
+    """PROFILES_DIR/.store/index.json 的读写"""
+
+    def __init__(self, profiles_dir):
+        self.profiles_dir = profiles_dir
+        self.path = os.path.join(profiles_dir, STORE_DIRNAME, INDEX_NAME)
+        self._lock = threading.RLock()
+
+    def _dir_mtime_ns(self):
+        try:
+            return os.stat(self.profiles_dir).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        return data
+
+    def _listdir(self):
+        try:
+            return sorted(n for n in os.listdir(self.profiles_dir) if not n.startswith('.'))
+        except FileNotFoundError:
+            return []
+
+    def _write(self, profiles, entries):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_json_atomic(self.path, {
+            'version': INDEX_VERSION,
+            'dir_mtime_ns': self._dir_mtime_ns(),
+            'entries': entries,
+            'profiles': profiles,
+        })
+
+    def load(self):
+        """
+        读取全部 Profile 的索引记录
+        索引缺失、损坏或 Profile 目录有增删时重新扫描并写回。
+        返回:
+            list: 按名称排序的索引记录
+        """
+        with self._lock:
+            data = self._read()
+            if data is None or data['dir_mtime_ns'] != self._dir_mtime_ns():
+                profiles = self.rebuild()
+            else:
+                profiles = data['profiles']
+        return [profiles[name] for name in sorted(profiles)]
+
+    def rebuild(self):
+        """
+        扫描 Profile 目录重建索引
+        返回:
+            dict: {Profile 名称: 索引记录}
+        """
+        profiles = {}
+        with self._lock:
+            if not os.path.isdir(self.profiles_dir):
+                return profiles
+            entries = self._listdir()
+            for name in entries:
+                profile_path = os.path.join(self.profiles_dir, name)
+                meta_file = os.path.join(profile_path, META_NAME)
+                if not os.path.isfile(meta_file):
+                    continue
+                try:
+                    with open(meta_file, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    profiles[name] = self._entry(name, meta, load_manifest(profile_path))
+                except (OSError, ValueError) as e:
+                    profiles[name] = {'name': name, 'error': str(e)}
+            self._write(profiles, entries)
+        return profiles
+
+    def _modify(self, name, entry):
+        with self._lock:
+            data = self._read()
+            entries = self._listdir()
+            # 目录 mtime 变化只来自本次保存/删除时 (目录列表只差这一项) 才增量更新，
+            # 否则说明还有其他改动，整体重建
+            expected = set(data['entries']) if data else set()
+            expected.discard(name)
+            if data is None or expected != set(entries) - {name}:
+                self.rebuild()
+                return
+            if entry is None:
+                data['profiles'].pop(name, None)
+            else:
+                data['profiles'][name] = entry
+            self._write(data['profiles'], entries)
+
+    def _entry(self, name, meta, manifest):
+        profile_path = os.path.join(self.profiles_dir, name)
+        manifest_hash = None
+        if manifest is not None:
+            manifest_hash = hash_file(os.path.join(profile_path, MANIFEST_NAME))
+        return build_entry(name, meta, manifest, manifest_hash, list_versions(profile_path))
+
+    def update(self, name, meta, manifest):
+        """保存 Profile 后写入或替换一条记录 (参数为刚写入的 meta 和 manifest)"""
+        self._modify(name, self._entry(name, meta, manifest))
+
+    def update_versions(self, name, versions):
+        """历史版本有增删时只替换该 Profile 记录中的版本列表"""
+        with self._lock:
+            data = self._read()
+            entry = data['profiles'].get(name) if data else None
+            if entry is None:
+                self.rebuild()
+                return
+            self._modify(name, dict(entry, versions=list(versions)))
+
+    def remove(self, name):
+        """删除 Profile 后移除对应记录"""
+        self._modify(name, None)
@@ -0,0 +1,103 @@
+"""
+state.vscdb 的 ItemTable 键级增量还原
+登录身份保存在 ItemTable 的少数几行中 (如 windsurfAuthStatus)。
+这里比较保存的数据库与本机数据库，只在一个事务中写入有差异的行，
+globalStorage 中其他编辑器状态保持不变。
+"""
+
+import fnmatch
+import sqlite3
+
+from .sqlite_snapshot import open_readonly
+
+# 默认同步的键: Windsurf / Codeium 的登录状态及其 secret 存储
+AUTH_KEY_PATTERNS = (
+    'windsurfAuthStatus',
+    'windsurf*',
+    'codeium*',
+    'secret://*codeium*',
+    'secret://*windsurf*',
+)
+
+# key_patterns 传入 ALL_KEYS 时同步所有有差异的键
+ALL_KEYS = None
+
+
+def _value_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return len(value)
+
+
+def _matches(key, patterns):
+    return patterns is ALL_KEYS or any(fnmatch.fnmatchcase(key, p) for p in patterns)
+
+
+def read_items(conn, patterns=ALL_KEYS):
+    """读取 ItemTable 中匹配的键值"""
+    rows = conn.execute("SELECT key, value FROM ItemTable").fetchall()
+    return {key: value for key, value in rows if _matches(key, patterns)}
+
+
+def diff_items(saved_db, live_db, patterns=AUTH_KEY_PATTERNS):
+    """
+    比较保存的数据库与本机数据库
+    返回:
+        dict: upsert ({键: 保存的值})、delete (本机多出的键)、
+              previous ({键: 本机原值}，用于撤销)
+    """
+    # saved_db 是从存储中取出的临时副本，不会被修改；不加 immutable 时 WAL 模式的快照
+    # 会在临时目录中留下 -wal / -shm 文件
+    saved_conn = open_readonly(saved_db, immutable=True)
+    try:
+        saved = read_items(saved_conn, patterns)
+    finally:
+        saved_conn.close()
+    live_conn = open_readonly(live_db)
+    try:
+        live = read_items(live_conn, patterns)
+    finally:
+        live_conn.close()
+
+    upsert = {k: v for k, v in saved.items() if live.get(k) != v}
+    delete = [k for k in live if k not in saved]
+    previous = {k: live[k] for k in list(upsert) + delete if k in live}
+    return {'upsert': upsert, 'delete': delete, 'previous': previous}
+
+
+def apply_items(live_db, diff):
+    """
+    在一个事务中写入差异
+    返回:
+        dict: written (写入行数)、deleted (删除行数)、bytes (写入的数据量)
+    """
+    conn = sqlite3.connect(live_db, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO ItemTable (key, value) VALUES (?, ?)",
+                             list(diff['upsert'].items()))
+            conn.executemany("DELETE FROM ItemTable WHERE key = ?",
+                             [(k,) for k in diff['delete']])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return {
+        'written': len(diff['upsert']),
+        'deleted': len(diff['delete']),
+        'bytes': sum(_value_size(v) for v in diff['upsert'].values()),
+    }
+
+
+def revert_items(live_db, diff):
+    """撤销 apply_items 写入的差异 (恢复本机原值)"""
+    previous = diff['previous']
+    apply_items(live_db, {
+        'upsert': previous,
+        'delete': [k for k in diff['upsert'] if k not in previous],
+    })
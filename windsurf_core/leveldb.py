@@ -0,0 +1,347 @@
+"""
+LevelDB 目录的有效文件
+Session Storage 和 Local Storage/leveldb 是 Chromium 的 LevelDB 数据库。长期使用后目录中会残留
+已被合并掉的 .ldb 表文件、已经写入表文件的旧 .log，以及 LOG.old 等，这些文件 LevelDB 打开时
+只会删除，保存它们只是白白增加复制量。
+这里读取 CURRENT 指向的 MANIFEST，按其中的 VersionEdit 记录算出当前版本引用的表文件和仍需回放的
+日志，保存时只保留这些文件 (加上 CURRENT 和该 MANIFEST)，得到的目录可以正常打开。
+MANIFEST 使用 LevelDB 的日志格式: 32 KB 一块，每条记录有 7 字节头 (crc32c、长度、类型)，
+较长的记录拆成 FIRST / MIDDLE / LAST 几段。
+解析失败或引用的文件缺失 (例如 Windsurf 正在写入) 时不做任何排除，按原样保存整个目录。
+MANIFEST 只会追加写入，解析结果按 CURRENT 和 MANIFEST 的 (inode, size, mtime_ns) 缓存，没有变化时不再读取。
+"""
+
+import os
+import re
+import struct
+import threading
+
+from . import trace
+
+CURRENT_NAME = 'CURRENT'
+
+BLOCK_SIZE = 32768
+HEADER_SIZE = 7
+
+# 日志记录类型
+ZERO_TYPE = 0
+FULL_TYPE = 1
+FIRST_TYPE = 2
+MIDDLE_TYPE = 3
+LAST_TYPE = 4
+
+# VersionEdit 字段
+TAG_COMPARATOR = 1
+TAG_LOG_NUMBER = 2
+TAG_NEXT_FILE_NUMBER = 3
+TAG_LAST_SEQUENCE = 4
+TAG_COMPACT_POINTER = 5
+TAG_DELETED_FILE = 6
+TAG_NEW_FILE = 7
+TAG_PREV_LOG_NUMBER = 9
+
+# 可以直接丢弃的文件: 旧的信息日志、写入中途留下的临时文件
+DEAD_NAMES = ('LOG.old',)
+DEAD_SUFFIXES = ('.dbtmp',)
+
+_NUMBERED = re.compile(r'^(\d+)\.(log|ldb|sst)$')
+_MANIFEST = re.compile(r'^MANIFEST-(\d+)$')
+
+
+# ------------------------------------------------------------
+# crc32c (Castagnoli)
+# ------------------------------------------------------------
+_CRC_TABLES = None
+_WORDS = struct.Struct('<II')
+
+
+def _crc_tables():
+    """slicing-by-8 查找表: tables[k][i] 为字节 i 之后再经过 k 个零字节的 crc"""
+    global _CRC_TABLES
+    if _CRC_TABLES is None:
+        base = []
+        for i in range(256):
+            c = i
+            for _ in range(8):
+                c = (c >> 1) ^ 0x82F63B78 if c & 1 else c >> 1
+            base.append(c)
+        tables = [base]
+        for _ in range(7):
+            prev = tables[-1]
+            tables.append([(c >> 8) ^ base[c & 0xFF] for c in prev])
+        _CRC_TABLES = tables
+    return _CRC_TABLES
+
+
+def crc32c(data, crc=0):
+    """crc32c 校验和；每次处理 8 字节 (slicing-by-8)，尾部不足 8 字节的部分逐字节处理"""
+    t0, t1, t2, t3, t4, t5, t6, t7 = _crc_tables()
+    view = memoryview(data)
+    whole = len(view) - len(view) % _WORDS.size
+    crc ^= 0xFFFFFFFF
+    for lo, hi in _WORDS.iter_unpack(view[:whole]):
+        lo ^= crc
+        crc = (t7[lo & 0xFF] ^ t6[(lo >> 8) & 0xFF] ^ t5[(lo >> 16) & 0xFF] ^ t4[lo >> 24]
+               ^ t3[hi & 0xFF] ^ t2[(hi >> 8) & 0xFF] ^ t1[(hi >> 16) & 0xFF] ^ t0[hi >> 24])
+    for b in view[whole:]:
+        crc = t0[(crc ^ b) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def mask_crc(crc):
+    """LevelDB 存储的是变换后的 crc (避免对含有 crc 的数据再求 crc 时出现问题)"""
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+# ------------------------------------------------------------
+# 日志格式
+# ------------------------------------------------------------
+def read_records(data):
+    """
+    按日志格式拆出完整的记录
+    文件末尾不完整的记录 (写入中途) 被忽略；校验和不符时抛出 ValueError
+    """
+    records = []
+    pending = None
+    offset = 0
+    size = len(data)
+    while offset < size:
+        block_left = BLOCK_SIZE - offset % BLOCK_SIZE
+        if block_left < HEADER_SIZE:
+            # 块尾放不下记录头的部分用 0 填充
+            offset += block_left
+            continue
+        if offset + HEADER_SIZE > size:
+            break
+        checksum, length, kind = struct.unpack_from('<IHB', data, offset)
+        if kind == ZERO_TYPE and length == 0:
+            # 预分配的空白区域
+            offset += block_left
+            continue
+        start = offset + HEADER_SIZE
+        end = start + length
+        if end > size:
+            break
+        if length > block_left - HEADER_SIZE:
+            raise ValueError(f"记录跨越块边界 (偏移 {offset})")
+        payload = data[start:end]
+        if mask_crc(crc32c(payload, crc32c(bytes((kind,))))) != checksum:
+            raise ValueError(f"记录校验和不符 (偏移 {offset})")
+        offset = end
+        if kind == FULL_TYPE:
+            records.append(payload)
+            pending = None
+        elif kind == FIRST_TYPE:
+            pending = [payload]
+        elif kind in (MIDDLE_TYPE, LAST_TYPE):
+            if pending is None:
+                raise ValueError(f"缺少开头的分段记录 (偏移 {offset})")
+            pending.append(payload)
+            if kind == LAST_TYPE:
+                records.append(b''.join(pending))
+                pending = None
+        else:
+            raise ValueError(f"未知的记录类型 {kind}")
+    return records
+
+
+# ------------------------------------------------------------
+# VersionEdit
+# ------------------------------------------------------------
+def _varint(data, pos):
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("varint 被截断")
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+        if shift > 63:
+            raise ValueError("varint 过长")
+
+
+def _slice(data, pos):
+    length, pos = _varint(data, pos)
+    if pos + length > len(data):
+        raise ValueError("字段被截断")
+    return data[pos:pos + length], pos + length
+
+
+def decode_edit(data):
+    """
+    解码一条 VersionEdit
+    返回:
+        dict: 出现的字段，new_files 为 [(level, number, size)]，deleted_files 为 [(level, number)]
+    """
+    edit = {'new_files': [], 'deleted_files': []}
+    pos = 0
+    while pos < len(data):
+        tag, pos = _varint(data, pos)
+        if tag == TAG_COMPARATOR:
+            name, pos = _slice(data, pos)
+            edit['comparator'] = name.decode('utf-8', 'replace')
+        elif tag == TAG_LOG_NUMBER:
+            edit['log_number'], pos = _varint(data, pos)
+        elif tag == TAG_PREV_LOG_NUMBER:
+            edit['prev_log_number'], pos = _varint(data, pos)
+        elif tag == TAG_NEXT_FILE_NUMBER:
+            edit['next_file_number'], pos = _varint(data, pos)
+        elif tag == TAG_LAST_SEQUENCE:
+            edit['last_sequence'], pos = _varint(data, pos)
+        elif tag == TAG_COMPACT_POINTER:
+            _, pos = _varint(data, pos)
+            _, pos = _slice(data, pos)
+        elif tag == TAG_DELETED_FILE:
+            level, pos = _varint(data, pos)
+            number, pos = _varint(data, pos)
+            edit['deleted_files'].append((level, number))
+        elif tag == TAG_NEW_FILE:
+            level, pos = _varint(data, pos)
+            number, pos = _varint(data, pos)
+            size, pos = _varint(data, pos)
+            _, pos = _slice(data, pos)  # smallest key
+            _, pos = _slice(data, pos)  # largest key
+            edit['new_files'].append((level, number, size))
+        else:
+            raise ValueError(f"未知的 VersionEdit 字段 {tag}")
+    return edit
+
+
+class Version:
+    """依次应用 MANIFEST 中全部 VersionEdit 后的当前版本"""
+
+    def __init__(self, manifest_name):
+        self.manifest_name = manifest_name
+        self.tables = {}  # (level, number) -> size
+        self.log_number = 0
+        self.prev_log_number = 0
+        self.next_file_number = 0
+
+    def apply(self, edit):
+        for level, number in edit['deleted_files']:
+            self.tables.pop((level, number), None)
+        for level, number, size in edit['new_files']:
+            self.tables[(level, number)] = size
+        self.log_number = edit.get('log_number', self.log_number)
+        self.prev_log_number = edit.get('prev_log_number', self.prev_log_number)
+        self.next_file_number = edit.get('next_file_number', self.next_file_number)
+
+    @property
+    def table_numbers(self):
+        return {number for _, number in self.tables}
+
+    def is_live(self, name):
+        """文件名是否属于当前版本 (LevelDB 打开时会保留的文件)"""
+        if name in DEAD_NAMES or name.endswith(DEAD_SUFFIXES):
+            return False
+        m = _NUMBERED.match(name)
+        if m:
+            number = int(m.group(1))
+            if m.group(2) == 'log':
+                # 打开时回放编号不小于 log_number 的日志 (以及旧版本的 prev_log_number)
+                return number >= self.log_number or number == self.prev_log_number
+            return number in self.table_numbers
+        m = _MANIFEST.match(name)
+        if m:
+            return name == self.manifest_name
+        # CURRENT / LOCK / LOG 以及不认识的文件都保留
+        return True
+
+
+# 目录 -> (CURRENT 和 MANIFEST 的 (inode, size, mtime_ns), Version)
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def _signature(path):
+    # CURRENT 通过改名整体替换 (inode 改变)，MANIFEST 只追加 (size 改变)
+    st = os.stat(path)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def read_version(directory):
+    """
+    读取 LevelDB 目录的当前版本 (CURRENT 和 MANIFEST 没有变化时直接返回上次的结果)
+    异常:
+        OSError: 文件无法读取
+        ValueError: CURRENT 或 MANIFEST 格式不正确
+    """
+    key = os.path.abspath(directory)
+    current_path = os.path.join(directory, CURRENT_NAME)
+    current_sig = _signature(current_path)
+    with _versions_lock:
+        cached = _versions.get(key)
+    if cached is not None and cached[0][0] == current_sig:
+        try:
+            if _signature(os.path.join(directory, cached[1].manifest_name)) == cached[0][1]:
+                return cached[1]
+        except FileNotFoundError:
+            pass
+    with open(current_path, 'rb') as f:
+        current = f.read()
+    name = current.decode('ascii', 'replace').rstrip('\n')
+    if not current.endswith(b'\n') or not _MANIFEST.match(name):
+        raise ValueError(f"CURRENT 内容无效: {current[:64]!r}")
+    manifest_path = os.path.join(directory, name)
+    manifest_sig = _signature(manifest_path)
+    with open(manifest_path, 'rb') as f:
+        data = f.read()
+    version = Version(name)
+    for record in read_records(data):
+        version.apply(decode_edit(record))
+    # 读取期间 CURRENT 或 MANIFEST 有变化时不缓存
+    if (_signature(current_path), _signature(manifest_path)) == (current_sig, manifest_sig) \
+            and len(data) == manifest_sig[1]:
+        with _versions_lock:
+            _versions[key] = ((current_sig, manifest_sig), version)
+    return version
+
+
+def is_leveldb_dir(names):
+    """目录中的文件名 (集合) 是否像一个 LevelDB 数据库"""
+    return CURRENT_NAME in names and any(_MANIFEST.match(n) for n in names)
+
+
+def obsolete_files(base, files):
+    """
+    找出数据位置中各 LevelDB 目录里已经不被引用的文件
+    参数:
+        base: 数据位置的本机路径
+        files: scan_root 返回的 {相对路径: os.stat_result}
+    返回:
+        set: 可以不保存的相对路径
+    """
+    by_dir = {}
+    for rel in files:
+        rel_dir, _, name = rel.rpartition('/')
+        by_dir.setdefault(rel_dir, set()).add(name)
+    obsolete = set()
+    for rel_dir, names in by_dir.items():
+        if not is_leveldb_dir(names):
+            continue
+        directory = os.path.join(base, *rel_dir.split('/')) if rel_dir else base
+        with trace.span('leveldb.live_files', path=rel_dir or '.') as sp:
+            try:
+                version = read_version(directory)
+            except (OSError, ValueError) as e:
+                sp.set(skipped=str(e)[:200])
+                continue
+            if version.manifest_name not in names:
+                sp.set(skipped='manifest missing')
+                continue
+            present = {int(m.group(1)) for m in map(_NUMBERED.match, names)
+                       if m and m.group(2) != 'log'}
+            missing = version.table_numbers - present
+            if missing:
+                # 扫描之后又发生了合并，保守起见保留整个目录
+                sp.set(skipped=f"{len(missing)} tables missing")
+                continue
+            dead = [name for name in names if not version.is_live(name)]
+            prefix = f"{rel_dir}/" if rel_dir else ''
+            obsolete.update(prefix + name for name in dead)
+            sp.add(files=len(dead), bytes=sum(files[prefix + name].st_size for name in dead))
+            sp.set(tables=len(version.tables), log_number=version.log_number)
+    return obsolete
@@ -0,0 +1,273 @@
+"""
+操作指标
+每次保存 / 切换 / 删除 / 核对结束后追加一条记录 (耗时、写入的文件数和字节数、结果、错误类别)
+到 windsurf_profiles/.logs/metrics.jsonl，可以按操作或按 Profile 汇总 p50/p95/p99 耗时和吞吐量，
+也可以导出为 Prometheus textfile 格式 (node_exporter 的 textfile collector 读取)。
+Windsurf 更新后 globalStorage 变大、切换变慢这类回归，可以从历史记录中直接看出。
+"""
+
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+
+from .worker import Cancelled
+
+METRICS_NAME = 'metrics.jsonl'
+
+# 记录文件超过该大小时压缩为最近的 MAX_RECORDS 条
+MAX_BYTES = 4 * 1024 * 1024
+MAX_RECORDS = 10000
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+OUTCOME_OK = 'ok'
+OUTCOME_PARTIAL = 'partial'
+OUTCOME_ERROR = 'error'
+OUTCOME_CANCELLED = 'cancelled'
+
+PROMETHEUS_PREFIX = 'windsurf_switcher'
+
+
+def error_category(error):
+    """把异常归类为少数几种，便于统计"""
+    if isinstance(error, Cancelled):
+        return 'cancelled'
+    if isinstance(error, PermissionError):
+        return 'permission'
+    if isinstance(error, FileNotFoundError):
+        return 'not_found'
+    if isinstance(error, OSError):
+        return 'io'
+    if isinstance(error, sqlite3.Error):
+        return 'sqlite'
+    return type(error).__name__
+
+
+def percentile(values, q):
+    """线性插值的分位数 (values 已排序)"""
+    if not values:
+        return None
+    pos = (len(values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def aggregate(records):
+    """
+    汇总一组记录
+    返回:
+        dict: count、outcomes ({结果: 次数})、errors ({错误类别: 次数})、
+              p50 / p95 / p99 (秒)、files / bytes (合计)、throughput (字节/秒，只计成功的操作)
+    """
+    durations = sorted(r['duration'] for r in records)
+    outcomes = {}
+    errors = {}
+    for r in records:
+        outcomes[r['outcome']] = outcomes.get(r['outcome'], 0) + 1
+        if r.get('error'):
+            errors[r['error']] = errors.get(r['error'], 0) + 1
+    ok = [r for r in records if r['outcome'] == OUTCOME_OK]
+    ok_time = sum(r['duration'] for r in ok)
+    summary = {
+        'count': len(records),
+        'outcomes': outcomes,
+        'errors': errors,
+        'files': sum(r['files'] for r in records),
+        'bytes': sum(r['bytes'] for r in records),
+        'duration_sum': sum(durations),
+        'throughput': sum(r['bytes'] for r in ok) / ok_time if ok_time > 0 else 0.0,
+    }
+    for q in QUANTILES:
+        summary[f"p{int(q * 100)}"] = percentile(durations, q)
+    return summary
+
+
+class MetricsStore:
+    """追加写入的操作记录"""
+
+    def __init__(self, log_dir):
+        self.path = os.path.join(log_dir, METRICS_NAME)
+        self._lock = threading.Lock()
+
+    def record(self, op, profile, duration, files=0, bytes=0, outcome=OUTCOME_OK, error=None, size=None):
+        """
+        追加一条记录
+        参数:
+            op: 操作 (save / switch / delete / verify)
+            profile: Profile 名称
+            duration: 耗时 (秒)
+            files, bytes: 实际写入的文件数和字节数
+            outcome: OUTCOME_* 之一
+            error: 错误类别 (error_category 的返回值)
+            size: Profile 的原始总大小 (已知时)
+        """
+        entry = {
+            'ts': round(time.time(), 3),
+            'op': op,
+            'profile': profile,
+            'duration': round(duration, 6),
+            'files': files,
+            'bytes': bytes,
+            'outcome': outcome,
+        }
+        if error:
+            entry['error'] = error
+        if size is not None:
+            entry['size'] = size
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                too_large = f.tell() > MAX_BYTES
+            if too_large:
+                self._compact()
+
+    def record_span(self, op, profile, span, error=None):
+        """按 trace.Span 的耗时和计数追加记录；span 的 errors 属性非空时记为部分失败"""
+        if error is not None:
+            category = error_category(error)
+            outcome = OUTCOME_CANCELLED if category == 'cancelled' else OUTCOME_ERROR
+        elif span.attrs.get('errors'):
+            category, outcome = 'copy', OUTCOME_PARTIAL
+        else:
+            category, outcome = None, OUTCOME_OK
+        self.record(op, profile, span.duration, span.files, span.bytes, outcome, category,
+                    span.attrs.get('logical_size'))
+
+    def _compact(self):
+        records = self.load()[-MAX_RECORDS:]
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for entry in records:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp, self.path)
+
+    def load(self, op=None, since=None):
+        """
+        读取记录 (按时间顺序)
+        参数:
+            op: 只返回该操作的记录
+            since: 只返回该时间戳 (秒) 之后的记录
+        """
+        records = []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 写入中断留下的半行
+                        continue
+                    if op and entry['op'] != op:
+                        continue
+                    if since and entry['ts'] < since:
+                        continue
+                    records.append(entry)
+        except FileNotFoundError:
+            pass
+        return records
+
+    def summary(self, by_profile=False, since=None):
+        """
+        按操作 (by_profile 时按 操作 + Profile) 汇总
+        返回:
+            dict: {op: aggregate(...)} 或 {(op, profile): aggregate(...)}
+        """
+        groups = {}
+        for r in self.load(since=since):
+            key = (r['op'], r['profile']) if by_profile else r['op']
+            groups.setdefault(key, []).append(r)
+        return {key: aggregate(records) for key, records in sorted(groups.items())}
+
+    # --------------------------------------------------------
+    # Prometheus
+    # --------------------------------------------------------
+    def export_prometheus(self, path, since=None):
+        """以 Prometheus textfile 格式写出汇总 (原子替换，采集时不会读到一半的文件)"""
+        text = self.prometheus_text(since)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def prometheus_text(self, since=None):
+        records = self.load(since=since)
+        by_op = {}
+        by_profile = {}
+        for r in records:
+            by_op.setdefault(r['op'], []).append(r)
+            by_profile.setdefault((r['op'], r['profile']), []).append(r)
+        out = []
+        _summary_metric(out, 'operation_duration_seconds', '操作耗时',
+                        {(('op', op),): aggregate(rs) for op, rs in sorted(by_op.items())})
+        _summary_metric(out, 'profile_operation_duration_seconds', '按 Profile 的操作耗时',
+                        {(('op', op), ('profile', p)): aggregate(rs)
+                         for (op, p), rs in sorted(by_profile.items())})
+
+        _header(out, 'operations_total', 'counter', '按结果统计的操作次数')
+        for op, rs in sorted(by_op.items()):
+            for outcome, count in sorted(aggregate(rs)['outcomes'].items()):
+                out.append(_sample('operations_total', (('op', op), ('outcome', outcome)), count))
+        _header(out, 'operation_errors_total', 'counter', '按错误类别统计的失败次数')
+        for op, rs in sorted(by_op.items()):
+            for category, count in sorted(aggregate(rs)['errors'].items()):
+                out.append(_sample('operation_errors_total', (('op', op), ('category', category)), count))
+        for name, field, help_text in (('operation_files_total', 'files', '写入的文件数'),
+                                       ('operation_bytes_total', 'bytes', '写入的字节数')):
+            _header(out, name, 'counter', help_text)
+            for op, rs in sorted(by_op.items()):
+                out.append(_sample(name, (('op', op),), aggregate(rs)[field]))
+        _header(out, 'operation_throughput_bytes_per_second', 'gauge', '成功操作的平均吞吐量')
+        for op, rs in sorted(by_op.items()):
+            out.append(_sample('operation_throughput_bytes_per_second', (('op', op),),
+                               aggregate(rs)['throughput']))
+
+        sizes = {}
+        for r in records:
+            if r.get('size') is not None:
+                sizes[r['profile']] = r['size']
+        _header(out, 'profile_size_bytes', 'gauge', '最近一次保存时 Profile 的原始大小')
+        for profile, size in sorted(sizes.items()):
+            out.append(_sample('profile_size_bytes', (('profile', profile),), size))
+        return '\n'.join(out) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    """样本值: 整数原样输出，浮点数保留全部精度 (:g 只有 6 位有效数字，字节数的小幅增长会被吞掉)"""
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+def _sample(name, labels, value):
+    label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return f"{PROMETHEUS_PREFIX}_{name}{{{label_text}}} {_format_value(value)}" if label_text else \
+        f"{PROMETHEUS_PREFIX}_{name} {_format_value(value)}"
+
+
+def _header(out, name, kind, help_text):
+    out.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+    out.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {kind}")
+
+
+def _summary_metric(out, name, help_text, groups):
+    _header(out, name, 'summary', help_text)
+    for labels, agg in groups.items():
+        for q in QUANTILES:
+            out.append(_sample(name, labels + (('quantile', f"{q:g}"),), agg[f"p{int(q * 100)}"]))
+        out.append(_sample(name + '_sum', labels, agg['duration_sum']))
+        out.append(_sample(name + '_count', labels, agg['count']))
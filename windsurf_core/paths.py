@@ -0,0 +1,98 @@
+"""
+各平台的 Windsurf 数据位置
+Windows 的 %APPDATA% 与 Mac 的 ~/Library/Application Support 等路径集中在这里，
+界面和命令行共用同一份配置。
+"""
+
+import os
+import sys
+
+from . import rules
+from .profiles import Root
+
+WINDOWS = 'win'
+MAC = 'mac'
+LINUX = 'linux'
+
+# 默认的 Profile 存储目录 (与 windsurf_win.py / windsurf_mac.py 同级的 windsurf_profiles)
+DEFAULT_PROFILES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'windsurf_profiles')
+
+
+def current_platform():
+    """当前运行的平台"""
+    if sys.platform == 'win32':
+        return WINDOWS
+    if sys.platform == 'darwin':
+        return MAC
+    return LINUX
+
+
+class PlatformPaths:
+    """某个平台上 Windsurf 的数据位置"""
+
+    def __init__(self, platform, data_dir, codeium_dir):
+        """
+        参数:
+            platform: WINDOWS / MAC / LINUX
+            data_dir: Windsurf 应用数据目录
+            codeium_dir: Codeium 配置目录
+        """
+        self.platform = platform
+        self.data = data_dir
+        self.user = os.path.join(data_dir, 'User')
+        self.global_storage = os.path.join(self.user, 'globalStorage')
+        self.state_db = os.path.join(self.global_storage, 'state.vscdb')
+        self.session_storage = os.path.join(data_dir, 'Session Storage')
+        self.local_storage = os.path.join(data_dir, 'Local Storage')
+        self.network_dir = os.path.join(data_dir, 'Network')
+        self.codeium_dir = codeium_dir
+
+    def backup_roots(self, ruleset=None):
+        """
+        需要保存/还原的数据位置
+        参数:
+            ruleset: rules.RuleSet，决定各位置排除哪些文件，默认 rules.DEFAULT_RULES
+        返回:
+            list: profiles.Root 列表
+        """
+        roots = [
+            Root('globalStorage', self.global_storage, label='globalStorage (完整目录)'),
+            Root('Session Storage', self.session_storage),
+            Root('Local Storage', self.local_storage),
+        ]
+        if self.platform != MAC:
+            roots.append(Root('Network', self.network_dir))
+        if self.platform != WINDOWS:
+            # Cookies 与 Network Persistent State 直接位于数据目录下，只管理这几个文件
+            roots.append(Root('Cookies', self.data, only=('Cookies', 'Cookies-journal')))
+            roots.append(Root('Network State', self.data, only=('Network Persistent State',)))
+        # 只复制的关键文件列表在 rules.DEFAULT_ONLY 中
+        roots.append(Root('codeium', self.codeium_dir))
+        return (ruleset or rules.RuleSet()).apply(roots)
+
+
+def for_platform(platform=None, environ=None):
+    """
+    按平台生成数据位置
+    参数:
+        platform: WINDOWS / MAC / LINUX，默认当前平台
+        environ: 环境变量 (默认 os.environ)
+    """
+    platform = platform or current_platform()
+    environ = os.environ if environ is None else environ
+    if platform == WINDOWS:
+        return PlatformPaths(
+            platform,
+            os.path.join(environ.get('APPDATA', ''), 'Windsurf'),
+            os.path.join(environ.get('USERPROFILE', ''), '.codeium', 'windsurf'),
+        )
+    home = os.path.expanduser('~')
+    if platform == MAC:
+        data = os.path.join(home, 'Library', 'Application Support', 'Windsurf')
+    elif platform == LINUX:
+        config = environ.get('XDG_CONFIG_HOME') or os.path.join(home, '.config')
+        data = os.path.join(config, 'Windsurf')
+    else:
+        raise ValueError(f"未知平台: {platform}")
+    return PlatformPaths(platform, data, os.path.join(home, '.codeium', 'windsurf'))
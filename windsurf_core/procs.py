@@ -0,0 +1,239 @@
+"""
+Windsurf 进程检测与关闭
+直接枚举系统进程，不再调用 tasklist / pgrep / pkill:
+- Windows: Toolhelp32 快照 (CreateToolhelp32Snapshot)，按可执行文件名 Windsurf.exe 精确匹配
+- macOS: libproc (proc_listpids + proc_pidpath)，匹配 Windsurf.app 包内的主进程和 Helper 进程
+- Linux: 读取 /proc/<pid>/exe，按可执行文件名 windsurf 精确匹配
+命令行里只是包含 "Windsurf" 的其他进程 (如编辑器中打开了 Windsurf 目录的终端) 不会被误判或误杀。
+关闭后以指数退避轮询等待进程全部退出，最后一个进程退出后立即返回，不再固定等待。
+进程退出时系统会关闭它持有的全部文件句柄，之后即可安全替换数据文件。
+"""
+
+import os
+import sys
+import time
+import signal
+
+from . import trace
+
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+elif sys.platform == 'darwin':
+    import ctypes
+    import ctypes.util
+
+WINDOWS_EXE = 'windsurf.exe'
+LINUX_EXE = 'windsurf'
+MAC_BUNDLE = '/Windsurf.app/Contents/'
+
+# 等待退出: 首次间隔、最大间隔 (秒) 和默认期限
+WAIT_INITIAL = 0.01
+WAIT_MAX_INTERVAL = 0.25
+WAIT_DEADLINE = 10.0
+
+
+class ProcessInfo:
+    """一个进程的 pid 和可执行文件路径 (无法读取路径时为进程名)"""
+
+    def __init__(self, pid, exe):
+        self.pid = pid
+        self.exe = exe
+
+    def __repr__(self):
+        return f"ProcessInfo({self.pid}, {self.exe!r})"
+
+
+# ------------------------------------------------------------
+# 各平台的进程枚举
+# ------------------------------------------------------------
+def _linux_processes():
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        pid = int(entry.name)
+        try:
+            exe = os.readlink(f"/proc/{pid}/exe")
+        except FileNotFoundError:
+            continue
+        except OSError:
+            # 其他用户的进程不能读取 exe，退回命令行的第一个参数
+            try:
+                with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                    exe = f.read().split(b'\0', 1)[0].decode('utf-8', 'replace')
+            except OSError:
+                continue
+        if exe.endswith(' (deleted)'):
+            # 运行中被升级替换掉的可执行文件
+            exe = exe[:-len(' (deleted)')]
+        yield ProcessInfo(pid, exe)
+
+
+if sys.platform == 'win32':
+    TH32CS_SNAPPROCESS = 0x00000002
+    PROCESS_TERMINATE = 0x0001
+    INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ('dwSize', wintypes.DWORD),
+            ('cntUsage', wintypes.DWORD),
+            ('th32ProcessID', wintypes.DWORD),
+            ('th32DefaultHeapID', ctypes.c_size_t),
+            ('th32ModuleID', wintypes.DWORD),
+            ('cntThreads', wintypes.DWORD),
+            ('th32ParentProcessID', wintypes.DWORD),
+            ('pcPriClassBase', wintypes.LONG),
+            ('dwFlags', wintypes.DWORD),
+            ('szExeFile', wintypes.WCHAR * 260),
+        ]
+
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _kernel32.CreateToolhelp32Snapshot.argtypes = (wintypes.DWORD, wintypes.DWORD)
+    _kernel32.CreateToolhelp32Snapshot.restype = ctypes.c_void_p
+    _kernel32.Process32FirstW.argtypes = (ctypes.c_void_p, ctypes.POINTER(PROCESSENTRY32W))
+    _kernel32.Process32FirstW.restype = wintypes.BOOL
+    _kernel32.Process32NextW.argtypes = (ctypes.c_void_p, ctypes.POINTER(PROCESSENTRY32W))
+    _kernel32.Process32NextW.restype = wintypes.BOOL
+    _kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+    _kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    _kernel32.OpenProcess.restype = ctypes.c_void_p
+    _kernel32.TerminateProcess.argtypes = (ctypes.c_void_p, wintypes.UINT)
+    _kernel32.TerminateProcess.restype = wintypes.BOOL
+
+
+def _windows_processes():
+    snapshot = _kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+    if snapshot is None or snapshot == INVALID_HANDLE_VALUE:
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+        ok = _kernel32.Process32FirstW(snapshot, ctypes.byref(entry))
+        while ok:
+            yield ProcessInfo(entry.th32ProcessID, entry.szExeFile)
+            ok = _kernel32.Process32NextW(snapshot, ctypes.byref(entry))
+    finally:
+        _kernel32.CloseHandle(snapshot)
+
+
+PROC_ALL_PIDS = 1
+PROC_PIDPATHINFO_MAXSIZE = 4096
+_libproc = None
+
+
+def _mac_processes():
+    global _libproc
+    if _libproc is None:
+        _libproc = ctypes.CDLL(ctypes.util.find_library('proc') or '/usr/lib/libproc.dylib')
+    # 第一次调用得到所需的缓冲区大小，多留一些余量给期间新建的进程
+    size = _libproc.proc_listpids(PROC_ALL_PIDS, 0, None, 0)
+    if size <= 0:
+        raise OSError(ctypes.get_errno(), "proc_listpids 失败")
+    pids = (ctypes.c_int * (size // ctypes.sizeof(ctypes.c_int) + 64))()
+    size = _libproc.proc_listpids(PROC_ALL_PIDS, 0, pids, ctypes.sizeof(pids))
+    path = ctypes.create_string_buffer(PROC_PIDPATHINFO_MAXSIZE)
+    for pid in pids[:size // ctypes.sizeof(ctypes.c_int)]:
+        if pid <= 0:
+            continue
+        if _libproc.proc_pidpath(pid, path, PROC_PIDPATHINFO_MAXSIZE) > 0:
+            yield ProcessInfo(pid, path.value.decode('utf-8', 'replace'))
+
+
+def list_processes():
+    """枚举本机全部进程"""
+    if sys.platform == 'win32':
+        return list(_windows_processes())
+    if sys.platform == 'darwin':
+        return list(_mac_processes())
+    return list(_linux_processes())
+
+
+def is_windsurf(proc):
+    """进程是否属于 Windsurf (按可执行文件精确匹配)"""
+    if sys.platform == 'win32':
+        return os.path.basename(proc.exe).lower() == WINDOWS_EXE
+    if sys.platform == 'darwin':
+        return MAC_BUNDLE in proc.exe
+    return os.path.basename(proc.exe) == LINUX_EXE
+
+
+def find_windsurf():
+    """
+    返回:
+        list: 正在运行的 Windsurf 进程 (ProcessInfo)
+    """
+    own = os.getpid()
+    return [p for p in list_processes() if p.pid != own and is_windsurf(p)]
+
+
+def is_running():
+    """Windsurf 是否正在运行"""
+    with trace.span('process.detect') as sp:
+        found = find_windsurf()
+        sp.set(processes=len(found))
+        return bool(found)
+
+
+# ------------------------------------------------------------
+# 关闭
+# ------------------------------------------------------------
+def _kill(pid):
+    if sys.platform == 'win32':
+        handle = _kernel32.OpenProcess(PROCESS_TERMINATE, False, pid)
+        if not handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            if not _kernel32.TerminateProcess(handle, 1):
+                raise ctypes.WinError(ctypes.get_last_error())
+        finally:
+            _kernel32.CloseHandle(handle)
+    else:
+        os.kill(pid, signal.SIGKILL)
+
+
+def wait_exit(deadline=WAIT_DEADLINE, initial=WAIT_INITIAL, max_interval=WAIT_MAX_INTERVAL):
+    """
+    以指数退避轮询，等待全部 Windsurf 进程退出
+    参数:
+        deadline: 最长等待时间 (秒)
+        initial: 第一次轮询的间隔，之后每次翻倍，不超过 max_interval
+    返回:
+        bool: 期限内全部退出返回 True
+    """
+    with trace.span('process.wait') as sp:
+        end = time.monotonic() + deadline
+        interval = initial
+        polls = 0
+        while True:
+            polls += 1
+            remaining = find_windsurf()
+            if not remaining:
+                sp.set(polls=polls, exited=True)
+                return True
+            now = time.monotonic()
+            if now >= end:
+                sp.set(polls=polls, exited=False, remaining=[p.pid for p in remaining])
+                return False
+            time.sleep(min(interval, end - now))
+            interval = min(interval * 2, max_interval)
+
+
+def force_quit(deadline=WAIT_DEADLINE):
+    """
+    强制结束全部 Windsurf 进程并等待退出
+    返回:
+        bool: 已经没有 Windsurf 进程时返回 True
+    """
+    with trace.span('process.kill') as sp:
+        found = find_windsurf()
+        sp.set(processes=len(found))
+        for proc in found:
+            try:
+                _kill(proc.pid)
+            except ProcessLookupError:
+                # 已经随主进程一起退出
+                pass
+            except OSError as e:
+                trace.warning(f"无法结束进程 {proc.pid}: {e}")
+        return wait_exit(deadline)
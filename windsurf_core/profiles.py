@@ -0,0 +1,610 @@
+"""
+Profile 保存 / 还原 / 删除
+每个 Profile 目录只保存 profile_meta.json 和 manifest.json，
+文件内容统一放在 BlobStore 中，manifest 记录 相对路径 -> Blob 哈希。
+"""
+
+import os
+import json
+import time
+import shutil
+import fnmatch
+
+from . import itemtable, leveldb, sqlite_snapshot, trace
+from .hashcache import RACY_WINDOW_NS
+from .rules import Matcher
+from .store import STORE_DIRNAME, hash_file, write_json_atomic
+from .swap import SwapTransaction
+from .transfer import TransferScheduler, format_errors
+from .worker import Cancelled, Progress
+
+META_NAME = 'profile_meta.json'
+STATE_DB_NAME = 'state.vscdb'
+MANIFEST_NAME = 'manifest.json'
+# 历史版本目录 (见 history.py)
+HISTORY_DIRNAME = 'history'
+
+# 切换前自动保存的本机状态 (见 engine.Engine.undo_switch)
+UNDO_NAME = '.undo'
+
+# Profile 存储目录中供内部使用的名称，不能用作配置名称
+RESERVED_NAMES = {STORE_DIRNAME, UNDO_NAME}
+MANIFEST_VERSION = 1
+
+# 还原方式: full 按文件还原；keys 对 state.vscdb 只写入 ItemTable 中有差异的键
+RESTORE_FULL = 'full'
+RESTORE_KEYS = 'keys'
+
+# 写入后只会被读取或删除、从不原地修改的文件 (LevelDB 的表文件)，
+# 还原时可以直接硬链接存储中的 Blob
+LINKABLE_PATTERNS = ('*.ldb', '*.sst')
+
+
+class Root:
+    """一个需要备份的 Windsurf 数据位置"""
+
+    def __init__(self, name, path, ignore=(), only=None, label=None):
+        """
+        参数:
+            name: 在 Profile 中的名称 (如 'globalStorage')
+            path: 本机实际路径
+            ignore: 需要排除的文件名通配符 (对每一层目录生效，同 shutil.ignore_patterns)；
+                    通常由 rules.RuleSet.apply 设置完整的规则
+            only: 只备份这些顶层文件；设置后还原时不会删除目录中的其他文件
+            label: 在结果提示中显示的名称，默认同 name
+        """
+        self.name = name
+        self.path = path
+        self.matcher = Matcher.from_globs(ignore)
+        self.only = tuple(only) if only is not None else None
+        self.label = label or name
+
+    @property
+    def partial(self):
+        """是否只管理目录中的部分文件"""
+        return self.only is not None
+
+    def managed(self, saved):
+        """
+        去掉 manifest 中按当前规则应排除的文件 (规则修改之前保存的 Profile)，
+        这些文件不再还原或校验，本机的同名条目原样保留
+        """
+        if self.partial or not self.matcher.rules:
+            return saved
+        cache = {}
+        files = {rel: entry for rel, entry in saved['files'].items()
+                 if not self.matcher.excludes_path(rel, size=entry['size'], cache=cache)}
+        dirs = [rel for rel in saved.get('dirs', [])
+                if not self.matcher.excludes_path(rel, is_dir=True, cache=cache)]
+        if len(files) == len(saved['files']) and len(dirs) == len(saved.get('dirs', [])):
+            return saved
+        return dict(saved, files=files, dirs=dirs)
+
+
+# ------------------------------------------------------------
+# 配置名称
+# ------------------------------------------------------------
+def clean_name(name):
+    """去掉配置名称中的非法字符，只保留字母、数字和 _ - ."""
+    return "".join(c for c in name if c.isalnum() or c in ('_', '-', '.'))
+
+
+def check_name(profiles_dir, name):
+    """
+    检查配置名称能否使用: 不能为空、不能以点开头 (包括 . 和 ..)、不能是内部保留的名称，
+    并且必须正好对应 profiles_dir 下的一个子目录
+    返回:
+        str: name
+    异常:
+        ValueError: 名称无效
+    """
+    if not name or name.startswith('.') or name in RESERVED_NAMES:
+        raise ValueError(f"配置名称无效: {name!r}")
+    base = os.path.realpath(profiles_dir)
+    path = os.path.realpath(os.path.join(profiles_dir, name))
+    if os.path.dirname(path) != base:
+        raise ValueError(f"配置名称无效: {name!r}")
+    return name
+
+
+# ------------------------------------------------------------
+# 扫描与 manifest 读写
+# ------------------------------------------------------------
+def scan_root(root, ignored=None):
+    """
+    扫描数据位置下需要备份的文件
+    参数:
+        root: Root
+        ignored: 传入列表时，收集被排除的文件和目录 (只记录最上层的被排除目录)
+    返回:
+        (files, dirs): files 为 {相对路径: os.stat_result}，dirs 为相对目录列表
+        相对路径统一使用 '/' 分隔
+    """
+    files = {}
+    dirs = []
+    if not os.path.exists(root.path):
+        return files, dirs
+
+    if root.partial:
+        for name in root.only:
+            full = os.path.join(root.path, name)
+            if os.path.isfile(full):
+                files[name] = os.stat(full)
+        return files, dirs
+
+    for dirpath, dirnames, filenames in os.walk(root.path):
+        rel_dir = os.path.relpath(dirpath, root.path)
+        rel_dir = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/')
+        kept = []
+        for d in dirnames:
+            rel = f"{rel_dir}/{d}" if rel_dir else d
+            # 被排除的目录直接剪掉，不再进入遍历
+            if root.matcher.excluded(rel, d, True):
+                if ignored is not None:
+                    ignored.append(rel)
+            else:
+                kept.append(d)
+                dirs.append(rel)
+        dirnames[:] = kept
+        for name in filenames:
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            st = os.stat(os.path.join(dirpath, name))
+            if root.matcher.excluded(rel, name, False, st.st_size):
+                if ignored is not None:
+                    ignored.append(rel)
+                continue
+            files[rel] = st
+    return files, dirs
+
+
+def native_path(base, rel):
+    """把 manifest 中的相对路径拼成本机路径"""
+    return os.path.join(base, *rel.split('/'))
+
+
+def load_manifest(profile_path):
+    """读取 Profile 的 manifest，旧版 (整目录复制) 的 Profile 返回 None"""
+    path = os.path.join(profile_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def manifest_digests(manifest):
+    """manifest 引用的全部 Blob 哈希 (每个文件一次)"""
+    if not manifest:
+        return []
+    return [entry['hash']
+            for root in manifest['roots'].values()
+            for entry in root['files'].values()]
+
+
+def manifest_totals(manifest):
+    """
+    manifest 中的文件总大小和文件数
+    返回:
+        (size, files)；旧版 Profile (没有 manifest) 返回 (None, None)
+    """
+    if not manifest:
+        return None, None
+    size = files = 0
+    for root in manifest['roots'].values():
+        for entry in root['files'].values():
+            size += entry['size']
+            files += 1
+    return size, files
+
+
+def manifest_root_sizes(manifest):
+    """
+    manifest 中每个数据位置的原始大小
+    返回:
+        dict: {数据位置名称: 字节数}；manifest 为 None 时为空
+    """
+    if not manifest:
+        return {}
+    return {name: sum(entry['size'] for entry in root['files'].values())
+            for name, root in manifest['roots'].items()}
+
+
+# ------------------------------------------------------------
+# 保存
+# ------------------------------------------------------------
+def save_profile(store, profile_path, roots, meta, workers=None, progress=None, keep_old=False, base=None):
+    """
+    把当前 Windsurf 数据保存为 Profile
+    已有 manifest 时按增量方式保存: size 和 mtime_ns 都没变的文件直接沿用旧哈希，
+    不读取内容；其余文件重新计算哈希，只有存储中没有的内容才会写入。
+    state.vscdb / Cookies 通过 SQLite backup API 做一致性快照 (不保存 -wal 等附属文件)，
+    Windsurf 运行中也可以安全保存。LevelDB 目录只保存当前 MANIFEST 引用的文件。
+    参数:
+        store: BlobStore
+        profile_path: Profile 目录
+        roots: Root 列表
+        meta: 写入 profile_meta.json 的元数据 (会补充 logical_size / stored_size)
+        workers: 并行读取/写入文件的线程数，默认 transfer.DEFAULT_WORKERS
+        progress: worker.Progress，用于报告进度和取消；取消时不会写入 manifest，已有 Profile 保持不变
+        keep_old: 不释放旧 manifest 的 Blob 引用 (由调用方转给历史版本)
+        base: 用于增量比对的 manifest，默认为该 Profile 已有的 manifest；
+              本机数据刚从其他 Profile 还原时传入那个 Profile 的 manifest，未变化的文件不再读取
+    返回:
+        (manifest, stats): 新的 manifest 和 {'changed', 'unchanged', 'removed'} 文件数统计，
+        bytes 为重新读取的文件的字节数，
+        strategies 为写入新 Blob 时各复制/压缩方式的文件数，
+        logical_size / stored_size 为原始大小和存储中实际占用的大小
+    """
+    old_manifest = load_manifest(profile_path)
+    # 只清理新建的目录或已经是 Profile 的目录，其他目录中的文件不能删除
+    is_profile = not os.path.exists(profile_path) or any(
+        os.path.isfile(os.path.join(profile_path, name)) for name in (MANIFEST_NAME, META_NAME))
+    reference = base or old_manifest
+    old_roots = reference['roots'] if reference else {}
+    old_scan_ns = reference.get('scanned_at_ns', 0) if reference else 0
+    manifest = {'version': MANIFEST_VERSION, 'scanned_at_ns': int(time.time() * 1e9), 'roots': {}}
+    stats = {'changed': 0, 'unchanged': 0, 'removed': 0, 'bytes': 0}
+    store.engine.reset_stats()
+    progress = progress or Progress()
+    progress.begin('保存文件')
+    scheduler = TransferScheduler(workers, progress=progress)
+    pending = []
+
+    for root in roots:
+        progress.check()
+        if not os.path.exists(root.path):
+            continue
+        old_files = old_roots.get(root.name, {}).get('files', {})
+        with trace.span('save.scan', root=root.label) as sp:
+            files, dirs = scan_root(root)
+            if not root.partial:
+                # LevelDB 目录中不再被引用的表文件和旧日志不保存
+                for rel in leveldb.obsolete_files(root.path, files):
+                    del files[rel]
+            sp.add(files=len(files), bytes=sum(st.st_size for st in files.values()))
+        entries = {}
+        for rel, st in files.items():
+            name = rel.rsplit('/', 1)[-1]
+            if sqlite_snapshot.sidecar_of(name):
+                continue
+            path = native_path(root.path, rel)
+            old = old_files.get(rel)
+            if sqlite_snapshot.is_snapshot_name(name):
+                source = sqlite_snapshot.source_signature(path)
+                unchanged = (old and old.get('source') == source
+                             and st.st_mtime_ns + RACY_WINDOW_NS < old_scan_ns)
+            else:
+                source = None
+                unchanged = (old and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns
+                             and st.st_mtime_ns + RACY_WINDOW_NS < old_scan_ns)
+            if unchanged and store.has(old['hash']):
+                entries[rel] = dict(old)
+                stats['unchanged'] += 1
+            elif source is not None:
+                task = scheduler.add(root.label, st.st_size, _put_sqlite_snapshot, store, path,
+                                     old['hash'] if old else None)
+                pending.append((entries, rel, st, task, source))
+            else:
+                task = scheduler.add(root.label, st.st_size, _put_live_file, store, path)
+                pending.append((entries, rel, st, task, None))
+        manifest['roots'][root.name] = {
+            'partial': root.partial,
+            'files': entries,
+            'dirs': dirs,
+        }
+
+    try:
+        with trace.span('save.transfer') as sp:
+            results, errors = scheduler.run()
+            snap = progress.snapshot()
+            sp.add(files=snap['files_done'], bytes=snap['bytes_done'])
+    except Cancelled:
+        # 本次写入的 Blob 还没有被任何 manifest 引用，直接回收
+        store.sweep()
+        raise
+    if errors:
+        raise RuntimeError('\n'.join(format_errors(errors)))
+    progress.begin('写入 manifest')
+    for entries, rel, st, task, source in pending:
+        if results[task] is None:
+            continue
+        digest, size = results[task]
+        entries[rel] = {'size': size, 'mtime_ns': st.st_mtime_ns, 'hash': digest}
+        if source is not None:
+            entries[rel]['source'] = source
+        stats['changed'] += 1
+        stats['bytes'] += size
+
+    for name, old_root in old_roots.items():
+        new_files = manifest['roots'].get(name, {}).get('files', {})
+        stats['removed'] += len(set(old_root['files']) - set(new_files))
+
+    os.makedirs(profile_path, exist_ok=True)
+    # 先增加新引用再释放旧引用，两个版本共享的 Blob 不会被误删
+    with trace.span('save.manifest'):
+        store.retain(manifest_digests(manifest))
+        write_json_atomic(os.path.join(profile_path, MANIFEST_NAME), manifest)
+        if not keep_old:
+            store.release(manifest_digests(old_manifest))
+
+    # 覆盖旧版 Profile 时清掉整目录复制留下的文件
+    for name in os.listdir(profile_path) if is_profile else ():
+        if name in (MANIFEST_NAME, META_NAME, HISTORY_DIRNAME):
+            continue
+        full = os.path.join(profile_path, name)
+        if os.path.isdir(full):
+            shutil.rmtree(full)
+        else:
+            os.remove(full)
+
+    # 原始大小与存储占用 (压缩后，按 Blob 去重计算)
+    stats['logical_size'] = sum(entry['size']
+                                for root in manifest['roots'].values()
+                                for entry in root['files'].values())
+    stats['stored_size'] = sum(store.stored_size(d) for d in set(manifest_digests(manifest)))
+    meta = dict(meta, logical_size=stats['logical_size'], stored_size=stats['stored_size'])
+    write_json_atomic(os.path.join(profile_path, META_NAME), meta)
+    stats['strategies'] = dict(store.engine.stats)
+    return manifest, stats
+
+
+def is_linkable(name):
+    """还原时是否可以直接硬链接存储中的 Blob (这类文件保存时也不压缩)"""
+    return any(fnmatch.fnmatch(name, pattern) for pattern in LINKABLE_PATTERNS)
+
+
+def _put_live_file(store, path):
+    """
+    保存单个文件
+    返回:
+        (digest, size)；扫描之后才被 Windsurf 删除的文件返回 None
+    """
+    try:
+        return store.put_file(path, compress=not is_linkable(os.path.basename(path)))
+    except FileNotFoundError:
+        return None
+
+
+def _put_sqlite_snapshot(store, path, base=None):
+    """
+    保存数据库的一致性快照；文件不是 SQLite 数据库时按普通文件保存，
+    其他 SQLite 错误 (被锁定、损坏等) 直接报错，不退回到可能不一致的文件复制
+    参数:
+        base: 上次保存的快照哈希；给出时只保存与它不同的页面
+    返回:
+        (digest, size): 快照内容的哈希和大小
+    """
+    # 数据库及 -wal 自上次快照后没有变化时直接沿用缓存的快照哈希
+    cache = store.hash_cache
+    key = cache.snapshot_key(path) if cache is not None else None
+    cached = cache.lookup_snapshot(key) if key is not None else None
+    if cached is not None and store.has(cached[0]):
+        return cached
+    tmp = store.new_tmp_path('.vscdb')
+    try:
+        sqlite_snapshot.snapshot(path, tmp)
+    except BaseException as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        if isinstance(e, sqlite_snapshot.NotADatabase):
+            return _put_live_file(store, path)
+        raise
+    size = os.path.getsize(tmp)
+    digest = store.adopt(tmp, base=base)
+    if key is not None and cache.snapshot_key(path) == key:
+        cache.record_snapshot(path, key, digest, size)
+    return digest, size
+
+
+# ------------------------------------------------------------
+# 还原
+# ------------------------------------------------------------
+def restore_profile(store, manifest, roots, workers=None, mode=RESTORE_FULL,
+                    key_patterns=itemtable.AUTH_KEY_PATTERNS, progress=None):
+    """
+    按 manifest 增量还原 Windsurf 数据
+    只改写与目标内容不同的文件，并删除 manifest 中没有的多余文件；
+    已经一致的目录不会有任何写入。
+    有差异的目录先在同级暂存目录中构建完整的新内容 (未变化的文件直接硬链接)，
+    全部构建成功后再统一用 rename 替换；任何一步失败都会保持切换前的状态。
+    参数:
+        store: BlobStore
+        manifest: load_manifest 的返回值
+        roots: Root 列表
+        workers: 并行写入文件的线程数，默认 transfer.DEFAULT_WORKERS
+        mode: RESTORE_FULL 或 RESTORE_KEYS；后者不替换 state.vscdb 所在目录，
+              只把 ItemTable 中有差异的行写入本机数据库，其他编辑器状态保持不变
+        key_patterns: RESTORE_KEYS 时同步的键 (通配符)，itemtable.ALL_KEYS 表示所有有差异的键
+        progress: worker.Progress，用于报告进度和取消；在开始替换之前取消会放弃全部暂存数据
+    返回:
+        (errors, success_items, stats): 错误列表、成功列表和
+        {'written', 'deleted', 'unchanged'} 文件数统计，bytes 为写入的字节数，strategies 为各复制方式的文件数，
+        RESTORE_KEYS 时 items 为 {'written', 'deleted', 'bytes'} 行数统计
+    """
+    errors = []
+    stats = {'written': 0, 'deleted': 0, 'unchanged': 0, 'bytes': 0, 'strategies': {}}
+    planned = []
+    txn = SwapTransaction()
+    store.engine.reset_stats()
+    progress = progress or Progress()
+    progress.begin('写入文件')
+    scheduler = TransferScheduler(workers, progress=progress)
+    item_changes = []
+    for root in roots:
+        saved = manifest['roots'].get(root.name)
+        if saved is None:
+            continue
+        saved = root.managed(saved)
+        if progress.cancelled:
+            txn.abort()
+            raise Cancelled()
+        try:
+            live_db = native_path(root.path, STATE_DB_NAME)
+            if mode == RESTORE_KEYS and STATE_DB_NAME in saved['files'] and os.path.exists(live_db):
+                with trace.span('sqlite.diff_items', root=root.label) as sp, \
+                        store.readable(saved['files'][STATE_DB_NAME]['hash']) as saved_db:
+                    changes = itemtable.diff_items(saved_db, live_db, key_patterns)
+                    sp.set(upsert=len(changes['upsert']), delete=len(changes['delete']))
+                item_changes.append((live_db, changes))
+                planned.append((root, None))
+                continue
+            with trace.span('restore.diff', root=root.label) as sp:
+                diff = diff_root(root, saved, store)
+                sp.add(files=len(saved['files']))
+                sp.set(write=len(diff['write']), delete=len(diff['delete']), unchanged=diff['unchanged'])
+            with trace.span('restore.stage', root=root.label) as sp:
+                _stage_root(store, txn, scheduler, root, saved, diff)
+                sp.add(files=len(diff['write']),
+                       bytes=sum(saved['files'][rel]['size'] for rel in diff['write']))
+            planned.append((root, diff))
+        except Exception as e:
+            errors.append(f"{root.label}: {str(e)[:80]}")
+
+    # 所有目录的文件写入一起并行执行
+    try:
+        with trace.span('restore.transfer') as sp:
+            _, transfer_errors = scheduler.run()
+            snap = progress.snapshot()
+            sp.add(files=snap['files_done'], bytes=snap['bytes_done'])
+    except Cancelled:
+        txn.abort()
+        raise
+    errors.extend(format_errors(transfer_errors))
+    if errors:
+        txn.abort()
+        return errors, [], stats
+
+    # 替换只有几次 rename，开始后不再响应取消
+    progress.begin('替换')
+
+    # 先写数据库中的键 (单个事务)，文件替换失败时再写回原值
+    applied = []
+    try:
+        for live_db, changes in item_changes:
+            with trace.span('sqlite.apply_items', path=live_db) as sp:
+                summary = itemtable.apply_items(live_db, changes)
+                sp.set(written=summary['written'], deleted=summary['deleted'])
+                sp.add(bytes=summary['bytes'])
+            applied.append((live_db, changes))
+            items = stats.setdefault('items', {'written': 0, 'deleted': 0, 'bytes': 0})
+            for key in items:
+                items[key] += summary[key]
+        with trace.span('restore.commit'):
+            txn.commit()
+    except Exception as e:
+        txn.abort()
+        for live_db, changes in reversed(applied):
+            itemtable.revert_items(live_db, changes)
+        stats.pop('items', None)
+        return [f"替换失败，已保持原状态: {str(e)[:80]}"], [], stats
+
+    for root, diff in planned:
+        if diff is None:
+            continue
+        stats['written'] += len(diff['write'])
+        stats['bytes'] += sum(manifest['roots'][root.name]['files'][rel]['size'] for rel in diff['write'])
+        stats['deleted'] += len(diff['delete'])
+        stats['unchanged'] += diff['unchanged']
+    stats['strategies'] = dict(store.engine.stats)
+    return errors, [root.label for root, _ in planned], stats
+
+
+def diff_root(root, saved, store=None):
+    """
+    比较本机数据与 manifest
+    先比较 size 和 mtime_ns，size 相同但 mtime 不同时再比较内容哈希。
+    参数:
+        store: 传入 BlobStore 时通过其哈希缓存计算哈希
+    返回:
+        dict: write (需要写入的相对路径)、delete (多余的相对路径)、
+              touch (内容相同只需修正 mtime 的相对路径)、unchanged (一致的文件数)、
+              extra_dirs (多余的目录)、ignored (被排除、需要原样保留的条目)
+    """
+    hash_path = store.hash_path if store is not None else hash_file
+    ignored = []
+    live_files, live_dirs = scan_root(root, ignored)
+    saved_dirs = set(saved.get('dirs', []))
+    diff = {'write': [], 'delete': [], 'touch': [], 'unchanged': 0,
+            'extra_dirs': [d for d in live_dirs if d not in saved_dirs],
+            'ignored': ignored}
+    for rel, entry in saved['files'].items():
+        st = live_files.get(rel)
+        if st is None or st.st_size != entry['size']:
+            diff['write'].append(rel)
+        elif st.st_mtime_ns == entry['mtime_ns']:
+            diff['unchanged'] += 1
+        elif hash_path(native_path(root.path, rel)) == entry['hash']:
+            diff['touch'].append(rel)
+            diff['unchanged'] += 1
+        else:
+            diff['write'].append(rel)
+    if not root.partial:
+        diff['delete'] = [rel for rel in live_files if rel not in saved['files']]
+    return diff
+
+
+def _materialize(store, rel, digest, dst, mtime_ns):
+    store.copy_to(digest, dst, link=is_linkable(rel.rsplit('/', 1)[-1]))
+    os.utime(dst, ns=(mtime_ns, mtime_ns))
+
+
+def _reuse_live(store, src, dst, mtime_ns):
+    # 未变化的文件: 旧目录提交后即被删除，直接硬链接复用
+    store.engine.copy(src, dst, link=True)
+    os.utime(dst, ns=(mtime_ns, mtime_ns))
+
+
+def _stage_root(store, txn, scheduler, root, saved, diff):
+    """创建暂存结构，文件写入任务交给 scheduler 并行执行"""
+    if not (diff['write'] or diff['delete'] or diff['touch'] or diff['extra_dirs']):
+        return
+
+    if root.partial:
+        # 只管理部分文件的位置不能整体替换，逐个文件暂存后 rename
+        os.makedirs(root.path, exist_ok=True)
+        for rel in diff['write']:
+            entry = saved['files'][rel]
+            staged = txn.stage_file(native_path(root.path, rel))
+            scheduler.add(root.label, entry['size'], _materialize,
+                          store, rel, entry['hash'], staged, entry['mtime_ns'])
+            if 'source' in entry:
+                # 快照数据库不带附属文件，残留的 -wal / -journal 会被 SQLite 当成未完成的事务回放
+                for suffix in sqlite_snapshot.SIDECAR_SUFFIXES:
+                    txn.stage_remove(native_path(root.path, rel) + suffix)
+        for rel in diff['touch']:
+            txn.stage_touch(native_path(root.path, rel), saved['files'][rel]['mtime_ns'])
+        return
+
+    staged = txn.stage_dir(root.path)
+    for rel in saved.get('dirs', []):
+        os.makedirs(native_path(staged, rel), exist_ok=True)
+    write = set(diff['write'])
+    # 硬链接与实际文件共用 inode，暂存时修正 mtime 会同时改到实际文件，放弃时需要恢复
+    for rel in diff['touch']:
+        txn.keep_mtime(native_path(root.path, rel))
+    for rel, entry in saved['files'].items():
+        dst = native_path(staged, rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if rel in write:
+            scheduler.add(root.label, entry['size'], _materialize,
+                          store, rel, entry['hash'], dst, entry['mtime_ns'])
+        else:
+            # 硬链接不读写数据，按 0 字节计入限流
+            scheduler.add(root.label, 0, _reuse_live,
+                          store, native_path(root.path, rel), dst, entry['mtime_ns'])
+    # 被排除的条目不属于 Profile，提交时原样移入新目录
+    for rel in diff['ignored']:
+        txn.carry(staged, rel.split('/'))
+
+
+# ------------------------------------------------------------
+# 删除
+# ------------------------------------------------------------
+def delete_profile(store, profile_path):
+    """
+    删除 Profile，并回收不再被任何 Profile 引用的 Blob
+    返回:
+        int: 释放的 Blob 数量
+    """
+    manifest = load_manifest(profile_path)
+    shutil.rmtree(profile_path)
+    return store.release(manifest_digests(manifest))
@@ -0,0 +1,381 @@
+"""
+保存范围规则
+决定每个数据位置中哪些文件和目录属于 Profile。规则写在 windsurf_profiles/rules.json 中
+(不存在时使用 DEFAULT_RULES / DEFAULT_ONLY，与之前写死的排除列表相同):
+    {
+      "version": 1,
+      "only": {"codeium": ["installation_id", "user_settings.pb"]},
+      "rules": [
+        {"root": "globalStorage", "glob": "*.backup.*"},
+        {"root": "globalStorage", "glob": "ms-*"},
+        {"root": "globalStorage", "glob": "some.extension/cache/", "name": "扩展缓存"},
+        {"root": "*", "regex": "\\\\.log$", "larger_than": 10485760},
+        {"root": "globalStorage", "action": "include", "glob": "ms-vscode.keep"}
+      ]
+    }
+每条规则的条件 (同时满足才算匹配):
+    glob: 通配符；不含 '/' 时匹配每一层的名称，含 '/' 时匹配从数据位置开始的相对路径，
+          '*' 不跨越 '/'，'**' 匹配任意层目录，以 '/' 结尾只匹配目录
+    regex: 对相对路径 (以 '/' 分隔) 做 re.search
+    larger_than: 大于该字节数的文件
+    type: 'file' 或 'dir'
+root 为规则适用的数据位置名称 (通配符，默认 '*')，action 为 exclude (默认) 或 include。
+按顺序第一条匹配的规则决定去留，没有匹配的条目保留。
+被排除的目录不会被遍历 (其中的条目也不能再被 include 规则选回)，大型扩展缓存不会拖慢扫描。
+only 为只管理部分顶层文件的数据位置及其文件列表。
+省略 rules 或 only 时该项使用默认值 (DEFAULT_RULES / DEFAULT_ONLY)，只写排除规则的文件不会让
+codeium 等位置变成整目录管理 (还原时会删除 Profile 中没有的文件)；确实不需要时写成 [] / {}。
+规则在加载时编译一次；dry_run 统计每条规则保留和排除的文件数与字节数。
+"""
+
+import os
+import re
+import json
+import fnmatch
+
+from . import trace
+
+RULES_NAME = 'rules.json'
+RULES_VERSION = 1
+
+EXCLUDE = 'exclude'
+INCLUDE = 'include'
+
+DEFAULT_RULES = [
+    {'root': 'globalStorage', 'glob': '*.backup.*'},
+    {'root': 'globalStorage', 'glob': 'ms-*'},
+]
+
+# 只复制关键文件，不复制大型缓存
+DEFAULT_ONLY = {
+    'codeium': ['installation_id', 'user_settings.pb'],
+}
+
+_KEYS = ('name', 'root', 'action', 'glob', 'regex', 'larger_than', 'type')
+
+# Windows 的文件名不区分大小写 (与 fnmatch.fnmatch 一致)
+_GLOB_FLAGS = re.IGNORECASE if os.name == 'nt' else 0
+
+
+def glob_to_regex(pattern):
+    """把通配符编译为正则 ('*' / '?' 不匹配 '/'，'**' 匹配任意层目录)"""
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            if pattern[i:i + 1] == '*':
+                i += 1
+                if pattern[i:i + 1] == '/':
+                    i += 1
+                    out.append('(?:.*/)?')
+                else:
+                    out.append('.*')
+            else:
+                out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = i
+            if pattern[j:j + 1] == '!':
+                j += 1
+            if pattern[j:j + 1] == ']':
+                j += 1
+            end = pattern.find(']', j)
+            if end < 0:
+                out.append(re.escape(c))
+                continue
+            body = pattern[i:end]
+            i = end + 1
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            out.append('[' + body.replace('\\', '\\\\') + ']')
+        else:
+            out.append(re.escape(c))
+    return re.compile(''.join(out), re.DOTALL | _GLOB_FLAGS)
+
+
+class Rule:
+    """一条编译后的规则"""
+
+    def __init__(self, spec):
+        """
+        参数:
+            spec: 规则文件中的一条 (dict)
+        异常:
+            ValueError: 规则写法不正确
+        """
+        unknown = set(spec) - set(_KEYS)
+        if unknown:
+            raise ValueError(f"未知的规则字段: {', '.join(sorted(unknown))}")
+        self.spec = dict(spec)
+        self.root = spec.get('root', '*')
+        self.action = spec.get('action', EXCLUDE)
+        if self.action not in (EXCLUDE, INCLUDE):
+            raise ValueError(f"action 只能是 {EXCLUDE} 或 {INCLUDE}: {self.action}")
+        self.type = spec.get('type')
+        if self.type not in (None, 'file', 'dir'):
+            raise ValueError(f"type 只能是 file 或 dir: {self.type}")
+        self.larger_than = spec.get('larger_than')
+        if self.larger_than is not None and not isinstance(self.larger_than, int):
+            raise ValueError(f"larger_than 应为字节数: {self.larger_than}")
+
+        self._glob = None
+        self._glob_path = False
+        pattern = spec.get('glob')
+        if pattern:
+            if pattern.endswith('/'):
+                pattern = pattern.rstrip('/')
+                self.type = 'dir'
+            # 含 '/' 的通配符按相对路径匹配 (开头的 '/' 可省略)
+            self._glob_path = '/' in pattern
+            self._glob = glob_to_regex(pattern.lstrip('/'))
+        self._regex = None
+        if spec.get('regex'):
+            try:
+                self._regex = re.compile(spec['regex'])
+            except re.error as e:
+                raise ValueError(f"正则表达式无效 {spec['regex']!r}: {e}")
+        if self._glob is None and self._regex is None and self.larger_than is None:
+            raise ValueError(f"规则没有任何条件: {spec}")
+        self.label = spec.get('name') or self._describe()
+
+    def _describe(self):
+        parts = []
+        for key in ('glob', 'regex', 'larger_than', 'type'):
+            if self.spec.get(key) is not None:
+                parts.append(f"{key}={self.spec[key]}")
+        return f"{self.action} " + ' '.join(parts)
+
+    def applies_to(self, root_name):
+        return fnmatch.fnmatchcase(root_name, self.root)
+
+    def matches(self, rel, name, is_dir, size=None):
+        if self.type is not None and (self.type == 'dir') != is_dir:
+            return False
+        if self.larger_than is not None and (is_dir or size is None or size <= self.larger_than):
+            return False
+        if self._glob is not None and not self._glob.fullmatch(rel if self._glob_path else name):
+            return False
+        if self._regex is not None and not self._regex.search(rel):
+            return False
+        return True
+
+
+class Matcher:
+    """一个数据位置适用的规则 (按顺序，第一条匹配的生效)"""
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+
+    @classmethod
+    def from_globs(cls, patterns):
+        """由名称通配符列表生成排除规则 (同 shutil.ignore_patterns)"""
+        return cls(Rule({'glob': pattern}) for pattern in patterns)
+
+    def match(self, rel, name, is_dir, size=None):
+        """
+        返回:
+            Rule: 第一条匹配的规则，没有匹配返回 None
+        """
+        for rule in self.rules:
+            if rule.matches(rel, name, is_dir, size):
+                return rule
+        return None
+
+    def excluded(self, rel, name, is_dir, size=None):
+        """条目被排除时返回生效的规则，否则返回 None"""
+        rule = self.match(rel, name, is_dir, size) if self.rules else None
+        return rule if rule is not None and rule.action == EXCLUDE else None
+
+    def excludes_path(self, rel, is_dir=False, size=None, cache=None):
+        """
+        条目 rel 是否被排除 (包括位于被排除的目录中)
+        参数:
+            cache: 逐个检查大量路径时传入同一个 dict，缓存各级目录的结果
+        """
+        if not self.rules:
+            return False
+        parts = rel.split('/')
+        for i in range(1, len(parts)):
+            prefix = '/'.join(parts[:i])
+            hit = cache.get(prefix) if cache is not None else None
+            if hit is None:
+                hit = self.excluded(prefix, parts[i - 1], True) is not None
+                if cache is not None:
+                    cache[prefix] = hit
+            if hit:
+                return True
+        return self.excluded(rel, parts[-1], is_dir, size) is not None
+
+
+class RuleSet:
+    """规则文件的全部内容"""
+
+    def __init__(self, rules=None, only=None, path=None):
+        """
+        参数:
+            rules: 规则列表 (dict)，默认 DEFAULT_RULES
+            only: {数据位置名称: 文件列表}，默认 DEFAULT_ONLY
+            path: 来源文件，使用默认规则时为 None
+        异常:
+            ValueError: 规则写法不正确
+        """
+        specs = DEFAULT_RULES if rules is None else rules
+        self.rules = []
+        for i, spec in enumerate(specs):
+            try:
+                self.rules.append(Rule(spec))
+            except (ValueError, TypeError, AttributeError) as e:
+                raise ValueError(f"第 {i + 1} 条规则: {e}")
+        self.only = {name: tuple(files) for name, files in (DEFAULT_ONLY if only is None else only).items()}
+        self.path = path
+        self.error = None
+
+    def matcher(self, root_name):
+        return Matcher(rule for rule in self.rules if rule.applies_to(root_name))
+
+    def apply(self, roots):
+        """把规则设置到各数据位置 (Root.matcher / Root.only)，返回 roots"""
+        for root in roots:
+            root.matcher = self.matcher(root.name)
+            if root.name in self.only:
+                root.only = self.only[root.name]
+        return roots
+
+    def to_dict(self):
+        return {
+            'version': RULES_VERSION,
+            'only': {name: list(files) for name, files in self.only.items()},
+            'rules': [rule.spec for rule in self.rules],
+        }
+
+
+def rules_path(profiles_dir):
+    return os.path.join(profiles_dir, RULES_NAME)
+
+
+def load(profiles_dir):
+    """
+    读取规则文件；文件不存在时使用默认规则
+    规则文件有误时报告原因 (trace.warning) 并退回默认规则 (RuleSet.error 记录错误)
+    """
+    path = rules_path(profiles_dir)
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return RuleSet()
+    except (OSError, ValueError) as e:
+        return _fallback(path, e)
+    try:
+        if data.get('version') != RULES_VERSION:
+            raise ValueError(f"不支持的版本: {data.get('version')}")
+        # 缺少的项沿用默认值，而不是当作空
+        return RuleSet(data.get('rules'), data.get('only'), path)
+    except (ValueError, TypeError, AttributeError) as e:
+        return _fallback(path, e)
+
+
+def _fallback(path, error):
+    trace.warning(f"规则文件 {path} 无效，使用默认规则: {error}")
+    ruleset = RuleSet()
+    ruleset.error = str(error)
+    return ruleset
+
+
+def write_default(profiles_dir):
+    """写出默认规则文件 (已存在时不覆盖)，返回文件路径"""
+    path = rules_path(profiles_dir)
+    os.makedirs(profiles_dir, exist_ok=True)
+    with open(path, 'x', encoding='utf-8') as f:
+        json.dump(RuleSet().to_dict(), f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return path
+
+
+# ------------------------------------------------------------
+# 预演
+# ------------------------------------------------------------
+def _tree_size(path):
+    files = size = 0
+    stack = [path]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        files += 1
+                        size += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+    return files, size
+
+
+def dry_run(roots):
+    """
+    按当前规则统计每个数据位置中会保留和排除的内容 (不做任何修改)
+    被排除的目录在这里会完整遍历一次，以便统计其大小。
+    返回:
+        list: [{'root', 'rule', 'action', 'files', 'bytes'}, ...]，
+              rule 为规则名称，未匹配任何规则而保留的条目记为 '(默认保留)'，
+              只管理部分文件的位置记为 '(only)'
+    """
+    rows = []
+    for root in roots:
+        counts = {}
+
+        def add(label, action, files, size):
+            row = counts.setdefault(label, {'root': root.label, 'rule': label, 'action': action,
+                                            'files': 0, 'bytes': 0})
+            row['files'] += files
+            row['bytes'] += size
+
+        if not os.path.isdir(root.path):
+            continue
+        if root.partial:
+            for name in root.only:
+                full = os.path.join(root.path, name)
+                if os.path.isfile(full):
+                    add('(only)', INCLUDE, 1, os.path.getsize(full))
+            rows.extend(counts.values())
+            continue
+
+        matcher = root.matcher
+        stack = [(root.path, '')]
+        while stack:
+            path, rel_dir = stack.pop()
+            try:
+                it = os.scandir(path)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        size = None if is_dir else entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                    rule = matcher.match(rel, entry.name, is_dir, size)
+                    if rule is not None and rule.action == EXCLUDE:
+                        files, size = _tree_size(entry.path) if is_dir else (1, size)
+                        add(rule.label, EXCLUDE, files, size)
+                    elif is_dir:
+                        stack.append((entry.path, rel))
+                    elif rule is not None:
+                        add(rule.label, INCLUDE, 1, size)
+                    else:
+                        add('(默认保留)', INCLUDE, 1, size)
+        # 按规则顺序列出，默认保留的放在最后
+        order = {rule.label: i for i, rule in reversed(list(enumerate(matcher.rules)))}
+        rows.extend(sorted(counts.values(), key=lambda row: order.get(row['rule'], len(order))))
+    return rows
@@ -0,0 +1,108 @@
+"""
+SQLite 数据库的在线快照
+Windsurf 运行时 state.vscdb / Cookies 处于打开状态，直接复制文件可能得到写了一半的
+数据库，也会漏掉 -wal 中尚未合并的内容。这里通过 SQLite 的 backup API 分批复制页面，
+得到与某一时刻事务一致的数据库副本，不需要先关闭 Windsurf。
+"""
+
+import os
+import sqlite3
+from urllib.parse import quote
+
+from . import trace
+
+# 需要做在线快照的数据库文件名
+SQLITE_NAMES = ('state.vscdb', 'Cookies')
+
+# 数据库的附属文件，快照已包含其中的内容，不需要也不应该单独保存
+SIDECAR_SUFFIXES = ('-wal', '-shm', '-journal')
+
+# 每批复制的页数，批次之间让出锁，Windsurf 的写入不会被长时间阻塞
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.005
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+# Python 3.7 起 sqlite3 才提供 backup()
+AVAILABLE = hasattr(sqlite3.Connection, 'backup')
+
+
+class NotADatabase(sqlite3.DatabaseError):
+    """文件不是 SQLite 数据库 (没有 SQLite 文件头)"""
+
+
+def is_snapshot_name(name):
+    """文件名是否属于需要在线快照的数据库"""
+    return AVAILABLE and name in SQLITE_NAMES
+
+
+def sidecar_of(name):
+    """
+    如果 name 是某个快照数据库的附属文件，返回数据库文件名，否则返回 None
+    """
+    for suffix in SIDECAR_SUFFIXES:
+        if name.endswith(suffix) and is_snapshot_name(name[:-len(suffix)]):
+            return name[:-len(suffix)]
+    return None
+
+
+def source_signature(path):
+    """
+    数据库及其 -wal 的 (size, mtime_ns)，用于判断上次快照后是否有变化
+    WAL 模式下写入先落在 -wal 中，主文件的 mtime 不一定变化。
+    """
+    sig = []
+    for p in (path, path + '-wal'):
+        try:
+            st = os.stat(p)
+            sig.extend([st.st_size, st.st_mtime_ns])
+        except FileNotFoundError:
+            sig.extend([0, 0])
+    return sig
+
+
+def open_readonly(path, immutable=False):
+    """
+    以只读方式打开数据库 (不会修改数据库内容)
+    WAL 模式的数据库在不加 immutable 时，SQLite 仍会在旁边创建 -wal / -shm 文件 (关闭后可能残留)。
+    参数:
+        immutable: 声明文件不会被修改，SQLite 不再加锁也不读取或创建 -wal / -shm；
+                   只用于存储中的 Blob 或没有 -wal 的数据库
+    """
+    uri = f"file:{quote(os.path.abspath(path))}?mode=ro"
+    if immutable:
+        uri += '&immutable=1'
+    return sqlite3.connect(uri, uri=True)
+
+
+def snapshot(src, dst, pages=BACKUP_PAGES):
+    """
+    把 src 数据库的一致性快照写到 dst
+    参数:
+        src: 正在使用中的数据库
+        dst: 快照文件路径 (已存在时会被覆盖)
+        pages: 每批复制的页数
+    异常:
+        NotADatabase: src 不是 SQLite 数据库
+        sqlite3.Error: 读取或写入快照失败 (数据库被锁定、损坏等)
+    """
+    if os.path.exists(dst):
+        os.remove(dst)
+    with open(src, 'rb') as f:
+        if f.read(len(SQLITE_HEADER)) != SQLITE_HEADER:
+            raise NotADatabase(f"不是 SQLite 数据库: {src}")
+    with trace.span('sqlite.snapshot', path=src) as sp:
+        src_conn = open_readonly(src)
+        try:
+            dst_conn = sqlite3.connect(dst)
+            try:
+                src_conn.backup(dst_conn, pages=pages, sleep=BACKUP_SLEEP)
+            finally:
+                dst_conn.close()
+        finally:
+            src_conn.close()
+        sp.add(files=1, bytes=os.path.getsize(dst))
+    # 快照连接使用回滚日志模式，关闭后不应残留附属文件
+    for suffix in SIDECAR_SUFFIXES:
+        if os.path.exists(dst + suffix):
+            os.remove(dst + suffix)
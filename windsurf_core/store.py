@@ -0,0 +1,476 @@
+"""
+内容寻址的 Blob 存储
+所有 Profile 共享同一个存储目录，文件按内容哈希保存，相同内容只存一份。
+目录结构:
+    windsurf_profiles/.store/blobs/ab/abcdef...   文件内容 (压缩存储时带 .zst / .zz / .xz 后缀，
+                                                  相对另一个 Blob 的差异带 .delta 后缀，见 blockdelta.py)
+    windsurf_profiles/.store/tmp/                 写入中的临时文件
+    windsurf_profiles/.store/refs.json            每个 Blob 的引用计数
+    windsurf_profiles/.store/hashcache.json       文件哈希缓存 (见 hashcache.py)
+"""
+
+import os
+import json
+import time
+import hashlib
+import itertools
+import threading
+import contextlib
+
+from . import blockdelta, procs
+from . import codec as codecs
+from .copy_engine import CopyEngine
+
+# 存储目录名 (以点开头，刷新列表时不会被当成 Profile)
+STORE_DIRNAME = '.store'
+
+# 哈希算法: BLAKE2b-256，强度足够且比 SHA-256 更快
+HASH_DIGEST_SIZE = 32
+
+# 读文件的缓冲区大小
+CHUNK_SIZE = 1024 * 1024
+
+# 临时文件超过该时间 (秒) 没有写入即视为遗留文件，即使所属进程仍在运行
+STALE_TMP_SECONDS = 24 * 3600
+
+# 差异存储的 Blob (blockdelta 格式)，与压缩方式并列
+DELTA = 'delta'
+DELTA_SUFFIX = '.delta'
+
+
+def new_hasher():
+    """创建内容哈希对象"""
+    return hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """
+    计算文件内容哈希
+    参数:
+        chunk_size: 每次读取的字节数
+    返回:
+        str: 十六进制哈希值
+    """
+    h = new_hasher()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_json_atomic(path, data):
+    """先写临时文件再替换，避免写到一半留下损坏的 JSON"""
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class BlobStore:
+    """按内容哈希保存文件，带引用计数和垃圾回收"""
+
+    def __init__(self, profiles_dir, engine=None, codec=codecs.DEFAULT_CODEC, hash_cache=None):
+        """
+        参数:
+            profiles_dir: Profile 存储目录 (PROFILES_DIR)
+            engine: 复制引擎，默认新建 CopyEngine
+            codec: 新 Blob 的压缩方式，codec.RAW 表示不压缩
+            hash_cache: hashcache.HashCache，文件元数据没有变化时不再读取内容计算哈希
+        """
+        self.engine = engine or CopyEngine()
+        self.codec = codec
+        self.hash_cache = hash_cache
+        self.root = os.path.join(profiles_dir, STORE_DIRNAME)
+        self.blobs_dir = os.path.join(self.root, 'blobs')
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+        self.refs_file = os.path.join(self.root, 'refs.json')
+        self._lock = threading.RLock()
+        self._refs = None
+        self._tmp_ids = itertools.count()
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    # --------------------------------------------------------
+    # Blob 读写
+    # --------------------------------------------------------
+    def blob_path(self, digest, codec=codecs.RAW):
+        """Blob 在磁盘上的路径 (按哈希前两位分目录)"""
+        suffix = DELTA_SUFFIX if codec == DELTA else codecs.SUFFIXES[codec]
+        return os.path.join(self.blobs_dir, digest[:2], digest + suffix)
+
+    def locate(self, digest):
+        """
+        查找 Blob
+        返回:
+            (path, codec)；codec 为压缩方式或 DELTA；不存在时返回 None
+        """
+        for codec in (*codecs.SUFFIXES, DELTA):
+            path = self.blob_path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None
+
+    def has(self, digest):
+        """Blob 是否已存在"""
+        return self.locate(digest) is not None
+
+    def stored_size(self, digest):
+        """Blob 在磁盘上占用的大小 (压缩后)"""
+        return os.path.getsize(self.locate(digest)[0])
+
+    def put_file(self, src, digest=None, compress=True):
+        """
+        把文件放入存储，内容已存在时不再写入
+        参数:
+            src: 源文件路径
+            digest: 已知的内容哈希 (可选，省去一次读取)
+            compress: 是否允许压缩；还原时需要硬链接的文件应保持原样
+        返回:
+            (digest, size): 实际写入内容的哈希和原始大小
+        """
+        before = os.stat(src)
+        if digest is None and self.hash_cache is not None:
+            digest = self.hash_cache.lookup(src, before)
+        if digest is None:
+            digest = hash_file(src)
+            self._remember(src, before, digest)
+        if self.has(digest):
+            return digest, before.st_size
+
+        codec = codecs.choose_codec(src, before.st_size, self.codec) if compress else codecs.RAW
+        tmp = self.new_tmp_path()
+        try:
+            if codec == codecs.RAW:
+                self.engine.copy(src, tmp)
+                size = os.path.getsize(tmp)
+                after = os.stat(src)
+                # 源文件在哈希和复制之间被改动时，以实际复制到的内容为准
+                if (before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns):
+                    digest = hash_file(tmp)
+            else:
+                # 压缩时同时计算哈希，结果总是对应实际读到的内容
+                hasher = new_hasher()
+                size = codecs.compress_file(src, tmp, codec, hasher)
+                digest = hasher.hexdigest()
+                self.engine.record(tmp, codec)
+            self._install(tmp, digest, codec)
+            self._remember(src, before, digest)
+            return digest, size
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _remember(self, src, before, digest):
+        """源文件在读取期间没有变化时，把哈希记入缓存"""
+        if self.hash_cache is None:
+            return
+        after = os.stat(src)
+        if (before.st_ino, before.st_size, before.st_mtime_ns) == (after.st_ino, after.st_size, after.st_mtime_ns):
+            self.hash_cache.record(src, before, digest)
+
+    def hash_path(self, path, chunk_size=CHUNK_SIZE):
+        """计算文件内容哈希 (有缓存时先查缓存)"""
+        if self.hash_cache is None:
+            return hash_file(path, chunk_size)
+        return self.hash_cache.hash_file(path, chunk_size)
+
+    def new_tmp_path(self, suffix=''):
+        """
+        在存储临时目录中分配一个路径 (与 Blob 同一文件系统，可直接 rename)
+        同一线程中可能嵌套使用多个临时文件 (如按差异还原时先解压基准)，每次分配都带序号。
+        """
+        return os.path.join(self.tmp_dir, f"{os.getpid()}-{threading.get_ident()}-{next(self._tmp_ids)}{suffix}")
+
+    def _install(self, tmp, digest, codec):
+        if self.has(digest):
+            os.remove(tmp)
+            return
+        dst = self.blob_path(digest, codec)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        os.replace(tmp, dst)
+
+    def adopt(self, path, compress=True, base=None):
+        """
+        把调用方生成的临时文件移入存储 (文件会被移走或删除)
+        参数:
+            base: 同一文件上一版本的 Blob 哈希；给出时尝试只保存与它不同的块
+        返回:
+            str: 内容哈希
+        """
+        if base is not None and compress:
+            digest = self._adopt_delta(path, base)
+            if digest is not None:
+                return digest
+        digest = hash_file(path)
+        if self.has(digest):
+            os.remove(path)
+            return digest
+        codec = codecs.choose_codec(path, os.path.getsize(path), self.codec) if compress else codecs.RAW
+        if codec == codecs.RAW:
+            self._install(path, digest, codec)
+            return digest
+        tmp = self.new_tmp_path('.compress')
+        try:
+            codecs.compress_file(path, tmp, codec)
+            self._install(tmp, digest, codec)
+        finally:
+            for p in (path, tmp):
+                if os.path.exists(p):
+                    os.remove(p)
+        return digest
+
+    def _adopt_delta(self, path, base):
+        """
+        按块与 base 比对后保存差异；不值得差异存储时返回 None，由调用方保存完整文件
+        差异只相对完整保存的 Blob 计算 (base 本身是差异时改用它的基准)，还原时最多读两个 Blob。
+        """
+        found = self.locate(base)
+        if found is None:
+            return None
+        if found[1] == DELTA:
+            base = blockdelta.read_base(found[0])
+            if not self.has(base):
+                return None
+        tmp = self.new_tmp_path(DELTA_SUFFIX)
+        try:
+            hasher = new_hasher()
+            stats = blockdelta.encode(self.iter_blob(base), path, tmp, base,
+                                      codec=self.codec, hasher=hasher)
+            digest = hasher.hexdigest()
+            if self.has(digest):
+                os.remove(path)
+                return digest
+            if stats['literal'] > stats['blocks'] * blockdelta.MAX_LITERAL_RATIO:
+                return None
+            with self._lock:
+                if not self.has(digest):
+                    dst = self.blob_path(digest, DELTA)
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    os.replace(tmp, dst)
+                    # 差异 Blob 存在期间基准不能被回收，记为基准的一次引用
+                    self.retain([base])
+            self.engine.record(path, DELTA)
+            os.remove(path)
+            return digest
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @contextlib.contextmanager
+    def _base_reader(self, digest, sequential):
+        """打开差异的基准 Blob (供 blockdelta.iter_content 使用)"""
+        found = self.locate(digest)
+        if found is None:
+            raise FileNotFoundError(f"存储中缺少差异的基准: {digest}")
+        path, codec = found
+        if codec == DELTA:
+            raise ValueError(f"差异的基准不能是差异: {digest}")
+        if codec == codecs.RAW:
+            with open(path, 'rb') as f:
+                yield blockdelta.FileReader(f)
+        elif sequential:
+            yield blockdelta.StreamReader(codecs.iter_decompress(path, codec))
+        else:
+            # 需要随机访问时先解压到临时文件
+            with self.readable(digest) as plain, open(plain, 'rb') as f:
+                yield blockdelta.FileReader(f)
+
+    def iter_blob(self, digest, chunk_size=CHUNK_SIZE):
+        """逐块产出 Blob 的原始内容 (解压 / 按差异还原后)"""
+        found = self.locate(digest)
+        if found is None:
+            raise FileNotFoundError(f"存储中缺少文件内容: {digest}")
+        path, codec = found
+        if codec == DELTA:
+            yield from blockdelta.iter_content(path, self._base_reader)
+        elif codec == codecs.RAW:
+            with open(path, 'rb') as f:
+                yield from iter(lambda: f.read(chunk_size), b'')
+        else:
+            yield from codecs.iter_decompress(path, codec, chunk_size)
+
+    def copy_to(self, digest, dst, link=False):
+        """
+        把 Blob 内容写到目标路径 (压缩的 Blob 直接流式解压到目标文件)
+        参数:
+            link: 允许硬链接到 Blob；只适用于写入后不会被原地修改的文件
+        返回:
+            str: 复制引擎实际使用的方式，解压或按差异还原时为压缩方式名称 / DELTA
+        """
+        found = self.locate(digest)
+        if found is None:
+            raise FileNotFoundError(f"存储中缺少文件内容: {digest}")
+        path, codec = found
+        if codec == codecs.RAW:
+            return self.engine.copy(path, dst, link=link)
+        if codec == DELTA:
+            with open(dst, 'wb') as f:
+                for data in self.iter_blob(digest):
+                    f.write(data)
+        else:
+            codecs.decompress_file(path, dst, codec)
+        self.engine.record(dst, codec)
+        return codec
+
+    def hash_blob(self, digest, chunk_size=CHUNK_SIZE):
+        """
+        重新计算 Blob 内容 (解压后) 的哈希，用于检查存储是否损坏
+        返回:
+            str: 实际的哈希值；Blob 不存在时返回 None
+        """
+        found = self.locate(digest)
+        if found is None:
+            return None
+        path, codec = found
+        if codec == codecs.RAW:
+            return hash_file(path, chunk_size)
+        h = new_hasher()
+        for chunk in self.iter_blob(digest, chunk_size):
+            h.update(chunk)
+        return h.hexdigest()
+
+    @contextlib.contextmanager
+    def readable(self, digest):
+        """
+        得到一个可以直接读取的 Blob 文件路径 (用于用 SQLite 打开保存的数据库)
+        压缩的 Blob 会先解压到临时文件，退出时删除。
+        """
+        found = self.locate(digest)
+        if found is None:
+            raise FileNotFoundError(f"存储中缺少文件内容: {digest}")
+        path, codec = found
+        if codec == codecs.RAW:
+            yield path
+            return
+        tmp = self.new_tmp_path('.read')
+        try:
+            if codec == DELTA:
+                with open(tmp, 'wb') as f:
+                    for data in self.iter_blob(digest):
+                        f.write(data)
+            else:
+                codecs.decompress_file(path, tmp, codec)
+            yield tmp
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    # --------------------------------------------------------
+    # 引用计数与垃圾回收
+    # --------------------------------------------------------
+    def _load_refs(self):
+        if self._refs is None:
+            try:
+                with open(self.refs_file, 'r', encoding='utf-8') as f:
+                    self._refs = json.load(f)
+            except (OSError, ValueError):
+                self._refs = {}
+        return self._refs
+
+    def retain(self, digests):
+        """为每个哈希增加一次引用 (同一哈希出现多次就加多次)"""
+        with self._lock:
+            refs = self._load_refs()
+            for d in digests:
+                refs[d] = refs.get(d, 0) + 1
+            write_json_atomic(self.refs_file, refs)
+
+    def release(self, digests):
+        """
+        减少引用，引用归零的 Blob 立即删除
+        返回:
+            int: 释放的 Blob 数量
+        """
+        with self._lock:
+            refs = self._load_refs()
+            dead = set()
+            for d in digests:
+                count = refs.get(d, 0) - 1
+                if count > 0:
+                    refs[d] = count
+                else:
+                    refs.pop(d, None)
+                    dead.add(d)
+            write_json_atomic(self.refs_file, refs)
+            freed = 0
+            bases = []
+            for d in dead:
+                found = self.locate(d)
+                if found is not None:
+                    bases.extend(self._delta_bases([found]))
+                    os.remove(found[0])
+                    freed += 1
+            if bases:
+                # 差异 Blob 删除后释放它对基准的引用
+                freed += self.release(bases)
+            return freed
+
+    @staticmethod
+    def _delta_bases(found):
+        """[(path, codec), ...] 中差异 Blob 的基准哈希"""
+        bases = []
+        for path, codec in found:
+            if codec != DELTA:
+                continue
+            try:
+                bases.append(blockdelta.read_base(path))
+            except (OSError, ValueError):
+                pass
+        return bases
+
+    def sweep(self):
+        """
+        清理没有任何引用的 Blob (例如保存中途失败留下的孤儿文件) 和已退出的进程留下的临时文件
+        正在进行的操作 (本进程其他线程、其他仍在运行的进程) 的临时文件不会被删除。
+        返回:
+            int: 删除的 Blob 数量
+        """
+        with self._lock:
+            refs = self._load_refs()
+            removed = 0
+            bases = []
+            for sub in os.listdir(self.blobs_dir):
+                sub_dir = os.path.join(self.blobs_dir, sub)
+                if not os.path.isdir(sub_dir):
+                    continue
+                for name in os.listdir(sub_dir):
+                    if refs.get(name.split('.', 1)[0], 0) <= 0:
+                        path = os.path.join(sub_dir, name)
+                        if name.endswith(DELTA_SUFFIX):
+                            bases.extend(self._delta_bases([(path, DELTA)]))
+                        os.remove(path)
+                        removed += 1
+            for path in self._stale_tmp_files():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            if bases:
+                removed += self.release(bases)
+            return removed
+
+    def _stale_tmp_files(self):
+        """
+        临时目录中的遗留文件: 所属进程 (文件名以 pid 开头) 已经退出，或很久没有写入
+        本进程的临时文件都属于正在进行的操作 (其他线程的保存、读取等)，一律不动。
+        """
+        try:
+            live = {p.pid for p in procs.list_processes()}
+        except OSError:
+            # 无法枚举进程时只按时间判断
+            live = None
+        own = str(os.getpid())
+        deadline = time.time() - STALE_TMP_SECONDS
+        stale = []
+        for entry in os.scandir(self.tmp_dir):
+            pid = entry.name.split('-', 1)[0]
+            if pid == own:
+                continue
+            try:
+                old = entry.stat().st_mtime < deadline
+            except FileNotFoundError:
+                continue
+            if old or (live is not None and pid.isdigit() and int(pid) not in live):
+                stale.append(entry.path)
+        return stale
@@ -0,0 +1,164 @@
+"""
+暂存 + 重命名替换
+还原时先在与目标同级的暂存目录中构建完整的新数据，全部就绪后再用几次 rename
+替换到位。构建或替换中途失败时，已完成的 rename 会按相反顺序撤销，
+本机的 Windsurf 数据保持切换前的状态。只需修正 mtime 的文件同样在提交时才修改，撤销时恢复原值。
+"""
+
+import os
+import shutil
+
+from . import trace
+
+STAGING_SUFFIX = '.ws-staging'
+ASIDE_SUFFIX = '.ws-old'
+
+
+def remove_path(path):
+    """删除文件或目录 (不存在时忽略)"""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def recover(live):
+    """
+    清理上一次切换留下的暂存数据
+    如果上次在替换中途中断 (旧数据已移走、新数据未就位)，把旧数据放回原处。
+    """
+    aside = live + ASIDE_SUFFIX
+    if os.path.lexists(aside):
+        if os.path.lexists(live):
+            remove_path(aside)
+        else:
+            os.rename(aside, live)
+    remove_path(live + STAGING_SUFFIX)
+
+
+class SwapTransaction:
+    """一组 暂存路径 -> 实际路径 的替换，要么全部生效，要么全部撤销"""
+
+    def __init__(self):
+        self._items = []
+        self._done = []
+        self._touches = []
+        self._mtimes = {}   # 实际路径 -> 修改前的 (atime_ns, mtime_ns)，撤销时恢复
+
+    def stage_dir(self, live):
+        """
+        为目录创建同级暂存目录
+        返回:
+            str: 暂存目录路径
+        """
+        recover(live)
+        staged = live + STAGING_SUFFIX
+        os.makedirs(staged)
+        self._items.append({'live': live, 'staged': staged, 'carry': []})
+        return staged
+
+    def stage_file(self, live):
+        """
+        为单个文件分配同级暂存路径 (由调用方写入内容)
+        返回:
+            str: 暂存文件路径
+        """
+        recover(live)
+        staged = live + STAGING_SUFFIX
+        self._items.append({'live': live, 'staged': staged, 'carry': []})
+        return staged
+
+    def stage_remove(self, live):
+        """提交时删除某个文件 (先移到一旁，撤销时可以放回)"""
+        recover(live)
+        if os.path.lexists(live):
+            self._items.append({'live': live, 'staged': None, 'carry': []})
+
+    def stage_touch(self, live, mtime_ns):
+        """提交时把文件的 mtime 改为 mtime_ns (内容相同、只有 mtime 不同的文件)"""
+        self.keep_mtime(live)
+        self._touches.append((live, mtime_ns))
+
+    def keep_mtime(self, live):
+        """
+        记录文件当前的 mtime，放弃或撤销时恢复
+        用于暂存目录硬链接了实际文件、提交前就会修改其 mtime 的情况。
+        """
+        if live not in self._mtimes:
+            st = os.stat(live)
+            self._mtimes[live] = (st.st_atime_ns, st.st_mtime_ns)
+
+    def carry(self, staged, rel_parts):
+        """
+        提交时把实际目录中的某个条目原样移入暂存目录 (用于保留被排除、不受 Profile 管理的文件)
+        参数:
+            staged: stage_dir 返回的暂存目录
+            rel_parts: 相对路径的各级名称
+        """
+        for item in self._items:
+            if item['staged'] == staged:
+                item['carry'].append(tuple(rel_parts))
+                return
+        raise KeyError(staged)
+
+    def commit(self):
+        """执行全部替换，任何一步失败都会撤销已完成的替换并重新抛出异常"""
+        try:
+            for item in self._items:
+                with trace.span('swap.replace', path=item['live']):
+                    self._swap(item)
+            for live, mtime_ns in self._touches:
+                os.utime(live, ns=(mtime_ns, mtime_ns))
+        except BaseException:
+            self._rollback()
+            raise
+        for item in self._items:
+            try:
+                with trace.span('swap.delete', path=item['live']):
+                    remove_path(item['live'] + ASIDE_SUFFIX)
+            except OSError as e:
+                trace.warning(f"清理旧数据失败 (不影响切换): {e}")
+        self._items = []
+        self._done = []
+        self._touches = []
+        self._mtimes = {}
+
+    def abort(self):
+        """放弃全部暂存数据，实际路径不受影响"""
+        for item in self._items:
+            if item['staged'] is not None:
+                remove_path(item['staged'])
+        self._items = []
+        for live, times in self._mtimes.items():
+            try:
+                os.utime(live, ns=times)
+            except OSError as e:
+                trace.warning(f"恢复修改时间失败: {live}: {e}")
+        self._touches = []
+        self._mtimes = {}
+
+    def _rename(self, src, dst):
+        os.rename(src, dst)
+        self._done.append((src, dst))
+
+    def _swap(self, item):
+        live, staged = item['live'], item['staged']
+        for parts in item['carry']:
+            dst = os.path.join(staged, *parts)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            self._rename(os.path.join(live, *parts), dst)
+        if os.path.lexists(live):
+            self._rename(live, live + ASIDE_SUFFIX)
+        else:
+            os.makedirs(os.path.dirname(live), exist_ok=True)
+        if staged is not None:
+            self._rename(staged, live)
+
+    def _rollback(self):
+        for src, dst in reversed(self._done):
+            try:
+                os.rename(dst, src)
+            except OSError as e:
+                trace.warning(f"撤销替换失败: {dst} -> {src}: {e}")
+        self._done = []
+        self.abort()
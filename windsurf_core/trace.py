@@ -0,0 +1,327 @@
+"""
+分阶段耗时追踪
+用嵌套的 span 记录保存 / 切换中每个阶段 (进程检测、关闭等待、各目录的比对 / 写入 / 替换、
+SQLite 读取等) 的耗时、文件数和字节数:
+    with trace.span('restore.stage', root='Local Storage') as sp:
+        ...
+        sp.add(files=1, bytes=size)
+每个 span 结束时以一行 JSON 写入滚动日志 (默认 windsurf_profiles/.logs/trace.jsonl)，
+也可以另存为 Chrome trace 格式，在 chrome://tracing 或 Perfetto 中按时间线查看。
+没有配置输出时 span 只计时，不产生任何 I/O。
+--profile 会用 cProfile 分析整个运行过程 (包括后台线程)，结果可用 pstats / snakeviz 查看。
+"""
+
+import os
+import json
+import time
+import cProfile
+import pstats
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+LOG_DIRNAME = '.logs'
+TRACE_LOG_NAME = 'trace.jsonl'
+
+# 滚动日志: 单个文件上限和保留的旧文件数
+LOG_MAX_BYTES = 2 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+# Chrome trace 在内存中最多保留的事件数 (界面长时间运行时只保留最近的)
+MAX_CHROME_EVENTS = 200000
+
+# 不影响操作结果的问题 (写入缓存 / 日志失败等) 经 logging 报告，由界面决定如何显示；
+# 没有配置 logging 时由其默认处理输出到 stderr，不再直接打印到 stdout
+logger = logging.getLogger('windsurf_core')
+
+
+class Span:
+    """一个计时阶段"""
+
+    def __init__(self, name, span_id, parent, attrs):
+        self.name = name
+        self.id = span_id
+        self.parent = parent
+        self.attrs = attrs
+        self.files = 0
+        self.bytes = 0
+        self.error = None
+        self.thread = threading.current_thread().name
+        self.tid = threading.get_ident()
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.duration = None
+
+    def add(self, files=0, bytes=0):
+        """累加处理的文件数和字节数"""
+        self.files += files
+        self.bytes += bytes
+
+    def set(self, **attrs):
+        """补充属性 (如统计结果)"""
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        record = {
+            'ts': round(self.started, 6),
+            'name': self.name,
+            'id': self.id,
+            'parent': self.parent,
+            'thread': self.thread,
+            'duration_ms': round(self.duration * 1000, 3),
+            'files': self.files,
+            'bytes': self.bytes,
+        }
+        if self.attrs:
+            record['attrs'] = self.attrs
+        if self.error:
+            record['error'] = self.error
+        return record
+
+
+class Tracer:
+    """span 的创建与输出 (线程安全，每个线程有自己的嵌套栈)"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._logger = None
+        self._chrome_path = None
+        self._chrome_events = None
+        self._epoch = time.perf_counter()
+        self._listeners = []
+
+    def configure(self, log_path=None, chrome_path=None,
+                  max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        """
+        设置输出
+        参数:
+            log_path: JSON Lines 滚动日志路径，None 表示不写日志
+            chrome_path: Chrome trace 文件路径，None 表示不生成
+        """
+        with self._lock:
+            if self._logger is not None:
+                for handler in list(self._logger.handlers):
+                    self._logger.removeHandler(handler)
+                    handler.close()
+                self._logger = None
+            if log_path:
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                handler = RotatingFileHandler(log_path, maxBytes=max_bytes,
+                                              backupCount=backup_count, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger = logging.getLogger(f"{__name__}.{id(self)}")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                logger.addHandler(handler)
+                self._logger = logger
+            self._chrome_path = chrome_path
+            self._chrome_events = [] if chrome_path else None
+
+    def add_listener(self, func):
+        """每个 span 结束时调用 func(span)"""
+        self._listeners.append(func)
+
+    @property
+    def enabled(self):
+        return self._logger is not None or self._chrome_events is not None or bool(self._listeners)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """当前线程最内层的 span，没有时返回 None"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._stack()
+        parent = stack[-1].id if stack else None
+        sp = Span(name, next(self._ids), parent, attrs)
+        stack.append(sp)
+        try:
+            yield sp
+        except BaseException as e:
+            sp.error = f"{type(e).__name__}: {str(e)[:200]}"
+            raise
+        finally:
+            sp.duration = time.perf_counter() - sp.t0
+            stack.pop()
+            if self.enabled:
+                self._finish(sp, root=not stack)
+
+    @contextmanager
+    def attach(self, parent):
+        """让其他线程中创建的 span 挂在 parent 之下 (用于线程池中的任务)"""
+        if parent is None:
+            yield
+            return
+        stack = self._stack()
+        stack.append(parent)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def event(self, name, **attrs):
+        """记录一个没有持续时间的事件"""
+        with self.span(name, **attrs):
+            pass
+
+    def _finish(self, sp, root):
+        for func in self._listeners:
+            try:
+                func(sp)
+            except Exception as e:
+                logger.warning(f"追踪回调失败: {e}")
+        record = sp.to_dict()
+        if self._logger is not None:
+            self._logger.info(json.dumps(record, ensure_ascii=False, default=str))
+        if self._chrome_events is not None:
+            args = dict(sp.attrs, files=sp.files, bytes=sp.bytes)
+            if sp.error:
+                args['error'] = sp.error
+            with self._lock:
+                self._chrome_events.append({
+                    'name': sp.name,
+                    'ph': 'X',
+                    'ts': round((sp.t0 - self._epoch) * 1e6, 1),
+                    'dur': round(sp.duration * 1e6, 1),
+                    'pid': os.getpid(),
+                    'tid': sp.tid,
+                    'args': args,
+                })
+                del self._chrome_events[:-MAX_CHROME_EVENTS]
+            # 每个顶层阶段结束就写一次，程序异常退出时也不会丢失
+            if root:
+                self.flush()
+
+    def flush(self):
+        """写出 Chrome trace 文件"""
+        with self._lock:
+            if self._chrome_events is None:
+                return
+            events = list(self._chrome_events)
+            path = self._chrome_path
+        data = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+
+
+class Profiler:
+    """整个运行过程的 cProfile 分析，后台线程中的调用也会计入"""
+
+    def __init__(self, path):
+        self.path = path
+        self._main = cProfile.Profile()
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._main.enable()
+
+    @contextmanager
+    def thread(self):
+        """在当前 (非主) 线程中分析一段代码"""
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # Python 3.12 起 cProfile 基于 sys.monitoring，全局只能有一个，主线程的分析已覆盖所有线程
+            yield
+            return
+        try:
+            yield
+        finally:
+            prof.disable()
+            with self._lock:
+                self._profiles.append(prof)
+
+    def stop(self):
+        """
+        停止分析并把合并后的结果写入 path
+        返回:
+            pstats.Stats
+        """
+        self._main.disable()
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            for prof in self._profiles:
+                stats.add(prof)
+        stats.dump_stats(self.path)
+        return stats
+
+
+_tracer = Tracer()
+_profiler = None
+
+configure = _tracer.configure
+add_listener = _tracer.add_listener
+span = _tracer.span
+event = _tracer.event
+current = _tracer.current
+attach = _tracer.attach
+flush = _tracer.flush
+
+
+def warning(message, **attrs):
+    """报告一个警告: 交给 logging，同时作为事件记入耗时日志"""
+    logger.warning(message)
+    event('warning', message=message, **attrs)
+
+
+@contextmanager
+def profiled_thread():
+    """--profile 生效时分析当前线程中的代码，否则什么也不做"""
+    if _profiler is None:
+        yield
+    else:
+        with _profiler.thread():
+            yield
+
+
+def default_log_path(profiles_dir):
+    return os.path.join(profiles_dir, LOG_DIRNAME, TRACE_LOG_NAME)
+
+
+def add_arguments(parser):
+    """给命令行 / 图形界面加上 --profile 和 --chrome-trace 参数"""
+    parser.add_argument('--profile', metavar='FILE',
+                        help='用 cProfile 分析整个运行过程，结果写入 FILE (可用 pstats / snakeviz 查看)')
+    parser.add_argument('--chrome-trace', metavar='FILE',
+                        help='把耗时记录另存为 Chrome trace 格式 (chrome://tracing 或 Perfetto 打开)')
+
+
+@contextmanager
+def session(profiles_dir, profile=None, chrome_trace=None):
+    """
+    一次运行的追踪设置: 写入滚动日志，按需生成 Chrome trace 和 cProfile 结果
+    参数:
+        profiles_dir: Profile 存储目录，日志写在其中的 .logs 目录
+        profile: cProfile 结果文件，None 表示不分析
+        chrome_trace: Chrome trace 文件，None 表示不生成
+    """
+    global _profiler
+    try:
+        configure(log_path=default_log_path(profiles_dir), chrome_path=chrome_trace)
+    except OSError as e:
+        logger.warning(f"无法写入耗时日志: {e}")
+    if profile:
+        _profiler = Profiler(profile)
+        _profiler.start()
+    try:
+        yield
+    finally:
+        if _profiler is not None:
+            _profiler.stop()
+            _profiler = None
+        flush()
@@ -0,0 +1,113 @@
+"""
+并行传输调度
+把大量文件复制/哈希任务放到有界线程池中执行:
+- 按文件大小从大到小启动，避免大文件最后才开始拖慢整体耗时
+- 限制同时处理中的字节数，避免大量并发 I/O 占用过多内存
+- 每个任务的错误按分组 (如 'Local Storage') 收集，便于沿用原有的错误提示
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import trace
+from .worker import Progress
+
+# 默认线程数: LevelDB 目录中大量小文件主要受 I/O 延迟影响，线程数可以多于 CPU 核数
+DEFAULT_WORKERS = min(16, (os.cpu_count() or 1) * 4)
+
+# 同时处理中的最大字节数 (单个文件超过该值时单独执行)
+MAX_INFLIGHT_BYTES = 256 * 1024 * 1024
+
+
+class TransferScheduler:
+    """有界并行执行一批文件任务"""
+
+    def __init__(self, workers=None, max_inflight_bytes=MAX_INFLIGHT_BYTES, progress=None):
+        """
+        参数:
+            workers: 线程数，默认 DEFAULT_WORKERS
+            max_inflight_bytes: 同时处理中的最大字节数
+            progress: worker.Progress，每个任务登记并在完成时推进进度；取消后剩余任务不再执行
+        """
+        self.workers = workers or DEFAULT_WORKERS
+        self.max_inflight_bytes = max_inflight_bytes
+        self.progress = progress or Progress()
+        self._tasks = []
+
+    def add(self, group, size, func, *args):
+        """
+        添加任务
+        参数:
+            group: 错误分组名称
+            size: 任务涉及的字节数 (用于排序和限流)
+            func, args: 实际执行的函数及参数
+        返回:
+            int: 任务编号，对应 run() 返回结果中的下标
+        """
+        self._tasks.append((group, size, func, args))
+        self.progress.add(size)
+        return len(self._tasks) - 1
+
+    def run(self):
+        """
+        执行全部任务并等待结束
+        返回:
+            (results, errors): results 为按任务编号排列的返回值 (失败为 None)，
+            errors 为 {分组: [错误信息, ...]}
+        异常:
+            Cancelled: 执行中被取消 (已开始的任务会先执行完)
+        """
+        tasks, self._tasks = self._tasks, []
+        results = [None] * len(tasks)
+        errors = {}
+        if not tasks:
+            return results, errors
+
+        cond = threading.Condition()
+        state = {'inflight': 0}
+        parent = trace.current()
+
+        def execute(index):
+            group, size, func, args = tasks[index]
+            try:
+                if not self.progress.cancelled:
+                    with trace.attach(parent), trace.profiled_thread():
+                        results[index] = func(*args)
+            except Exception as e:
+                with cond:
+                    errors.setdefault(group, []).append(str(e))
+            finally:
+                with cond:
+                    state['inflight'] -= size
+                    cond.notify_all()
+                self.progress.advance(size)
+
+        order = sorted(range(len(tasks)), key=lambda i: tasks[i][1], reverse=True)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for index in order:
+                if self.progress.cancelled:
+                    break
+                size = tasks[index][1]
+                with cond:
+                    while state['inflight'] and state['inflight'] + size > self.max_inflight_bytes:
+                        cond.wait()
+                    state['inflight'] += size
+                pool.submit(execute, index)
+        self.progress.check()
+        return results, errors
+
+
+def format_errors(errors, limit=80):
+    """
+    把 run() 返回的分组错误整理成界面提示用的列表
+    返回:
+        list: 形如 'Local Storage: 错误信息 (共 3 个文件失败)' 的字符串
+    """
+    lines = []
+    for group, messages in errors.items():
+        line = f"{group}: {messages[0][:limit]}"
+        if len(messages) > 1:
+            line += f" (共 {len(messages)} 个文件失败)"
+        lines.append(line)
+    return lines
@@ -0,0 +1,160 @@
+"""
+按 manifest 校验文件完整性
+- verify_live: 切换后逐个比对本机文件与 Profile 的 manifest (大小 + BLAKE2b 哈希)，
+  找出复制不完整、缺失或多余的文件，而不只是重新读一次 state.vscdb 中的邮箱
+- verify_store: 重新计算存储中 Blob 的哈希，检查所有已保存 Profile 是否有损坏 (bit rot)；
+  这里总是读取实际内容，不使用哈希缓存
+哈希在线程池中并行计算，使用较大的读缓冲区；结果列出每个不一致的路径和原因。
+"""
+
+import os
+
+from . import leveldb, sqlite_snapshot, trace
+from .profiles import native_path, scan_root
+from .store import hash_file
+from .transfer import TransferScheduler
+from .worker import Progress
+
+# 校验时每次读取的字节数 (顺序读大文件时减少系统调用次数)
+VERIFY_CHUNK_SIZE = 4 * 1024 * 1024
+
+# 不一致的原因
+MISSING = 'missing'        # manifest 中有、本机 (或存储中) 没有
+SIZE = 'size'              # 大小不同
+HASH = 'hash'              # 大小相同，内容不同
+EXTRA = 'extra'            # 本机多出的文件 (整目录管理的位置)
+UNREADABLE = 'unreadable'  # 无法读取
+
+REASONS = {
+    MISSING: '缺失',
+    SIZE: '大小不一致',
+    HASH: '内容不一致',
+    EXTRA: '多余文件',
+    UNREADABLE: '无法读取',
+}
+
+
+def _check_file(hash_path, path, entry, chunk_size):
+    try:
+        # 在线快照保存的数据库与源文件逻辑一致但字节不同；源文件自快照后没有变化即视为一致
+        if 'source' in entry and sqlite_snapshot.source_signature(path) == entry['source']:
+            return None
+        if os.stat(path).st_size != entry['size']:
+            return SIZE
+        return HASH if hash_path(path, chunk_size) != entry['hash'] else None
+    except FileNotFoundError:
+        return MISSING
+    except OSError:
+        return UNREADABLE
+
+
+def _check_blob(store, digest, chunk_size):
+    try:
+        actual = store.hash_blob(digest, chunk_size)
+    except FileNotFoundError:
+        return MISSING
+    except (OSError, ValueError, EOFError):
+        # 压缩数据损坏时解压会直接报错
+        return UNREADABLE
+    if actual is None:
+        return MISSING
+    return HASH if actual != digest else None
+
+
+def verify_live(manifest, roots, workers=None, progress=None, skip=(), store=None,
+                chunk_size=VERIFY_CHUNK_SIZE):
+    """
+    校验本机数据与 manifest 是否完全一致
+    参数:
+        manifest: load_manifest 的返回值
+        roots: Root 列表
+        workers: 线程数，默认 transfer.DEFAULT_WORKERS
+        progress: worker.Progress
+        skip: 不校验的 Root 名称 (如只同步登录信息时的 state.vscdb 所在位置)
+        store: 传入 BlobStore 时通过其哈希缓存计算哈希 (未变化的硬链接文件不再读取)
+    返回:
+        dict: checked (校验的文件数)、bytes (读取的字节数)、
+              mismatches ([{'root', 'path', 'reason'}, ...]，按位置和路径排序)
+    """
+    progress = progress or Progress()
+    progress.begin('校验文件')
+    scheduler = TransferScheduler(workers, progress=progress)
+    checks = []
+    mismatches = []
+    total = 0
+    hash_path = store.hash_path if store is not None else hash_file
+    with trace.span('verify.live') as sp:
+        for root in roots:
+            saved = manifest['roots'].get(root.name)
+            if saved is None or root.name in skip:
+                continue
+            saved = root.managed(saved)
+            for rel, entry in saved['files'].items():
+                task = scheduler.add(root.label, entry['size'], _check_file,
+                                     hash_path, native_path(root.path, rel), entry, chunk_size)
+                checks.append((root.label, rel, task))
+                total += entry['size']
+            if not root.partial:
+                live_files, _ = scan_root(root)
+                # 保存时略过的 LevelDB 废弃文件不算多余
+                obsolete = leveldb.obsolete_files(root.path, live_files)
+                for rel in live_files:
+                    if rel in obsolete:
+                        continue
+                    if rel not in saved['files'] and not sqlite_snapshot.sidecar_of(rel.rsplit('/', 1)[-1]):
+                        mismatches.append({'root': root.label, 'path': rel, 'reason': EXTRA})
+        results, _ = scheduler.run()
+        for label, rel, task in checks:
+            if results[task] is not None:
+                mismatches.append({'root': label, 'path': rel, 'reason': results[task]})
+        mismatches.sort(key=lambda m: (m['root'], m['path']))
+        sp.add(files=len(checks), bytes=total)
+        sp.set(mismatches=len(mismatches))
+    return {'checked': len(checks), 'bytes': total, 'mismatches': mismatches}
+
+
+def verify_store(store, manifests, workers=None, progress=None, chunk_size=VERIFY_CHUNK_SIZE):
+    """
+    重新计算 Blob 哈希，检查已保存的 Profile 是否损坏
+    多个 Profile 共享的 Blob 只校验一次。
+    参数:
+        store: BlobStore
+        manifests: {Profile 名称: manifest}
+    返回:
+        dict: checked (校验的 Blob 数)、bytes (原始字节数)、
+              mismatches ([{'profile', 'root', 'path', 'reason', 'hash'}, ...])
+    """
+    progress = progress or Progress()
+    progress.begin('校验存储')
+    scheduler = TransferScheduler(workers, progress=progress)
+    users = {}
+    sizes = {}
+    for name, manifest in manifests.items():
+        for root_name, root in manifest['roots'].items():
+            for rel, entry in root['files'].items():
+                users.setdefault(entry['hash'], []).append((name, root_name, rel))
+                sizes[entry['hash']] = entry['size']
+    with trace.span('verify.store', profiles=len(manifests)) as sp:
+        tasks = {digest: scheduler.add(digest[:2], sizes[digest], _check_blob, store, digest, chunk_size)
+                 for digest in users}
+        results, _ = scheduler.run()
+        mismatches = []
+        for digest, task in tasks.items():
+            if results[task] is None:
+                continue
+            for name, root_name, rel in users[digest]:
+                mismatches.append({'profile': name, 'root': root_name, 'path': rel,
+                                   'reason': results[task], 'hash': digest})
+        mismatches.sort(key=lambda m: (m['profile'], m['root'], m['path']))
+        sp.add(files=len(tasks), bytes=sum(sizes.values()))
+        sp.set(mismatches=len(mismatches))
+    return {'checked': len(tasks), 'bytes': sum(sizes.values()), 'mismatches': mismatches}
+
+
+def format_mismatches(mismatches, limit=20):
+    """整理成提示用的文本行 (超过 limit 条时省略其余)"""
+    lines = [f"{m['root']}/{m['path']}: {REASONS.get(m['reason'], m['reason'])}"
+             for m in mismatches[:limit]]
+    if len(mismatches) > limit:
+        lines.append(f"... 共 {len(mismatches)} 个文件不一致")
+    return lines
@@ -0,0 +1,172 @@
+"""
+后台任务与进度
+保存和切换在工作线程中执行，进度通过线程安全的队列发给界面，
+界面用 root.after 定时取出事件刷新进度条，整个过程中窗口保持响应。
+取消只是设置标记: 尚未开始的文件任务不再执行，调用方在安全点抛出 Cancelled
+并撤销已做的改动 (还原时放弃暂存目录，本机数据保持原状)。
+"""
+
+import time
+import queue
+import threading
+
+from . import trace
+
+# 进度事件的最小间隔 (秒)，避免大量小文件时事件过多
+EMIT_INTERVAL = 0.1
+
+
+class Cancelled(Exception):
+    """操作被用户取消"""
+
+
+class Progress:
+    """一个阶段内的文件数 / 字节数进度，可被其他线程取消"""
+
+    def __init__(self, events=None, interval=EMIT_INTERVAL):
+        """
+        参数:
+            events: 接收进度事件的 queue.Queue；为 None 时不发送事件
+            interval: 两次进度事件的最小间隔
+        """
+        self.events = events
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._last_emit = 0.0
+        self._reset('')
+
+    def _reset(self, phase):
+        self.phase = phase
+        self.files_total = 0
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.started = time.monotonic()
+
+    def begin(self, phase):
+        """开始新阶段，计数清零"""
+        with self._lock:
+            self._reset(phase)
+        self._emit(force=True)
+
+    def add(self, size):
+        """登记一个待处理的文件"""
+        with self._lock:
+            self.files_total += 1
+            self.bytes_total += size
+
+    def advance(self, size):
+        """一个文件处理完成"""
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += size
+        self._emit()
+
+    # --------------------------------------------------------
+    # 取消
+    # --------------------------------------------------------
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        """已取消时抛出 Cancelled"""
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    # --------------------------------------------------------
+    # 事件
+    # --------------------------------------------------------
+    def snapshot(self):
+        """
+        当前进度
+        返回:
+            dict: phase、files_done/files_total、bytes_done/bytes_total、
+                  fraction (0~1)、rate (字节/秒)、eta (秒，无法估计时为 None)
+        """
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-6)
+            rate = self.bytes_done / elapsed
+            if self.bytes_total:
+                fraction = self.bytes_done / self.bytes_total
+            elif self.files_total:
+                fraction = self.files_done / self.files_total
+            else:
+                fraction = 0.0
+            remaining = self.bytes_total - self.bytes_done
+            eta = remaining / rate if rate > 0 else None
+            return {
+                'phase': self.phase,
+                'files_done': self.files_done,
+                'files_total': self.files_total,
+                'bytes_done': self.bytes_done,
+                'bytes_total': self.bytes_total,
+                'fraction': min(fraction, 1.0),
+                'rate': rate,
+                'eta': eta,
+            }
+
+    def _emit(self, force=False):
+        if self.events is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_emit < self.interval:
+            return
+        self._last_emit = now
+        self.events.put(('progress', self.snapshot()))
+
+
+def format_progress(snap):
+    """把 snapshot() 整理成一行进度说明"""
+    text = f"{snap['phase']} {snap['files_done']}/{snap['files_total']} 个文件"
+    if snap['bytes_total']:
+        text += f"  {snap['bytes_done'] / 1048576:.1f}/{snap['bytes_total'] / 1048576:.1f} MB"
+        text += f"  {snap['rate'] / 1048576:.1f} MB/s"
+        if snap['eta'] is not None and snap['fraction'] < 1:
+            text += f"  剩余 {snap['eta']:.0f} 秒"
+    return text
+
+
+class Worker:
+    """在后台线程中执行 func(*args, progress=Progress, **kwargs)"""
+
+    def __init__(self, func, *args, **kwargs):
+        self.events = queue.Queue()
+        self.progress = Progress(self.events)
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.progress.cancel()
+
+    def _run(self):
+        try:
+            with trace.profiled_thread():
+                result = self._func(*self._args, progress=self.progress, **self._kwargs)
+        except BaseException as e:
+            self.events.put(('error', e))
+        else:
+            self.events.put(('done', result))
+
+    def poll(self):
+        """
+        取出当前已有的全部事件 (不阻塞)
+        返回:
+            list: [(类型, 数据), ...]，类型为 'progress' / 'done' / 'error'
+        """
+        items = []
+        while True:
+            try:
+                items.append(self.events.get_nowait())
+            except queue.Empty:
+                return items
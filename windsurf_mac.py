@@ -9,43 +9,32 @@ Windsurf 账号快速切换工具 (Mac版本)
 
 import os
 import sys
-import json
-import shutil
-import sqlite3
-import subprocess
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from datetime import datetime
-from pathlib import Path
 
-# ============================================================
-# Mac 系统路径配置
-# ============================================================
-HOME = os.path.expanduser('~')
+from windsurf_core import cli, paths, profiles
 
-# Windsurf 应用数据目录 (Mac路径)
-WINDSURF_DATA = os.path.join(HOME, 'Library', 'Application Support', 'Windsurf')
-WINDSURF_USER = os.path.join(WINDSURF_DATA, 'User')
-WINDSURF_GLOBAL_STORAGE = os.path.join(WINDSURF_USER, 'globalStorage')
-STATE_DB = os.path.join(WINDSURF_GLOBAL_STORAGE, 'state.vscdb')
-STORAGE_JSON = os.path.join(WINDSURF_GLOBAL_STORAGE, 'storage.json')
+# 带子命令运行时 (如 list / save / switch) 直接进入命令行模式，不加载 tkinter
+if __name__ == '__main__' and cli.wants_cli(sys.argv[1:]):
+    sys.exit(cli.main(sys.argv[1:], platform=paths.MAC))
 
-# 需要备份的额外目录
-SESSION_STORAGE = os.path.join(WINDSURF_DATA, 'Session Storage')
-LOCAL_STORAGE = os.path.join(WINDSURF_DATA, 'Local Storage')
+import argparse
+import subprocess
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
 
-# Mac 特有的认证相关文件 (与 Windows 不同，Mac 没有 Network 目录)
-COOKIES_FILE = os.path.join(WINDSURF_DATA, 'Cookies')
-COOKIES_JOURNAL = os.path.join(WINDSURF_DATA, 'Cookies-journal')
-NETWORK_STATE_FILE = os.path.join(WINDSURF_DATA, 'Network Persistent State')
+from windsurf_core import analyze, procs, trace
+from windsurf_core.engine import Engine
+from windsurf_core.worker import Cancelled, Worker, format_progress
 
-# Codeium 配置目录 (Mac路径)
-CODEIUM_DIR = os.path.join(HOME, '.codeium', 'windsurf')
+# Windsurf 数据位置 (各平台路径见 windsurf_core/paths.py)
+PATHS = paths.for_platform(paths.MAC)
 
 # Profile存储目录 (保存到脚本运行的当前目录)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROFILES_DIR = os.path.join(SCRIPT_DIR, 'windsurf_profiles')
 
+# 后台任务进度的刷新间隔 (毫秒)
+POLL_INTERVAL_MS = 100
+
 
 # ============================================================
 # Windsurf 账号切换器主类
@@ -59,11 +48,15 @@ class WindsurfAccountSwitcher:
         """
         self.root = root
         self.root.title("Windsurf 账号切换器 (Mac) - 开源免费")
-        self.root.geometry("550x560")
+        self.root.geometry("780x640")
         self.root.resizable(True, True)
         
         # 确保Profile目录存在
         os.makedirs(PROFILES_DIR, exist_ok=True)
+        self.engine = Engine(PATHS, PROFILES_DIR)
+        self.worker = None
+        # 列表中每一行对应的 (配置名称, 历史版本号)，配置本身的版本号为 None
+        self.tree_items = {}
         
         # 初始化UI和数据
         self.setup_ui()
@@ -90,15 +83,22 @@ class WindsurfAccountSwitcher:
         list_frame = ttk.LabelFrame(self.root, text="已保存的账号配置", padding=10)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        # 创建Treeview表格
-        columns = ('name', 'email', 'date')
-        self.profile_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=8)
+        # 创建Treeview表格 (配置可以展开显示历史版本)
+        columns = ('name', 'email', 'date', 'size', 'usage', 'status')
+        self.profile_tree = ttk.Treeview(list_frame, columns=columns, show='tree headings', height=8)
+        self.profile_tree.column('#0', width=24, stretch=False)
         self.profile_tree.heading('name', text='配置名称')
         self.profile_tree.heading('email', text='邮箱')
         self.profile_tree.heading('date', text='保存时间')
+        self.profile_tree.heading('size', text='大小')
+        self.profile_tree.heading('usage', text='占用明细 (MB)')
+        self.profile_tree.heading('status', text='登录状态')
         self.profile_tree.column('name', width=120)
-        self.profile_tree.column('email', width=200)
-        self.profile_tree.column('date', width=160)
+        self.profile_tree.column('email', width=180)
+        self.profile_tree.column('date', width=140)
+        self.profile_tree.column('size', width=80, anchor=tk.E)
+        self.profile_tree.column('usage', width=230)
+        self.profile_tree.column('status', width=80)
         
         # 滚动条
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.profile_tree.yview)
@@ -107,13 +107,40 @@ class WindsurfAccountSwitcher:
         self.profile_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        # 切换方式选项
+        option_frame = ttk.Frame(self.root, padding=(10, 0))
+        option_frame.pack(fill=tk.X)
+        self.keys_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            option_frame,
+            text="仅同步登录信息 (只改写 state.vscdb 中有差异的键，保留其他编辑器状态)",
+            variable=self.keys_only_var
+        ).pack(anchor=tk.W)
+        
+        # 进度区 (保存/切换在后台执行时显示进度，可取消)
+        progress_frame = ttk.Frame(self.root, padding=(10, 5, 10, 0))
+        progress_frame.pack(fill=tk.X)
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate', maximum=1000)
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.cancel_btn = ttk.Button(progress_frame, text="取消", command=self.on_cancel_click, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(5, 0))
+        self.progress_var = tk.StringVar(value="")
+        ttk.Label(self.root, textvariable=self.progress_var, foreground='gray', padding=(10, 0)).pack(fill=tk.X)
+        
         # 按钮区域
         btn_frame = ttk.Frame(self.root, padding=10)
         btn_frame.pack(fill=tk.X)
         
-        ttk.Button(btn_frame, text="保存当前账号", command=self.save_current_profile).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="切换账号", command=self.on_switch_click).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="删除配置", command=self.delete_profile).pack(side=tk.LEFT, padx=5)
+        # 后台任务执行期间禁用的按钮
+        self.action_buttons = [
+            ttk.Button(btn_frame, text="保存当前账号", command=self.save_current_profile),
+            ttk.Button(btn_frame, text="切换账号", command=self.on_switch_click),
+            ttk.Button(btn_frame, text="撤销上次切换", command=self.undo_last_switch),
+            ttk.Button(btn_frame, text="删除配置", command=self.delete_profile),
+            ttk.Button(btn_frame, text="分析大小", command=self.analyze_profile),
+        ]
+        for btn in self.action_buttons:
+            btn.pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="📂 打开目录", command=self.open_profiles_dir).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="刷新", command=self.refresh_all).pack(side=tk.RIGHT, padx=5)
         
@@ -171,23 +198,8 @@ class WindsurfAccountSwitcher:
         返回:
             (name, email): 账号名称和邮箱的元组，失败返回(None, None)
         """
-        try:
-            if not os.path.exists(STATE_DB):
-                return None, None
-            
-            conn = sqlite3.connect(STATE_DB)
-            cursor = conn.cursor()
-            cursor.execute("SELECT value FROM ItemTable WHERE key='windsurfAuthStatus'")
-            row = cursor.fetchone()
-            conn.close()
-            
-            if row:
-                data = json.loads(row[0])
-                return data.get('name', '未知'), data.get('email', '未知')
-            return None, None
-        except Exception as e:
-            print(f"读取账号信息失败: {e}")
-            return None, None
+        # 只读打开并按文件状态缓存，同一次切换中多次调用不会重复读取数据库
+        return self.engine.current_account()
     
     def show_current_account(self):
         """在界面上显示当前账号信息"""
@@ -207,26 +219,49 @@ class WindsurfAccountSwitcher:
         # 清空列表
         for item in self.profile_tree.get_children():
             self.profile_tree.delete(item)
-        
-        if not os.path.exists(PROFILES_DIR):
-            return
-        
-        # 遍历Profile目录
-        for profile_name in os.listdir(PROFILES_DIR):
-            profile_path = os.path.join(PROFILES_DIR, profile_name)
-            if os.path.isdir(profile_path):
-                meta_file = os.path.join(profile_path, 'profile_meta.json')
-                if os.path.exists(meta_file):
-                    try:
-                        with open(meta_file, 'r', encoding='utf-8') as f:
-                            meta = json.load(f)
-                        self.profile_tree.insert('', tk.END, values=(
-                            profile_name,
-                            meta.get('email', '未知'),
-                            meta.get('saved_at', '未知')
-                        ))
-                    except:
-                        self.profile_tree.insert('', tk.END, values=(profile_name, '读取失败', ''))
+        self.tree_items = {}
+        
+        # 列表信息全部来自索引文件，不再逐个读取 profile_meta.json
+        # 登录状态和各数据位置的大小在保存时记入索引
+        for entry in self.engine.list_profiles():
+            if 'error' in entry:
+                item = self.profile_tree.insert('', tk.END, values=(entry['name'], '读取失败', '', '', '', ''))
+                self.tree_items[item] = (entry['name'], None)
+                continue
+            item = self.profile_tree.insert('', tk.END, values=(
+                entry['name'],
+                entry['email'] or '未知',
+                entry['saved_at'] or '未知',
+                f"{entry['size'] / 1048576:.1f} MB" if entry.get('size') is not None else '',
+                analyze.format_breakdown(entry.get('root_sizes') or {}),
+                entry['status']
+            ))
+            self.tree_items[item] = (entry['name'], None)
+            # 历史版本作为子项，展开后显示
+            for version in entry.get('versions', []):
+                child = self.profile_tree.insert(item, tk.END, values=(
+                    version['id'],
+                    version['email'] or '未知',
+                    version['saved_at'] or '未知',
+                    f"{version['size'] / 1048576:.1f} MB" if version.get('size') is not None else '',
+                    '',
+                    '历史版本'
+                ))
+                self.tree_items[child] = (entry['name'], version['id'])
+    
+    def selected_profile(self):
+        """
+        列表中选中的配置
+        返回:
+            (profile_name, version, email): version 为历史版本号 (选中配置本身时为 None)；未选中时返回 None
+        """
+        selected = self.profile_tree.selection()
+        if not selected or selected[0] not in self.tree_items:
+            return None
+        profile_name, version = self.tree_items[selected[0]]
+        # 转换为字符串，防止纯数字的值导致类型错误
+        email = str(self.profile_tree.item(selected[0])['values'][1])
+        return profile_name, version, email
     
     def refresh_all(self):
         """刷新所有信息（当前账号和Profile列表）"""
@@ -247,37 +282,23 @@ class WindsurfAccountSwitcher:
     # --------------------------------------------------------
     def is_windsurf_running(self):
         """
-        检查Windsurf是否正在运行 (Mac版本使用pgrep命令)
+        检查Windsurf是否正在运行 (通过 libproc 枚举进程，匹配 Windsurf.app 包内的主进程和 Helper 进程)
         返回:
             bool: True表示正在运行，False表示未运行
         """
         try:
-            # 检查主进程
-            result = subprocess.run(
-                ['pgrep', '-f', 'Windsurf'],
-                capture_output=True, text=True
-            )
-            if result.returncode == 0:
-                return True
-            # 检查是否有 Windsurf Helper 进程
-            result2 = subprocess.run(
-                ['pgrep', '-f', 'Windsurf Helper'],
-                capture_output=True, text=True
-            )
-            return result2.returncode == 0
-        except:
+            return procs.is_running()
+        except OSError:
             return False
     
     def force_quit_windsurf(self):
         """
         强制退出 Windsurf 进程
         """
+        # 结束后轮询等待进程全部退出，最后一个进程退出即返回
         try:
-            subprocess.run(['pkill', '-9', '-f', 'Windsurf'], capture_output=True)
-            import time
-            time.sleep(1)  # 等待进程完全退出
-            return not self.is_windsurf_running()
-        except:
+            return procs.force_quit()
+        except OSError:
             return False
     
     def verify_switch(self, expected_email):
@@ -310,23 +331,7 @@ class WindsurfAccountSwitcher:
     # --------------------------------------------------------
     def save_current_profile(self):
         """保存当前账号为Profile配置"""
-        # 检查 Windsurf 是否正在运行
-        if self.is_windsurf_running():
-            result = messagebox.askyesno(
-                "警告", 
-                "检测到 Windsurf 正在运行！\n\n"
-                "为确保认证数据完整保存，建议先关闭 Windsurf。\n\n"
-                "是否强制关闭 Windsurf 后继续？"
-            )
-            if result:
-                self.status_var.set("正在关闭 Windsurf...")
-                self.root.update()
-                if not self.force_quit_windsurf():
-                    messagebox.showerror("错误", "无法关闭 Windsurf，请手动关闭后重试")
-                    return
-            else:
-                return
-        
+        # 数据库通过 SQLite 在线快照保存，Windsurf 运行中也无需关闭
         name, email = self.get_current_account_info()
         if not name:
             messagebox.showerror("错误", "无法读取当前账号信息，请确保已登录Windsurf")
@@ -340,69 +345,44 @@ class WindsurfAccountSwitcher:
             return
         
         # 清理非法字符，只保留字母、数字和部分符号
-        profile_name = "".join(c for c in profile_name if c.isalnum() or c in ('_', '-', '.'))
-        
-        profile_path = os.path.join(PROFILES_DIR, profile_name)
+        profile_name = profiles.clean_name(profile_name)
+        try:
+            # 以点开头、与内部目录重名或指向存储目录之外的名称不能使用
+            profiles.check_name(PROFILES_DIR, profile_name)
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
         
         # 检查是否已存在同名配置
-        if os.path.exists(profile_path):
+        if self.engine.exists(profile_name):
             if not messagebox.askyesno("确认", f"配置 '{profile_name}' 已存在，是否覆盖？"):
                 return
-            shutil.rmtree(profile_path)
         
+        # ★★★ 按内容去重保存，与其他配置相同的文件不会重复写入 ★★★
+        # 覆盖已有配置时只处理有变化的文件；在后台线程中执行，界面显示进度
+        self.status_var.set(f"正在保存配置: {profile_name}")
+        self.run_in_background(
+            self.engine.save,
+            lambda result, error: self.on_save_done(profile_name, result, error),
+            profile_name
+        )
+    
+    def on_save_done(self, profile_name, result, error):
+        """后台保存结束后更新列表并提示结果"""
+        if isinstance(error, Cancelled):
+            self.status_var.set("已取消保存，原有配置保持不变")
+            return
         try:
-            os.makedirs(profile_path)
-            
-            # ★★★ 核心改进：复制整个 globalStorage 目录 ★★★
-            global_storage_backup = os.path.join(profile_path, 'globalStorage')
-            if os.path.exists(WINDSURF_GLOBAL_STORAGE):
-                # 复制整个目录，排除大型备份文件
-                shutil.copytree(
-                    WINDSURF_GLOBAL_STORAGE, 
-                    global_storage_backup,
-                    ignore=shutil.ignore_patterns('*.backup.*', 'ms-*')
-                )
-            
-            # 复制Session Storage
-            if os.path.exists(SESSION_STORAGE):
-                shutil.copytree(SESSION_STORAGE, os.path.join(profile_path, 'Session Storage'))
-            
-            # 复制Local Storage
-            if os.path.exists(LOCAL_STORAGE):
-                shutil.copytree(LOCAL_STORAGE, os.path.join(profile_path, 'Local Storage'))
-            
-            # 复制 Cookies 文件 (Mac 特有，认证关键文件)
-            if os.path.exists(COOKIES_FILE):
-                shutil.copy2(COOKIES_FILE, os.path.join(profile_path, 'Cookies'))
-            if os.path.exists(COOKIES_JOURNAL):
-                shutil.copy2(COOKIES_JOURNAL, os.path.join(profile_path, 'Cookies-journal'))
-            
-            # 复制 Network Persistent State 文件
-            if os.path.exists(NETWORK_STATE_FILE):
-                shutil.copy2(NETWORK_STATE_FILE, os.path.join(profile_path, 'Network Persistent State'))
-            
-            # 复制.codeium目录中的关键文件
-            codeium_backup = os.path.join(profile_path, 'codeium')
-            if os.path.exists(CODEIUM_DIR):
-                # 只复制关键文件，不复制大型缓存
-                os.makedirs(codeium_backup, exist_ok=True)
-                for item in ['installation_id', 'user_settings.pb']:
-                    src = os.path.join(CODEIUM_DIR, item)
-                    if os.path.exists(src):
-                        shutil.copy2(src, codeium_backup)
-            
-            # 保存元数据
-            meta = {
-                'name': name,
-                'email': email,
-                'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            with open(os.path.join(profile_path, 'profile_meta.json'), 'w', encoding='utf-8') as f:
-                json.dump(meta, f, ensure_ascii=False, indent=2)
+            if error is not None:
+                raise error
+            _, stats = result
             
             self.refresh_profiles()
             self.status_var.set(f"已保存配置: {profile_name}")
-            messagebox.showinfo("成功", f"配置 '{profile_name}' 保存成功！\n\n已备份 globalStorage 完整目录。")
+            messagebox.showinfo("成功", f"配置 '{profile_name}' 保存成功！\n\n"
+                                f"更新 {stats['changed']} 个文件，未变化 {stats['unchanged']} 个，移除 {stats['removed']} 个。\n"
+                                f"原始大小 {stats['logical_size'] / 1048576:.1f} MB，"
+                                f"压缩后占用 {stats['stored_size'] / 1048576:.1f} MB。")
         
         except Exception as e:
             messagebox.showerror("错误", f"保存失败: {e}")
@@ -412,19 +392,15 @@ class WindsurfAccountSwitcher:
     # --------------------------------------------------------
     def switch_profile(self):
         """切换到选中的Profile配置"""
-        selected = self.profile_tree.selection()
+        selected = self.selected_profile()
         if not selected:
             messagebox.showwarning("警告", "请先选择要切换的配置")
             return
         
-        # 获取选中的配置信息
-        profile_name = str(self.profile_tree.item(selected[0])['values'][0])
-        target_email = str(self.profile_tree.item(selected[0])['values'][1])
-        profile_path = os.path.join(PROFILES_DIR, profile_name)
-        
-        print(f"[DEBUG] 切换操作开始")
-        print(f"[DEBUG] profile_name: {profile_name}")
-        print(f"[DEBUG] target_email: {target_email}")
+        # 获取选中的配置信息 (可以是某个历史版本)
+        profile_name, version, target_email = selected
+        target_label = f"{profile_name} (历史版本 {version})" if version else profile_name
+        profile_path = self.engine.profile_path(profile_name)
         
         # 检查配置目录是否存在
         if not os.path.exists(profile_path):
@@ -433,9 +409,11 @@ class WindsurfAccountSwitcher:
         
         # 获取当前账号信息
         _, current_email = self.get_current_account_info()
+        trace.event('switch.request', profile=profile_name, version=version, target_email=target_email,
+                    current_email=current_email)
         
-        # 检查是否已经是目标账号
-        if current_email == target_email:
+        # 检查是否已经是目标账号 (回到同一账号的历史版本不受限制)
+        if current_email == target_email and not version:
             messagebox.showinfo("提示", f"当前已经是账号 '{target_email}'")
             return
         
@@ -445,6 +423,7 @@ class WindsurfAccountSwitcher:
                 "警告", 
                 f"检测到 Windsurf 正在运行！\n\n"
                 f"当前账号: {current_email}\n"
+                f"目标配置: {target_label}\n"
                 f"目标账号: {target_email}\n\n"
                 f"切换账号需要先关闭 Windsurf。\n\n"
                 f"是否强制关闭 Windsurf 后继续切换？"
@@ -459,104 +438,49 @@ class WindsurfAccountSwitcher:
                 return
         else:
             # Windsurf 未运行，确认切换
-            if not messagebox.askyesno("确认切换", f"当前账号: {current_email}\n目标账号: {target_email}\n\n确定要切换吗？"):
+            if not messagebox.askyesno("确认切换", f"当前账号: {current_email}\n目标配置: {target_label}\n"
+                                       f"目标账号: {target_email}\n\n确定要切换吗？"):
                 return
         
-        errors = []
-        success_items = []
-        
-        # ★★★ 核心改进：检查并还原整个 globalStorage 目录 ★★★
-        global_storage_backup = os.path.join(profile_path, 'globalStorage')
-        if os.path.exists(global_storage_backup):
-            try:
-                # 删除现有的 globalStorage 目录
-                if os.path.exists(WINDSURF_GLOBAL_STORAGE):
-                    shutil.rmtree(WINDSURF_GLOBAL_STORAGE)
-                # 复制备份的 globalStorage 目录
-                shutil.copytree(global_storage_backup, WINDSURF_GLOBAL_STORAGE)
-                success_items.append("globalStorage (完整目录)")
-                print(f"[DEBUG] globalStorage 目录还原成功")
-            except Exception as e:
-                errors.append(f"globalStorage: {str(e)[:80]}")
-                print(f"[DEBUG] globalStorage 还原失败: {e}")
-        else:
-            # 兼容旧版配置：只复制 state.vscdb
-            state_backup = os.path.join(profile_path, 'state.vscdb')
-            try:
-                if os.path.exists(state_backup):
-                    shutil.copy2(state_backup, STATE_DB)
-                    success_items.append("state.vscdb")
-            except Exception as e:
-                errors.append(f"state.vscdb: {e}")
-        
-        # 2. 尝试复制Session Storage
-        session_backup = os.path.join(profile_path, 'Session Storage')
-        try:
-            if os.path.exists(session_backup):
-                if os.path.exists(SESSION_STORAGE):
-                    shutil.rmtree(SESSION_STORAGE)
-                shutil.copytree(session_backup, SESSION_STORAGE)
-                success_items.append("Session Storage")
-        except Exception as e:
-            errors.append(f"Session Storage: {str(e)[:50]}")
-        
-        # 3. 尝试复制Local Storage
-        local_backup = os.path.join(profile_path, 'Local Storage')
-        try:
-            if os.path.exists(local_backup):
-                if os.path.exists(LOCAL_STORAGE):
-                    shutil.rmtree(LOCAL_STORAGE)
-                shutil.copytree(local_backup, LOCAL_STORAGE)
-                success_items.append("Local Storage")
-        except Exception as e:
-            errors.append(f"Local Storage: {str(e)[:50]}")
-        
-        # 4. 复制 Cookies 文件 (Mac 认证关键)
-        cookies_backup = os.path.join(profile_path, 'Cookies')
-        cookies_journal_backup = os.path.join(profile_path, 'Cookies-journal')
-        try:
-            if os.path.exists(cookies_backup):
-                shutil.copy2(cookies_backup, COOKIES_FILE)
-                success_items.append("Cookies")
-            if os.path.exists(cookies_journal_backup):
-                shutil.copy2(cookies_journal_backup, COOKIES_JOURNAL)
-        except Exception as e:
-            errors.append(f"Cookies: {str(e)[:50]}")
-        
-        # 5. 复制 Network Persistent State 文件
-        network_state_backup = os.path.join(profile_path, 'Network Persistent State')
-        try:
-            if os.path.exists(network_state_backup):
-                shutil.copy2(network_state_backup, NETWORK_STATE_FILE)
-                success_items.append("Network State")
-        except Exception as e:
-            errors.append(f"Network State: {str(e)[:50]}")
-        
-        # 6. 复制codeium配置文件
-        codeium_backup = os.path.join(profile_path, 'codeium')
-        try:
-            if os.path.exists(codeium_backup):
-                for item in os.listdir(codeium_backup):
-                    src = os.path.join(codeium_backup, item)
-                    dst = os.path.join(CODEIUM_DIR, item)
-                    shutil.copy2(src, dst)
-                success_items.append("codeium")
-        except Exception as e:
-            errors.append(f"codeium: {str(e)[:50]}")
+        # ★★★ 按 manifest 从共享存储增量还原，只改写有差异的文件 ★★★
+        # 在后台线程中执行，界面显示进度；开始替换之前取消会保持原状态
+        mode = profiles.RESTORE_KEYS if self.keys_only_var.get() else profiles.RESTORE_FULL
+        self.run_in_background(
+            self.engine.switch,
+            lambda result, error: self.on_switch_done(target_label, target_email, result, error),
+            profile_name, mode=mode, version=version
+        )
+    
+    def on_switch_done(self, profile_name, target_email, result, error):
+        """后台还原结束后验证切换结果"""
+        if isinstance(error, Cancelled):
+            self.status_var.set("已取消切换，Windsurf 数据保持原状")
+            return
+        if error is not None:
+            messagebox.showerror("异常", f"切换过程发生异常:\n{error}")
+            return
+        errors, success_items, stats = result
         
         # 刷新显示
         self.show_current_account()
         self.root.update()
         
         # 验证切换结果
-        _, new_email = self.get_current_account_info()
-        print(f"[DEBUG] 切换后账号: {new_email}")
+        with trace.span('switch.verify_account', profile=profile_name, expected=target_email) as sp:
+            _, new_email = self.get_current_account_info()
+            sp.set(actual=new_email, ok=new_email == target_email)
         
         if new_email == target_email:
             self.status_var.set(f"[OK] 切换成功: {profile_name}")
             msg = f"切换成功!\n\n当前账号: {target_email}\n\n成功复制: {', '.join(success_items)}"
+            if stats:
+                msg += f"\n改写 {stats['written']} 个文件，删除 {stats['deleted']} 个，{stats['unchanged']} 个已一致"
+                if 'items' in stats:
+                    items = stats['items']
+                    msg += f"\n数据库写入 {items['written']} 行，删除 {items['deleted']} 行 ({items['bytes']} 字节)"
             if errors:
                 msg += f"\n\n部分文件复制失败(不影响使用):\n" + "\n".join(errors)
+            msg += "\n\n切换前的数据已自动保存，可点击“撤销上次切换”恢复。"
             msg += "\n\n请启动 Windsurf 验证。"
             messagebox.showinfo("切换成功", msg)
         else:
@@ -567,25 +491,159 @@ class WindsurfAccountSwitcher:
             msg += "\n\n请启动 Windsurf 验证实际登录状态。"
             messagebox.showwarning("切换提示", msg)
     
+    # --------------------------------------------------------
+    # 后台任务
+    # --------------------------------------------------------
+    def run_in_background(self, func, on_done, *args, **kwargs):
+        """
+        在工作线程中执行 func(*args, progress=..., **kwargs)
+        进度通过队列传回，由 root.after 定时刷新；结束后在主线程调用 on_done(result, error)
+        """
+        self.set_busy(True)
+        self.worker = Worker(func, *args, **kwargs).start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_worker, on_done)
+    
+    def poll_worker(self, on_done):
+        """取出后台任务的事件并刷新进度条"""
+        for kind, data in self.worker.poll():
+            if kind == 'progress':
+                self.progress_bar['value'] = data['fraction'] * 1000
+                self.progress_var.set(format_progress(data))
+                continue
+            self.worker = None
+            self.set_busy(False)
+            if kind == 'done':
+                on_done(data, None)
+            else:
+                on_done(None, data)
+            return
+        self.root.after(POLL_INTERVAL_MS, self.poll_worker, on_done)
+    
+    def set_busy(self, busy):
+        """后台任务执行期间禁用操作按钮，启用取消按钮"""
+        for btn in self.action_buttons:
+            btn.config(state=tk.DISABLED if busy else tk.NORMAL)
+        self.cancel_btn.config(state=tk.NORMAL if busy else tk.DISABLED)
+        if not busy:
+            self.progress_bar['value'] = 0
+            self.progress_var.set("")
+    
+    def on_cancel_click(self):
+        """取消正在执行的保存/切换"""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.status_var.set("正在取消...")
+    
+    # --------------------------------------------------------
+    # 占用空间分析
+    # --------------------------------------------------------
+    def analyze_profile(self):
+        """分析选中配置 (未选中时为本机数据) 的占用空间"""
+        selected = self.selected_profile()
+        profile_name = selected[0] if selected else None
+        self.status_var.set(f"正在分析: {profile_name or '本机数据'}")
+        self.run_in_background(
+            self.engine.analyze,
+            lambda result, error: self.on_analyze_done(profile_name, result, error),
+            profile_name
+        )
+    
+    def on_analyze_done(self, profile_name, result, error):
+        """显示占用空间分析结果"""
+        title = f"配置 '{profile_name}'" if profile_name else "本机 Windsurf 数据"
+        if isinstance(error, Cancelled):
+            self.status_var.set("已取消分析")
+            return
+        if error is not None:
+            messagebox.showerror("错误", f"分析失败: {error}")
+            return
+        self.status_var.set(f"分析完成: {title}")
+        if profile_name:
+            # 分析结果 (含按当前规则排除的大小) 写回列表中该配置的占用明细
+            names = {root.label: root.name for root in self.engine.roots}
+            sizes = {names.get(row['root'], row['root']): row['bytes'] for row in result['roots']}
+            for item, (name, version) in self.tree_items.items():
+                if name == profile_name and version is None:
+                    self.profile_tree.set(item, 'usage', analyze.format_breakdown(sizes, result['excluded_bytes']))
+        messagebox.showinfo("占用空间", f"{title}\n\n" + "\n".join(analyze.format_report(result, 10)))
+    
+    # --------------------------------------------------------
+    # 撤销切换
+    # --------------------------------------------------------
+    def undo_last_switch(self):
+        """还原最近一次切换前自动保存的本机数据"""
+        info = self.engine.undo_info()
+        if info is None:
+            messagebox.showinfo("提示", "没有可以撤销的切换")
+            return
+        
+        prompt = (f"将还原 {info['saved_at']} 切换前的本机数据\n"
+                  f"账号: {info.get('email') or '未知'}\n\n"
+                  f"当前数据会先自动保存，可以再次撤销。")
+        if self.is_windsurf_running():
+            if not messagebox.askyesno("警告", f"检测到 Windsurf 正在运行！\n\n{prompt}\n\n是否强制关闭 Windsurf 后继续？"):
+                return
+            self.status_var.set("正在关闭 Windsurf...")
+            self.root.update()
+            if not self.force_quit_windsurf():
+                messagebox.showerror("错误", "无法关闭 Windsurf，请手动关闭后重试")
+                return
+        elif not messagebox.askyesno("确认撤销", prompt):
+            return
+        
+        # 只改写与快照不同的文件，切换后没有改动过的文件直接沿用
+        self.status_var.set("正在撤销上次切换...")
+        self.run_in_background(self.engine.undo_switch, self.on_undo_done)
+    
+    def on_undo_done(self, result, error):
+        """撤销结束后刷新账号信息并提示结果"""
+        if isinstance(error, Cancelled):
+            self.status_var.set("已取消撤销，Windsurf 数据保持原状")
+            return
+        if error is not None:
+            messagebox.showerror("错误", f"撤销失败: {error}")
+            return
+        errors, _, stats = result
+        self.show_current_account()
+        _, email = self.get_current_account_info()
+        msg = (f"已还原切换前的数据\n\n当前账号: {email}\n"
+               f"改写 {stats['written']} 个文件，删除 {stats['deleted']} 个，{stats['unchanged']} 个已一致")
+        if errors:
+            self.status_var.set("撤销未完成")
+            messagebox.showwarning("撤销提示", msg + "\n\n错误:\n" + "\n".join(errors))
+            return
+        self.status_var.set(f"已撤销上次切换: {email}")
+        messagebox.showinfo("撤销成功", msg)
+    
     # --------------------------------------------------------
     # 删除Profile
     # --------------------------------------------------------
     def delete_profile(self):
         """删除选中的Profile配置"""
-        selected = self.profile_tree.selection()
+        selected = self.selected_profile()
         if not selected:
             messagebox.showwarning("警告", "请先选择要删除的配置")
             return
         
-        # 转换为字符串，防止纯数字配置名导致的类型错误
-        profile_name = str(self.profile_tree.item(selected[0])['values'][0])
+        profile_name, version, _ = selected
         
-        if not messagebox.askyesno("确认删除", f"确定要删除配置 '{profile_name}'？\n\n此操作不可恢复。"):
+        if version:
+            # 只删除选中的历史版本
+            if not messagebox.askyesno("确认删除", f"确定要删除配置 '{profile_name}' 的历史版本 {version}？\n\n此操作不可恢复。"):
+                return
+            try:
+                self.engine.delete_version(profile_name, version)
+                self.refresh_profiles()
+                self.status_var.set(f"已删除历史版本: {profile_name} {version}")
+            except Exception as e:
+                messagebox.showerror("错误", f"删除失败: {e}")
+            return
+        
+        if not messagebox.askyesno("确认删除", f"确定要删除配置 '{profile_name}' (包括全部历史版本)？\n\n此操作不可恢复。"):
             return
         
         try:
-            profile_path = os.path.join(PROFILES_DIR, profile_name)
-            shutil.rmtree(profile_path)
+            self.engine.delete(profile_name)
             self.refresh_profiles()
             self.status_var.set(f"已删除配置: {profile_name}")
         except Exception as e:
@@ -597,6 +655,11 @@ class WindsurfAccountSwitcher:
 # ============================================================
 def main():
     """主函数，启动应用程序"""
+    # --profile / --chrome-trace 用于分析耗时 (见 windsurf_core/trace.py)
+    parser = argparse.ArgumentParser()
+    trace.add_arguments(parser)
+    args, _ = parser.parse_known_args()
+    
     root = tk.Tk()
     
     # 设置样式主题
@@ -607,8 +670,9 @@ def main():
     except:
         style.theme_use('clam')
     
-    app = WindsurfAccountSwitcher(root)
-    root.mainloop()
+    with trace.session(PROFILES_DIR, args.profile, args.chrome_trace):
+        app = WindsurfAccountSwitcher(root)
+        root.mainloop()
 
 
 if __name__ == '__main__':